@@ -2,6 +2,7 @@ from astrbot.core.config.astrbot_config import AstrBotConfig
 from astrbot import logger
 from astrbot.core.utils.personality import personalities
 from astrbot.core import html_renderer
+from astrbot.core.utils.http_client import http_client
 from astrbot.core.star.register import register_llm_tool as llm_tool
 
 __all__ = [
@@ -9,5 +10,6 @@ __all__ = [
     "logger",
     "personalities",
     "html_renderer",
+    "http_client",
     "llm_tool",
 ]
\ No newline at end of file
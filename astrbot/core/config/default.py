@@ -14,6 +14,9 @@ DEFAULT_CONFIG = {
             "time": 60,
             "count": 30,
             "strategy": "stall",  # stall, discard
+            "sender": {"enable": False, "time": 60, "count": 30, "strategy": "discard"},
+            "platform": {"enable": False, "time": 60, "count": 600, "strategy": "stall"},
+            "global": {"enable": False, "time": 60, "count": 1200, "strategy": "stall"},
         },
         "reply_prefix": "",
         "forward_threshold": 200,
@@ -32,12 +35,53 @@ DEFAULT_CONFIG = {
         "datetime_system_prompt": True,
         "default_personality": "如果用户寻求帮助或者打招呼，请告诉他可以用 /help 查看 AstrBot 帮助。",
         "prompt_prefix": "",
+        "streaming_response": False,
+        "max_tool_rounds": 3,
+        "tool_call_timeout": 60,
+        "tool_cache": {
+            "max_entries": 256,
+            "max_memory_mb": 8,
+        },
+        "image_preprocess": {
+            "max_edge": 1568,
+            "jpeg_quality": 85,
+            "cache_entries": 64,
+            "cache_memory_mb": 32,
+        },
+        "response_cache": {
+            "enable": False,
+            "ttl": 3600,
+            "max_entries": 1024,
+            "max_memory_mb": 16,
+            "sqlite": False,
+        },
+        "summarization": {
+            "enable": False,
+            "max_turns": 20,
+            "max_tokens": 4000,
+            "keep_turns": 4,
+            "provider_id": "",
+        },
+        "session_memory": {
+            "max_sessions": 1000,
+            "max_memory_mb": 64,
+        },
     },
     "content_safety": {
         "internal_keywords": {"enable": True, "extra_keywords": []},
         "baidu_aip": {"enable": False, "app_id": "", "api_key": "", "secret_key": ""},
     },
     "admins_id": [],
+    "event_bus": {
+        "worker_count": 16,
+        "queue_max_size": 1024,
+        "max_pending_per_session": 0,
+    },
+    "http_client": {
+        "limit": 100,
+        "limit_per_host": 10,
+        "dns_cache_ttl": 300,
+    },
     "t2i": False,
     "http_proxy": "",
     "dashboard": {
@@ -140,7 +184,7 @@ CONFIG_METADATA_2 = {
                     },
                     "rate_limit": {
                         "description": "速率限制",
-                        "hint": "每个会话在 `time` 秒内最多只能发送 `count` 条消息。",
+                        "hint": "每个会话在 `time` 秒内最多只能发送 `count` 条消息。还可以按发送者、消息平台和全局分别限流，一条消息需要同时满足所有启用的限制。",
                         "type": "object",
                         "items": {
                             "time": {"description": "消息速率限制时间", "type": "int"},
@@ -151,6 +195,51 @@ CONFIG_METADATA_2 = {
                                 "options": ["stall", "discard"],
                                 "hint": "当消息速率超过限制时的处理策略。stall 为等待，discard 为丢弃。",
                             },
+                            "sender": {
+                                "description": "按发送者限流",
+                                "type": "object",
+                                "hint": "同一个发送者（跨所有群聊和私聊）在 `time` 秒内最多只能发送 `count` 条消息。",
+                                "items": {
+                                    "enable": {"description": "启用", "type": "bool"},
+                                    "time": {"description": "消息速率限制时间", "type": "int"},
+                                    "count": {"description": "消息速率限制计数", "type": "int"},
+                                    "strategy": {
+                                        "description": "速率限制策略",
+                                        "type": "string",
+                                        "options": ["stall", "discard"],
+                                    },
+                                },
+                            },
+                            "platform": {
+                                "description": "按消息平台限流",
+                                "type": "object",
+                                "hint": "同一个消息平台在 `time` 秒内最多只能处理 `count` 条消息。",
+                                "items": {
+                                    "enable": {"description": "启用", "type": "bool"},
+                                    "time": {"description": "消息速率限制时间", "type": "int"},
+                                    "count": {"description": "消息速率限制计数", "type": "int"},
+                                    "strategy": {
+                                        "description": "速率限制策略",
+                                        "type": "string",
+                                        "options": ["stall", "discard"],
+                                    },
+                                },
+                            },
+                            "global": {
+                                "description": "全局限流",
+                                "type": "object",
+                                "hint": "所有消息平台加起来在 `time` 秒内最多只能处理 `count` 条消息。",
+                                "items": {
+                                    "enable": {"description": "启用", "type": "bool"},
+                                    "time": {"description": "消息速率限制时间", "type": "int"},
+                                    "count": {"description": "消息速率限制计数", "type": "int"},
+                                    "strategy": {
+                                        "description": "速率限制策略",
+                                        "type": "string",
+                                        "options": ["stall", "discard"],
+                                    },
+                                },
+                            },
                         },
                     },
                     "reply_prefix": {
@@ -245,6 +334,12 @@ CONFIG_METADATA_2 = {
                         "model_config": {
                             "model": "gpt-4o-mini",
                         },
+                        "max_context_tokens": 0,
+                        "key_strategy": "round_robin",
+                        "key_cooldown": 60,
+                        "max_concurrency": 0,
+                        "max_queue": 0,
+                        "queue_timeout": 0,
                     },
                     "ollama": {
                         "id": "ollama_default",
@@ -255,6 +350,12 @@ CONFIG_METADATA_2 = {
                         "model_config": {
                             "model": "llama3.1-8b",
                         },
+                        "max_context_tokens": 0,
+                        "key_strategy": "round_robin",
+                        "key_cooldown": 60,
+                        "max_concurrency": 0,
+                        "max_queue": 0,
+                        "queue_timeout": 0,
                     },
                     "gemini": {
                         "id": "gemini_default",
@@ -265,6 +366,12 @@ CONFIG_METADATA_2 = {
                         "model_config": {
                             "model": "gemini-1.5-flash",
                         },
+                        "max_context_tokens": 0,
+                        "key_strategy": "round_robin",
+                        "key_cooldown": 60,
+                        "max_concurrency": 0,
+                        "max_queue": 0,
+                        "queue_timeout": 0,
                     },
                     "deepseek": {
                         "id": "deepseek_default",
@@ -275,6 +382,12 @@ CONFIG_METADATA_2 = {
                         "model_config": {
                             "model": "deepseek-chat",
                         },
+                        "max_context_tokens": 0,
+                        "key_strategy": "round_robin",
+                        "key_cooldown": 60,
+                        "max_concurrency": 0,
+                        "max_queue": 0,
+                        "queue_timeout": 0,
                     },
                     "zhipu": {
                         "id": "zhipu_default",
@@ -285,6 +398,26 @@ CONFIG_METADATA_2 = {
                         "model_config": {
                             "model": "glm-4-flash",
                         },
+                        "max_context_tokens": 0,
+                        "key_strategy": "round_robin",
+                        "key_cooldown": 60,
+                        "max_concurrency": 0,
+                        "max_queue": 0,
+                        "queue_timeout": 0,
+                    },
+                    "routing": {
+                        "id": "routing_default",
+                        "type": "routing",
+                        "enable": True,
+                        "providers": [],
+                        "timeout": 60,
+                        "hedge": False,
+                        "hedge_delay": 5,
+                        "circuit_breaker": {
+                            "failure_threshold": 3,
+                            "recovery_time": 30,
+                        },
+                        "max_context_tokens": 0,
                     },
                     "llmtuner": {
                         "id": "llmtuner_default",
@@ -295,6 +428,9 @@ CONFIG_METADATA_2 = {
                         "llmtuner_template": "",
                         "finetuning_type": "lora",
                         "quantization_bit": 4,
+                        "max_concurrency": 1,
+                        "max_queue": 20,
+                        "queue_timeout": 60,
                     }
                 },
                 "items": {
@@ -319,11 +455,79 @@ CONFIG_METADATA_2 = {
                         "items": {"type": "string"},
                         "hint": "API Key 列表。填写好后输入回车即可添加 API Key。支持多个 API Key。",
                     },
+                    "key_strategy": {
+                        "description": "Key 选择策略",
+                        "type": "string",
+                        "options": ["round_robin", "least_in_flight"],
+                        "hint": "有多个 API Key 时，每次请求选择 Key 的方式。round_robin 为轮流使用，least_in_flight 为使用正在进行的请求最少的 Key。使用 /key 切换后将优先使用指定的 Key。",
+                    },
+                    "key_cooldown": {
+                        "description": "Key 冷却时间",
+                        "type": "int",
+                        "hint": "API Key 被限流（返回 429）后暂停使用的时间（秒）。返回 401/403 的 Key 将不再使用，直到通过 /key 手动切换到它。",
+                    },
                     "api_base": {
                         "description": "API Base URL",
                         "type": "string",
                         "hint": "API Base URL 请在在模型提供商处获得。支持 Ollama 开放的 API 地址。如果您确认填写正确但是使用时出现了 404 异常，可以尝试在地址末尾加上 `/v1`。",
                     },
+                    "max_context_tokens": {
+                        "description": "上下文长度限制（tokens）",
+                        "type": "int",
+                        "hint": "发送给模型的上下文（含系统提示词、提示词和预留的最大输出长度）的 token 数上限。超出时从最早的对话开始丢弃。token 数在本地估算。0 表示不限制。",
+                    },
+                    "max_concurrency": {
+                        "description": "最大并发数",
+                        "type": "int",
+                        "hint": "同时向该提供商发送的最大请求数，超出的请求将排队等待。适合本地模型或者自建的服务。0 表示不限制。重启后生效。",
+                    },
+                    "max_queue": {
+                        "description": "最大排队数",
+                        "type": "int",
+                        "hint": "达到最大并发数时，最多排队等待的请求数，超出的请求将直接失败。0 表示不限制。重启后生效。",
+                    },
+                    "queue_timeout": {
+                        "description": "排队超时时间",
+                        "type": "int",
+                        "hint": "请求最长的排队时间（秒），超时的请求将失败。0 表示不限制。重启后生效。",
+                    },
+                    "providers": {
+                        "description": "被路由的提供商",
+                        "type": "list",
+                        "items": {"type": "string"},
+                        "hint": "按优先级排列的提供商 ID。请求失败、超时或者提供商被熔断时，依次使用下一个提供商。",
+                    },
+                    "timeout": {
+                        "description": "超时时间",
+                        "type": "int",
+                        "hint": "单个提供商的请求超时时间（秒），超时后转移到下一个提供商。0 表示不限制。",
+                    },
+                    "hedge": {
+                        "description": "对冲请求",
+                        "type": "bool",
+                        "hint": "启用后，如果第一个提供商在其 p95 耗时内没有返回，会同时向下一个提供商发送请求，采用先返回的结果。会增加 token 开销。流式回复不会对冲。",
+                    },
+                    "hedge_delay": {
+                        "description": "对冲等待时间",
+                        "type": "float",
+                        "hint": "提供商的耗时样本不足 20 个时，发出对冲请求前等待的时间（秒）。",
+                    },
+                    "circuit_breaker": {
+                        "description": "熔断",
+                        "type": "object",
+                        "items": {
+                            "failure_threshold": {
+                                "description": "熔断阈值",
+                                "type": "int",
+                                "hint": "提供商连续失败多少次后熔断，熔断期间不再向其发送请求。",
+                            },
+                            "recovery_time": {
+                                "description": "熔断时间",
+                                "type": "int",
+                                "hint": "熔断多少秒后放行一个探测请求，成功则恢复。",
+                            },
+                        },
+                    },
                     "base_model_path": {
                         "description": "基座模型路径",
                         "type": "string",
@@ -407,6 +611,141 @@ CONFIG_METADATA_2 = {
                         "type": "string",
                         "hint": "添加之后，会在每次对话的 Prompt 前加上此文本。",
                     },
+                    "streaming_response": {
+                        "description": "流式回复",
+                        "type": "bool",
+                        "hint": "启用后，LLM 的回复会在句子或者段落结束时分段发送，不需要等待完整的回复。分段发送的消息不会转换为图片。需要提供商适配器支持，否则仍然一次性发送。",
+                    },
+                    "max_tool_rounds": {
+                        "description": "最大工具调用轮数",
+                        "type": "int",
+                        "hint": "LLM 最多连续调用多少轮函数工具。达到后，LLM 需要根据已有的工具结果直接回答。同一轮中的多个工具调用会并发执行。",
+                    },
+                    "tool_call_timeout": {
+                        "description": "工具调用超时时间",
+                        "type": "int",
+                        "hint": "单个函数工具的最长执行时间（秒），超时后将超时错误作为工具结果交给 LLM。0 表示不限制。",
+                    },
+                    "tool_cache": {
+                        "description": "工具结果缓存",
+                        "type": "object",
+                        "items": {
+                            "max_entries": {
+                                "description": "最大缓存条数",
+                                "type": "int",
+                                "hint": "缓存的函数工具返回值的最大条数。只有声明了缓存时间的工具（如网页搜索）会被缓存。重启后生效。",
+                            },
+                            "max_memory_mb": {
+                                "description": "最大内存占用",
+                                "type": "int",
+                                "hint": "缓存的函数工具返回值的总大小上限（MB）。0 表示不限制。重启后生效。",
+                            },
+                        },
+                    },
+                    "image_preprocess": {
+                        "description": "图片预处理",
+                        "type": "object",
+                        "items": {
+                            "max_edge": {
+                                "description": "图片最长边",
+                                "type": "int",
+                                "hint": "发送给视觉模型的图片最长边的上限（像素），超出的图片会被等比缩小并重新编码。0 表示不缩小。重启后生效。",
+                            },
+                            "jpeg_quality": {
+                                "description": "JPEG 质量",
+                                "type": "int",
+                                "hint": "图片重新编码为 JPEG 时的质量（1-95）。有透明通道的图片会编码为 PNG。",
+                            },
+                            "cache_entries": {
+                                "description": "最大缓存张数",
+                                "type": "int",
+                                "hint": "按图片内容缓存处理后的图片，重复发送同一张图片时不需要重新下载和处理。",
+                            },
+                            "cache_memory_mb": {
+                                "description": "最大内存占用",
+                                "type": "int",
+                                "hint": "缓存的图片的总大小上限（MB）。0 表示不限制。",
+                            },
+                        },
+                    },
+                    "response_cache": {
+                        "description": "回复缓存",
+                        "type": "object",
+                        "items": {
+                            "enable": {
+                                "description": "启用回复缓存",
+                                "type": "bool",
+                                "hint": "启用后，模型、系统提示词、上下文和提示词都相同的请求将直接使用缓存的回复。带有函数调用工具或者图片的请求不会使用缓存。重启后生效。",
+                            },
+                            "ttl": {
+                                "description": "缓存时间",
+                                "type": "int",
+                                "hint": "回复被缓存的时间（秒）。小于等于 0 表示不过期。",
+                            },
+                            "max_entries": {
+                                "description": "最大缓存条数",
+                                "type": "int",
+                                "hint": "内存中最多缓存的回复条数。超出后淘汰最久未使用的回复。",
+                            },
+                            "max_memory_mb": {
+                                "description": "最大内存占用",
+                                "type": "int",
+                                "hint": "内存中缓存的回复的总大小上限（MB）。0 表示不限制。",
+                            },
+                            "sqlite": {
+                                "description": "持久化缓存",
+                                "type": "bool",
+                                "hint": "启用后，回复同时缓存到 data/llm_response_cache.db 中，重启后仍然有效。",
+                            },
+                        },
+                    },
+                    "summarization": {
+                        "description": "上下文总结",
+                        "type": "object",
+                        "items": {
+                            "enable": {
+                                "description": "启用上下文总结",
+                                "type": "bool",
+                                "hint": "启用后，当一个会话的对话轮数或者 token 数超过限制时，会在后台将较早的对话总结为一条摘要，只保留最近几轮对话的原文。重启后生效。",
+                            },
+                            "max_turns": {
+                                "description": "触发总结的对话轮数",
+                                "type": "int",
+                                "hint": "会话的对话轮数超过此值时触发总结。0 表示不按轮数触发。",
+                            },
+                            "max_tokens": {
+                                "description": "触发总结的 token 数",
+                                "type": "int",
+                                "hint": "会话的上下文 token 数（本地估算）超过此值时触发总结。0 表示不按 token 数触发。",
+                            },
+                            "keep_turns": {
+                                "description": "保留原文的轮数",
+                                "type": "int",
+                                "hint": "总结时保留最近多少轮对话的原文。",
+                            },
+                            "provider_id": {
+                                "description": "用于总结的提供商 ID",
+                                "type": "string",
+                                "hint": "可以填写一个更便宜的模型的提供商 ID。留空则使用当前会话所用的提供商。",
+                            },
+                        },
+                    },
+                    "session_memory": {
+                        "description": "会话上下文缓存",
+                        "type": "object",
+                        "items": {
+                            "max_sessions": {
+                                "description": "最大会话数",
+                                "type": "int",
+                                "hint": "每个提供商在内存中最多保存多少个会话的上下文。会话的上下文在第一次使用时从数据库读取，超出后淘汰最久未使用的会话（淘汰前写回数据库）。0 表示不限制。重启后生效。",
+                            },
+                            "max_memory_mb": {
+                                "description": "最大内存占用",
+                                "type": "int",
+                                "hint": "每个提供商在内存中保存的上下文的总大小上限（MB）。0 表示不限制。重启后生效。",
+                            },
+                        },
+                    },
                 },
             },
         },
@@ -420,6 +759,48 @@ CONFIG_METADATA_2 = {
                 "items": {"type": "string"},
                 "hint": "在不 @ 机器人的情况下，可以通过外加消息前缀来唤醒机器人。",
             },
+            "event_bus": {
+                "description": "事件总线",
+                "type": "object",
+                "items": {
+                    "worker_count": {
+                        "description": "工作协程数",
+                        "type": "int",
+                        "hint": "同时处理消息事件的最大数量。消息较多时可以适当调大。重启后生效。",
+                    },
+                    "queue_max_size": {
+                        "description": "事件队列长度",
+                        "type": "int",
+                        "hint": "等待处理的消息事件的最大数量。队列满时，消息平台提交的新事件将被丢弃。小于等于 0 表示不限制。重启后生效。",
+                    },
+                    "max_pending_per_session": {
+                        "description": "单会话排队事件数",
+                        "type": "int",
+                        "hint": "同一会话（如整个群聊）的消息会按顺序依次处理，一条消息等待 LLM 回复时，这个会话后续的消息（包括指令）都会排队。当一个会话排队等待处理的消息超过此数量时，新的消息将被直接丢弃，不会有任何回复，只会记录警告日志。默认 0 表示不限制，由事件队列的最大长度限制积压。重启后生效。",
+                    },
+                },
+            },
+            "http_client": {
+                "description": "HTTP 客户端",
+                "type": "object",
+                "items": {
+                    "limit": {
+                        "description": "最大连接数",
+                        "type": "int",
+                        "hint": "共享的 HTTP 连接池中的最大连接数。0 表示不限制。重启后生效。",
+                    },
+                    "limit_per_host": {
+                        "description": "单个域名最大连接数",
+                        "type": "int",
+                        "hint": "对同一个域名同时建立的最大连接数。0 表示不限制。重启后生效。",
+                    },
+                    "dns_cache_ttl": {
+                        "description": "DNS 缓存时间",
+                        "type": "int",
+                        "hint": "DNS 解析结果的缓存时间（秒）。重启后生效。",
+                    },
+                },
+            },
             "t2i": {
                 "description": "文本转图像",
                 "type": "bool",
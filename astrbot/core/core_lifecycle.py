@@ -16,6 +16,7 @@ from astrbot.core.db import BaseDatabase
 from astrbot.core.updator import AstrBotUpdator
 from astrbot.core import logger
 from astrbot.core.config.default import VERSION
+from astrbot.core.utils.http_client import http_client
 
 class AstrBotCoreLifecycle:
     def __init__(self, log_broker: LogBroker, db: BaseDatabase):
@@ -30,7 +31,8 @@ class AstrBotCoreLifecycle:
     async def initialize(self):
         logger.info("AstrBot v"+ VERSION)
         logger.setLevel(self.astrbot_config['log_level'])
-        self.event_queue = Queue()
+        http_client.configure(**self.astrbot_config['http_client'])
+        self.event_queue = Queue(maxsize=self.astrbot_config['event_bus']['queue_max_size'])
         self.event_queue.closed = False
         
         self.provider_manager = ProviderManager(self.astrbot_config, self.db)
@@ -60,7 +62,12 @@ class AstrBotCoreLifecycle:
         '''初始化消息事件流水线调度器'''
         
         self.astrbot_updator = AstrBotUpdator(self.astrbot_config['plugin_repo_mirror'])
-        self.event_bus = EventBus(self.event_queue, self.pipeline_scheduler)
+        self.event_bus = EventBus(
+            self.event_queue, 
+            self.pipeline_scheduler, 
+            self.astrbot_config['event_bus']['worker_count'],
+            self.astrbot_config['event_bus']['max_pending_per_session']
+        )
         self.start_time = int(time.time())
         self.curr_tasks: List[asyncio.Task] = []
 
@@ -94,6 +101,12 @@ class AstrBotCoreLifecycle:
             except Exception as e:
                 logger.error(f"任务 {task.get_name()} 发生错误: {e}")
         
+        for provider in self.provider_manager.get_insts():
+            # 写回还没有持久化的会话上下文
+            provider.session_memory.flush()
+        
+        await http_client.close()
+        
     def restart(self):
         self.event_queue.closed = True
         threading.Thread(target=self.astrbot_updator._reboot, name="restart", daemon=True).start()
@@ -23,6 +23,7 @@ CREATE TABLE IF NOT EXISTS llm_history(
     session_id VARCHAR(32),
     content TEXT
 );
+CREATE INDEX IF NOT EXISTS idx_llm_history_session ON llm_history(session_id, provider_type);
 
 -- ATRI
 CREATE TABLE IF NOT EXISTS atri_vision(
@@ -1,23 +1,76 @@
 import asyncio
+import traceback
 from asyncio import Queue
+from typing import List
 from astrbot.core.pipeline.scheduler import PipelineScheduler
+from astrbot.core.pipeline.session_executor import SessionOrderedExecutor
 from astrbot.core import logger
 from .platform import AstrMessageEvent
 
 class EventBus:
-    def __init__(self, event_queue: Queue, pipeline_scheduler: PipelineScheduler):
+    '''事件总线。
+
+    由固定数量的工作协程从事件队列中取出事件并交由流水线处理，以此限制同时处理的事件数量。
+    事件队列的长度在创建队列时指定，队列满时消息平台的 `commit_event` 会拒绝新的事件。
+    
+    事件经由 `SessionOrderedExecutor` 交给流水线，同一会话的事件按顺序处理，不同会话的事件并行处理。
+    '''
+    def __init__(
+        self, 
+        event_queue: Queue, 
+        pipeline_scheduler: PipelineScheduler, 
+        worker_count: int = 16,
+        max_pending_per_session: int = 0
+    ):
         self.event_queue = event_queue
         self.pipeline_scheduler = pipeline_scheduler
+        self.session_executor = SessionOrderedExecutor(pipeline_scheduler, max_pending_per_session)
+        self.worker_count = max(1, worker_count)
+        '''工作协程数'''
+        self.in_flight = 0
+        '''正在被流水线处理的事件数'''
+        self.dispatched = 0
+        '''已从事件队列中取出并分发的事件数'''
 
     async def dispatch(self):
-        logger.info("事件总线已打开。")
+        logger.info(f"事件总线已打开。工作协程数：{self.worker_count}。")
+        workers: List[asyncio.Task] = [
+            asyncio.create_task(self._worker(), name=f"event_bus_worker_{i}")
+            for i in range(self.worker_count)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def _worker(self):
         while True:
             event: AstrMessageEvent = await self.event_queue.get()
-            self._print_event(event)
-            asyncio.create_task(self.pipeline_scheduler.execute(event))
-            
-    def _print_event(self, event: AstrMessageEvent):        
+            self.in_flight += 1
+            try:
+                self._print_event(event)
+                await self.session_executor.execute(event)
+            except Exception:
+                logger.error(traceback.format_exc())
+            finally:
+                self.in_flight -= 1
+                self.dispatched += 1
+                self.event_queue.task_done()
+
+    def get_stats(self) -> dict:
+        '''获取事件总线的运行状态'''
+        return {
+            "worker_count": self.worker_count,
+            "queue_depth": self.event_queue.qsize(),
+            "queue_max_size": self.event_queue.maxsize,
+            "in_flight": self.in_flight,
+            "dispatched": self.dispatched,
+            **self.session_executor.get_stats(),
+        }
+
+    def _print_event(self, event: AstrMessageEvent):
         if event.get_sender_name():
             logger.info(f"[{event.get_platform_name()}] {event.get_sender_name()}/{event.get_sender_id()}: {event.get_message_outline()}")
         else:
-            logger.info(f"[{event.get_platform_name()}] {event.get_sender_id()}: {event.get_message_outline()}")
\ No newline at end of file
+            logger.info(f"[{event.get_platform_name()}] {event.get_sender_id()}: {event.get_message_outline()}")
@@ -115,12 +115,16 @@ class MessageEventResult(MessageChain):
         `use_t2i_` (bool): 用于标记是否使用文本转图片服务。默认为 None，即跟随用户的设置。当设置为 True 时，将会使用文本转图片服务。
         `is_split_` (bool): 用于标记是否分条发送消息。默认为 False。启用后，将会依次发送 chain 中的每个 component。
         `result_type` (EventResultType): 事件处理的结果类型。
+        `stream_segment_index` (int): 流式输出时，这是第几个片段。
     '''
     
     result_type: Optional[EventResultType] = field(default_factory=lambda: EventResultType.CONTINUE)
     
     result_content_type: Optional[ResultContentType] = field(default_factory=lambda: ResultContentType.GENERAL_RESULT)
     
+    stream_segment_index: Optional[int] = None
+    '''流式输出时，这是第几个片段（从 0 开始）。不是流式输出时为 None'''
+    
     def stop_event(self) -> 'MessageEventResult':
         '''终止事件传播。
         '''
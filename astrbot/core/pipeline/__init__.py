@@ -2,6 +2,7 @@ from astrbot.core.message.message_event_result import MessageEventResult, EventR
 
 from .waking_check.stage import WakingCheckStage
 from .whitelist_check.stage import WhitelistCheckStage
+from .rate_limit_check.stage import RateLimitCheckStage
 from .content_safety_check.stage import ContentSafetyCheckStage
 from .process_stage.stage import ProcessStage
 from .result_decorate.stage import ResultDecorateStage
@@ -20,6 +21,7 @@ STAGES_ORDER = [
 __all__ = [
     "WakingCheckStage",
     "WhitelistCheckStage",
+    "RateLimitCheckStage",
     "ContentSafetyCheckStage",
     "ProcessStage",
     "ResultDecorateStage",
@@ -19,7 +19,7 @@ class ContentSafetyCheckStage(Stage):
 
     async def process(self, event: AstrMessageEvent) -> Union[None, AsyncGenerator[None, None]]:
         '''检查内容安全'''
-        ok, info = self.strategy_selector.check(event.get_message_str())
+        ok, info = await self.strategy_selector.check(event.get_message_str())
         if not ok:
             event.set_result(MessageEventResult().message("你的消息中包含不适当的内容，已被屏蔽。"))
             event.stop_event()
@@ -2,7 +2,8 @@ import abc
 from typing import Tuple
 
 class ContentSafetyStrategy(abc.ABC):
+    '''内容安全检查策略。check 在事件循环中被调用，不能阻塞。同步的网络客户端应当放到线程池中执行。'''
         
     @abc.abstractmethod
-    def check(self, content: str) -> Tuple[bool, str]:
+    async def check(self, content: str) -> Tuple[bool, str]:
         raise NotImplementedError
\ No newline at end of file
@@ -1,20 +1,48 @@
 '''
 使用此功能应该先 pip install baidu-aip
 '''
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
 from . import ContentSafetyStrategy
 from aip import AipContentCensor
+from astrbot.core.utils.ttl_cache import TTLCache
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="baidu_aip")
+'''所有 BaiduAipStrategy 共用的线程池。流水线重新加载时会创建新的 BaiduAipStrategy，共用线程池可以避免旧的线程池泄漏'''
 
 class BaiduAipStrategy(ContentSafetyStrategy):
-    def __init__(self, appid: str, ak: str, sk: str) -> None:
+    '''百度内容审核。
+    
+    AipContentCensor 是同步的客户端，请求在一个模块级的有界线程池中执行，不会阻塞事件循环。
+    审核结果以内容的 SHA-256 为 key 缓存一段时间，重复的消息（刷屏、复制粘贴、重试）不会再次请求百度。
+    '''
+    def __init__(self, appid: str, ak: str, sk: str, cache_size: int = 1024, cache_ttl: float = 600) -> None:
         self.app_id = appid
         self.api_key = ak
         self.secret_key = sk
         self.client = AipContentCensor(self.app_id, 
                                        self.api_key, 
                                        self.secret_key)
+        self.verdict_cache = TTLCache(cache_size, cache_ttl)
+        '''内容的 SHA-256 -> 审核结果'''
+
+    async def check(self, content: str) -> Tuple[bool, str]:
+        key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        verdict = self.verdict_cache.get(key)
+        if verdict is not None:
+            return verdict
+        loop = asyncio.get_running_loop()
+        res = await loop.run_in_executor(_executor, self.client.textCensorUserDefined, content)
+        verdict = self.parse_result(res)
+        if 'conclusionType' in res:
+            # 请求失败时不缓存
+            self.verdict_cache.set(key, verdict)
+        return verdict
 
-    def check(self, content: str):
-        res = self.client.textCensorUserDefined(content)
+    @staticmethod
+    def parse_result(res: dict) -> Tuple[bool, str]:
         if 'conclusionType' not in res:
             return False, ""
         if res['conclusionType'] == 1:
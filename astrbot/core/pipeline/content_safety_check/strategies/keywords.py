@@ -2,9 +2,17 @@ import re
 import os
 import json
 import base64
+from typing import List, Tuple
 from . import ContentSafetyStrategy
+from astrbot.core.utils.aho_corasick import AhoCorasick
+
+_REGEX_META = set(".^$*+?{}[]\\|()")
 
 class KeywordsStrategy(ContentSafetyStrategy):
+    '''关键词过滤。
+    
+    普通关键词被构建为一个 Aho-Corasick 自动机，每条消息只需要扫描一遍。含有正则表达式元字符的关键词被预先编译，逐个搜索。
+    '''
     def __init__(self, extra_keywords: list) -> None:
         self.keywords = []
         if extra_keywords is None:
@@ -15,9 +23,29 @@ class KeywordsStrategy(ContentSafetyStrategy):
         if os.path.exists(keywords_path):
             with open(keywords_path, "r", encoding="utf-8") as f:
                 self.keywords.extend(json.loads(base64.b64decode(f.read()).decode("utf-8"))['keywords'])
-
-    def check(self, content: str) -> bool:
+        
+        literals = []
+        self.regex_keywords: List[re.Pattern] = []
         for keyword in self.keywords:
-            if re.search(keyword, content):
-                return False, "内容安全检查不通过，匹配到敏感词。"
-        return True, ""
\ No newline at end of file
+            if not keyword:
+                continue
+            if _REGEX_META.isdisjoint(keyword):
+                literals.append(keyword)
+            else:
+                self.regex_keywords.append(re.compile(keyword))
+        self.automaton = AhoCorasick(literals)
+        
+    def find_keywords(self, content: str) -> List[str]:
+        '''返回内容中匹配到的所有关键词'''
+        matched = self.automaton.find_all(content)
+        matched.extend(regex.pattern for regex in self.regex_keywords if regex.search(content))
+        return matched
+
+    def match(self, content: str) -> bool:
+        '''内容中是否有任意一个关键词'''
+        return self.automaton.search(content) or any(regex.search(content) for regex in self.regex_keywords)
+
+    async def check(self, content: str) -> Tuple[bool, str]:
+        if self.match(content):
+            return False, "内容安全检查不通过，匹配到敏感词。"
+        return True, ""
@@ -25,9 +25,9 @@ class StrategySelector:
                 )
             )
 
-    def check(self, content: str) -> Tuple[bool, str]:
+    async def check(self, content: str) -> Tuple[bool, str]:
         for strategy in self.enabled_strategies:
-            ok, info = strategy.check(content)
+            ok, info = await strategy.check(content)
             if not ok:
                 return False, info
         return True, ""
@@ -1,5 +1,7 @@
+import json
+import asyncio
 import traceback
-from typing import Union, AsyncGenerator
+from typing import Union, AsyncGenerator, Dict, List, Tuple
 from ...context import PipelineContext
 from ..stage import Stage
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
@@ -7,7 +9,8 @@ from astrbot.core.message.message_event_result import MessageEventResult, Result
 from astrbot.core.message.components import Image
 from astrbot.core import logger
 from astrbot.core.utils.metrics import Metric
-from astrbot.core.provider.entites import ProviderRequest
+from astrbot.core.utils.sentence_buffer import SentenceBuffer
+from astrbot.core.provider.entites import ProviderRequest, LLMResponse
 from astrbot.core.star.star_handler import star_handlers_registry, EventType
 
 class LLMRequestSubStage(Stage):
@@ -50,45 +53,132 @@ class LLMRequestSubStage(Stage):
             except BaseException:
                 logger.error(traceback.format_exc())
         
+        provider_settings = self.ctx.astrbot_config['provider_settings']
+        max_tool_rounds = provider_settings.get('max_tool_rounds', 3)
         try:
-            logger.debug(f"请求 LLM：{req.__dict__}")
-            llm_response = await provider.text_chat(**req.__dict__) # 请求 LLM
-            await Metric.upload(llm_tick=1, model_name=provider.get_model(), provider_type=provider.meta().type)
+            for tool_round in range(max_tool_rounds + 1):
+                if tool_round == max_tool_rounds:
+                    # 达到最大工具调用轮数，要求模型直接回答
+                    req.func_tool = None
+                logger.debug(f"请求 LLM：{req.__dict__}")
+                streamed_segments = 0
+                if provider_settings.get('streaming_response', False):
+                    # 流式请求。在句子、段落的边界处分段发送，完整的回复生成后才会记录上下文
+                    llm_response = None
+                    buffer = SentenceBuffer()
+                    async for llm_response in provider.text_chat_stream(**req.__dict__):
+                        if not llm_response.is_chunk:
+                            continue
+                        for segment in buffer.feed(llm_response.completion_text):
+                            self._set_segment_result(event, segment, streamed_segments)
+                            streamed_segments += 1
+                            yield
+                            event.clear_result()
+                    if llm_response is None or llm_response.is_chunk:
+                        raise Exception("LLM 流式输出没有返回完整的结果。")
+                    rest = buffer.flush()
+                else:
+                    llm_response = await provider.text_chat(**req.__dict__) # 请求 LLM
+                await Metric.upload(llm_tick=1, model_name=provider.get_model(), provider_type=provider.meta().type)
 
-            if llm_response.role == 'assistant':
-                # text completion
-                event.set_result(MessageEventResult().message(llm_response.completion_text)
-                                 .set_result_content_type(ResultContentType.LLM_RESULT))
-            elif llm_response.role == 'tool':
-                # function calling
-                function_calling_result = {}
-                for func_tool_name, func_tool_args in zip(llm_response.tools_call_name, llm_response.tools_call_args):
-                    func_tool = req.func_tool.get_func(func_tool_name)
-                    logger.info(f"调用工具函数：{func_tool_name}，参数：{func_tool_args}")
-                    try:
-                        # 尝试调用工具函数
-                        wrapper = self._call_handler(self.ctx, event, func_tool.handler, **func_tool_args)
-                        async for resp in wrapper:
-                            if resp is not None:
-                                function_calling_result[func_tool_name] = resp
-                            else:
-                                yield
-                        event.clear_result() # 清除上一个 handler 的结果
-                    except BaseException as e:
-                        logger.warning(traceback.format_exc())
-                        function_calling_result[func_tool_name] = "When calling the function, an error occurred: " + str(e)
-                if function_calling_result:
-                    # 工具返回 LLM 资源。比如 RAG、网页 得到的相关结果等。
-                    # 我们重新执行一遍这个 stage
-                    req.func_tool = None # 暂时不支持递归工具调用
-                    extra_prompt = "\n\nSystem executed some external tools for this task and here are the results:\n"
-                    for tool_name, tool_result in function_calling_result.items():
-                        extra_prompt += f"Tool: {tool_name}\nTool Result: {tool_result}\n"
-                    req.prompt += extra_prompt
-                    async for _ in self.process(event):
-                        yield
+                if llm_response.role == 'assistant' and streamed_segments:
+                    # 流式输出剩余的部分
+                    if rest:
+                        self._set_segment_result(event, rest, streamed_segments)
+                    return
+                elif llm_response.role == 'assistant':
+                    # text completion
+                    event.set_result(MessageEventResult().message(llm_response.completion_text)
+                                     .set_result_content_type(ResultContentType.LLM_RESULT))
+                    return
+                elif llm_response.role != 'tool':
+                    return
+                
+                # function calling。并发地调用各个工具函数
+                tool_results, results_to_send = await self._call_tools(event, req, llm_response)
+                for result in results_to_send:
+                    # 工具函数自己发送的消息
+                    event.set_result(result)
+                    yield
+                    event.clear_result()
+                if not tool_results:
+                    return
+                # 将工具调用和结果以 tool 角色的记录交给 LLM，继续下一轮
+                req.tool_messages = [*(req.tool_messages or []), *self._build_tool_messages(llm_response, tool_results, tool_round)]
 
         except BaseException as e:
             logger.error(traceback.format_exc())
             event.set_result(MessageEventResult().message("AstrBot 请求 LLM 资源失败：" + str(e)))
-            return
\ No newline at end of file
+            return
+
+    async def _call_tools(self, event: AstrMessageEvent, req: ProviderRequest, llm_response: LLMResponse) -> Tuple[Dict[int, str], List[MessageEventResult]]:
+        '''并发地调用 LLM 请求的工具函数，每个工具函数的执行时间不超过 `tool_call_timeout` 秒。
+        
+        Returns:
+            (工具调用的下标 -> 工具函数的返回值, 工具函数自己发送的消息)。只发送了消息而没有返回值的工具调用不在第一项中
+        '''
+        timeout = self.ctx.astrbot_config['provider_settings'].get('tool_call_timeout', 60)
+        results_to_send: List[MessageEventResult] = []
+        
+        async def call(func_tool_name: str, func_tool_args: dict):
+            func_tool = req.func_tool.get_func(func_tool_name) if req.func_tool else None
+            if func_tool is None:
+                raise Exception(f"工具函数 {func_tool_name} 不存在。")
+            cached = req.func_tool.get_cached_result(func_tool, func_tool_args)
+            if cached is not None:
+                logger.info(f"调用工具函数：{func_tool_name}，参数：{func_tool_args}（使用缓存的结果）")
+                return cached
+            logger.info(f"调用工具函数：{func_tool_name}，参数：{func_tool_args}")
+            ret = None
+            wrapper = self._call_handler(self.ctx, event, func_tool.handler, **func_tool_args)
+            async for resp in wrapper:
+                if resp is not None:
+                    ret = resp
+                elif event.get_result():
+                    # 工具函数设置了消息结果。取出结果，等所有工具函数执行完毕后再发送，避免并发的工具函数互相覆盖
+                    results_to_send.append(event.get_result())
+                    event.clear_result()
+            req.func_tool.set_cached_result(func_tool, func_tool_args, ret)
+            return ret
+        
+        async def call_with_timeout(func_tool_name: str, func_tool_args: dict):
+            try:
+                if timeout and timeout > 0:
+                    return await asyncio.wait_for(call(func_tool_name, func_tool_args), timeout)
+                return await call(func_tool_name, func_tool_args)
+            except asyncio.TimeoutError:
+                logger.warning(f"工具函数 {func_tool_name} 执行超时（{timeout} 秒）。")
+                return f"When calling the function, an error occurred: timed out after {timeout} seconds"
+            except Exception as e:
+                logger.warning(traceback.format_exc())
+                return "When calling the function, an error occurred: " + str(e)
+        
+        rets = await asyncio.gather(*[
+            call_with_timeout(name, args) for name, args in zip(llm_response.tools_call_name, llm_response.tools_call_args)
+        ])
+        tool_results = {i: str(ret) for i, ret in enumerate(rets) if ret is not None}
+        return tool_results, results_to_send
+    
+    def _build_tool_messages(self, llm_response: LLMResponse, tool_results: Dict[int, str], tool_round: int) -> List[dict]:
+        '''构造 assistant 的 tool_calls 记录和各个工具调用的 tool 记录'''
+        tool_calls = []
+        tool_messages = []
+        for i, (name, args) in enumerate(zip(llm_response.tools_call_name, llm_response.tools_call_args)):
+            call_id = (llm_response.tools_call_ids[i] if llm_response.tools_call_ids else None) or f"call_{tool_round}_{i}"
+            tool_calls.append({
+                "id": call_id,
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(args, ensure_ascii=False)}
+            })
+            tool_messages.append({
+                "role": "tool",
+                "tool_call_id": call_id,
+                "content": tool_results.get(i, "The result has been sent to the user.")
+            })
+        return [{"role": "assistant", "content": None, "tool_calls": tool_calls}, *tool_messages]
+
+    def _set_segment_result(self, event: AstrMessageEvent, segment: str, index: int):
+        '''设置流式输出的一个片段作为事件结果'''
+        result = MessageEventResult().message(segment).set_result_content_type(ResultContentType.LLM_RESULT)
+        result.stream_segment_index = index
+        event.set_result(result)
\ No newline at end of file
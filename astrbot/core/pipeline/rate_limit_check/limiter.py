@@ -0,0 +1,59 @@
+import time
+from typing import Dict, Hashable
+
+class GCRALimiter():
+    '''基于 GCRA（Generic Cell Rate Algorithm）的限流器，等价于容量为 count、每 period/count 秒补充一个令牌的令牌桶。
+    
+    每个 key 只保存一个浮点数：理论到达时间（TAT）。TAT 不晚于当前时间的 key 处于空闲状态（令牌桶已满），
+    和不存在的 key 没有区别，会在定期清理时被删除，因此内存只与最近活跃的 key 数量有关。
+    
+    所有操作都是同步的，在 asyncio 中天然是原子的，不需要加锁。
+    '''
+    def __init__(self, count: int, period: float):
+        self.count = max(1, count)
+        self.period = max(0.0, period)
+        self.interval = self.period / self.count
+        '''两个令牌之间的间隔'''
+        self._tat: Dict[Hashable, float] = {}
+        self._next_sweep = 0.0
+        
+    def _wait(self, key: Hashable, now: float) -> float:
+        tat = self._tat.get(key, now)
+        if tat < now:
+            tat = now
+        return tat + self.interval - self.period - now
+        
+    def peek(self, key: Hashable, now: float = None) -> float:
+        '''检查 key 现在能否获取令牌，不改变状态。返回 0 表示可以获取，否则为需要等待的秒数'''
+        if now is None:
+            now = time.monotonic()
+        return max(0.0, self._wait(key, now))
+        
+    def acquire(self, key: Hashable, reserve: bool = False, now: float = None) -> float:
+        '''尝试为 key 获取一个令牌。
+        
+        Args:
+            reserve: 没有令牌时是否预约下一个可用的令牌。预约后调用方应当等待返回的秒数再继续。
+            now: 当前时间（time.monotonic()），主要用于测试
+        
+        Returns:
+            0 表示获取成功；否则为需要等待的秒数。reserve 为 False 时，获取失败不会改变状态。
+        '''
+        if now is None:
+            now = time.monotonic()
+        if now >= self._next_sweep:
+            self.evict_idle(now)
+        wait = self._wait(key, now)
+        if wait <= 0 or reserve:
+            self._tat[key] = max(self._tat.get(key, now), now) + self.interval
+        return max(0.0, wait)
+    
+    def evict_idle(self, now: float = None):
+        '''删除所有空闲的 key。每个 period 最多自动执行一次'''
+        if now is None:
+            now = time.monotonic()
+        self._tat = {key: tat for key, tat in self._tat.items() if tat > now}
+        self._next_sweep = now + max(self.period, 1.0)
+        
+    def __len__(self) -> int:
+        return len(self._tat)
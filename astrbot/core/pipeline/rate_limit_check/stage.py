@@ -1,87 +1,105 @@
 import asyncio
-from datetime import datetime, timedelta
-from collections import defaultdict, deque
-from typing import DefaultDict, Deque, Union, AsyncGenerator
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Union, AsyncGenerator
 from ..stage import Stage, register_stage
 from ..context import PipelineContext
+from .limiter import GCRALimiter
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.message.message_event_result import MessageEventResult
 from astrbot.core import logger
 from astrbot.core.config.astrbot_config import RateLimitStrategy
 
+@dataclass
+class RateLimitLevel():
+    '''一个级别的限流'''
+    name: str
+    description: str
+    '''用于日志和提示，如 "会话"'''
+    get_key: Callable[[AstrMessageEvent], str]
+    limiter: GCRALimiter
+    strategy: RateLimitStrategy
+
+LEVEL_KEYS: Dict[str, Callable[[AstrMessageEvent], str]] = {
+    "sender": lambda event: f"{event.get_platform_name()}:{event.get_sender_id()}",
+    "session": lambda event: event.unified_msg_origin,
+    "platform": lambda event: event.get_platform_name(),
+    "global": lambda event: "global",
+}
+'''各个级别的限流 key。按照检查的顺序排列'''
+
+LEVEL_DESCRIPTIONS = {
+    "sender": "发送者",
+    "session": "会话",
+    "platform": "消息平台",
+    "global": "全局",
+}
+
+rate_limit_stats: Dict[str, Dict[str, int]] = {}
+'''各级限流的统计。key 是级别名，value 中 rejected 为被丢弃的事件数，stalled 为被暂停的事件数'''
 
 @register_stage
-class RateLimitStage(Stage):
+class RateLimitCheckStage(Stage):
     """
     检查是否需要限制消息发送的限流器。
 
-    使用 Fixed Window 算法。
-    如果触发限流，将 stall 流水线，直到下一个时间窗口来临时自动唤醒。
+    按发送者、会话、消息平台、全局四个级别限流，一条消息需要同时满足所有启用的级别。
+    每个级别使用 GCRA 算法（令牌桶），每个 key 只保存一个时间戳，空闲的 key 会被定期清理。
+    
+    先检查所有 discard 策略的级别，任意一个超限则丢弃事件，不消耗任何级别的令牌；
+    否则在所有级别获取（或预约）令牌，并按 stall 策略的级别中最长的等待时间 stall 流水线。
+    等待期间不持有任何锁。
     """
 
     def __init__(self):
-        # 存储每个会话的请求时间队列
-        self.event_timestamps: DefaultDict[str, Deque[datetime]] = defaultdict(deque)
-        # 为每个会话设置一个锁，避免并发冲突
-        self.locks: DefaultDict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
-        # 限流参数
-        self.rate_limit_count: int = 0
-        self.rate_limit_time: timedelta = timedelta(0)
+        self.levels: List[RateLimitLevel] = []
 
     async def initialize(self, ctx: PipelineContext) -> None:
         """
-        初始化限流器，根据配置设置限流参数。
+        初始化限流器，根据配置设置限流参数。会话级别的配置位于 rate_limit 下，其他级别的配置位于 rate_limit 的同名子项下。
         """
-        self.rate_limit_count = ctx.astrbot_config['platform_settings']['rate_limit']['count']
-        self.rate_limit_time = timedelta(seconds=ctx.astrbot_config['platform_settings']['rate_limit']['time'])
-        self.rl_strategy = ctx.astrbot_config['platform_settings']['rate_limit']['strategy'] # stall or discard
+        rate_limit = ctx.astrbot_config['platform_settings']['rate_limit']
+        self.levels = []
+        for name, get_key in LEVEL_KEYS.items():
+            level_cfg = rate_limit if name == "session" else rate_limit.get(name, {})
+            if name != "session" and not level_cfg.get("enable", False):
+                continue
+            self.levels.append(RateLimitLevel(
+                name=name,
+                description=LEVEL_DESCRIPTIONS[name],
+                get_key=get_key,
+                limiter=GCRALimiter(level_cfg['count'], level_cfg['time']),
+                strategy=RateLimitStrategy(level_cfg['strategy']) # stall or discard
+            ))
+        rate_limit_stats.clear()
+        for level in self.levels:
+            rate_limit_stats[level.name] = {"rejected": 0, "stalled": 0}
 
     async def process(self, event: AstrMessageEvent) -> Union[None, AsyncGenerator[None, None]]:
         """
-        检查并处理限流逻辑。如果触发限流，流水线会 stall 并在窗口期后自动恢复。
+        检查并处理限流逻辑。如果触发限流，流水线会 stall 直到令牌可用，或者丢弃事件。
 
         Args:
             event (AstrMessageEvent): 当前消息事件。
-            ctx (PipelineContext): 流水线上下文。
-
-        Returns:
-            MessageEventResult: 继续或停止事件处理的结果。
         """
-        session_id = event.session_id
-        now = datetime.now()
-
-        async with self.locks[session_id]:  # 确保同一会话不会并发修改队列
-            timestamps = self.event_timestamps[session_id]
-
-            self._remove_expired_timestamps(timestamps, now)
-
-            if len(timestamps) >= self.rate_limit_count:
-                # 达到限流阈值，计算下一个窗口的时间
-                next_window_time = timestamps[0] + self.rate_limit_time
-                stall_duration = (next_window_time - now).total_seconds()
-                
-                match self.rl_strategy:
-                    case RateLimitStrategy.STALL:
-                        logger.info(f"会话 {session_id} 被限流。根据限流策略，此会话处理将被暂停 {stall_duration:.2f} 秒。")
-                        await asyncio.sleep(stall_duration)
-                    case RateLimitStrategy.DISCARD:
-                        event.set_result(MessageEventResult().message(f"会话 {session_id} 被限流。根据限流策略，此请求已被丢弃，直到您的限额于 {stall_duration:.2f} 秒后重置。"))
-                        return event.stop_event()
-                
-                self._remove_expired_timestamps(timestamps, now + timedelta(seconds=stall_duration))
-
-            timestamps.append(now)
+        keys = [level.get_key(event) for level in self.levels]
+        
+        for level, key in zip(self.levels, keys):
+            if level.strategy != RateLimitStrategy.DISCARD:
+                continue
+            wait = level.limiter.peek(key)
+            if wait > 0:
+                rate_limit_stats[level.name]["rejected"] += 1
+                event.set_result(MessageEventResult().message(f"{level.description} {key} 被限流。根据限流策略，此请求已被丢弃，直到您的限额于 {wait:.2f} 秒后重置。"))
+                return event.stop_event()
+        
+        stall_level, stall_key, max_wait = None, None, 0.0
+        for level, key in zip(self.levels, keys):
+            wait = level.limiter.acquire(key, reserve=True)
+            if wait > max_wait:
+                stall_level, stall_key, max_wait = level, key, wait
+        if stall_level:
+            rate_limit_stats[stall_level.name]["stalled"] += 1
+            logger.info(f"{stall_level.description} {stall_key} 被限流。根据限流策略，此会话处理将被暂停 {max_wait:.2f} 秒。")
+            await asyncio.sleep(max_wait)
 
         return event.continue_event()
-
-    def _remove_expired_timestamps(self, timestamps: Deque[datetime], now: datetime) -> None:
-        """
-        移除时间窗口外的时间戳。
-
-        Args:
-            timestamps (Deque[datetime]): 当前会话的时间戳队列。
-            now (datetime): 当前时间，用于计算过期时间。
-        """
-        expiry_threshold: datetime = now - self.rate_limit_time
-        while timestamps and timestamps[0] < expiry_threshold:
-            timestamps.popleft() 
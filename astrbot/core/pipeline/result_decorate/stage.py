@@ -26,12 +26,12 @@ class ResultDecorateStage:
             await handler.handler(event)
         
         if len(result.chain) > 0:
-            # 回复前缀
-            if self.reply_prefix:
+            # 回复前缀。流式输出时只加在第一个片段上
+            if self.reply_prefix and not result.stream_segment_index:
                 result.chain.insert(0, Plain(self.reply_prefix))
             
-            # 文本转图片
-            if (result.use_t2i_ is None and self.t2i) or result.use_t2i_:
+            # 文本转图片。流式输出的片段不转换
+            if result.stream_segment_index is None and ((result.use_t2i_ is None and self.t2i) or result.use_t2i_):
                 plain_str = ""
                 for comp in result.chain:
                     if isinstance(comp, Plain):
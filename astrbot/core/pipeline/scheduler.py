@@ -1,44 +1,123 @@
+import time
+import inspect
+import logging
+from dataclasses import dataclass
+from typing import AsyncGenerator, Callable, List, Tuple
 from . import STAGES_ORDER
-from .stage import registered_stages
+from .stage import registered_stages, Stage
 from .context import PipelineContext
-from typing import AsyncGenerator
 from astrbot.core.platform import AstrMessageEvent
 from astrbot.core import logger
+from astrbot.core.utils.latency import LatencyHistogram, stage_latency, pipeline_latency
+
+@dataclass(frozen=True)
+class PlannedStage():
+    '''执行计划中的一个阶段。在 `PipelineScheduler.initialize()` 时预先编译。'''
+
+    name: str
+    process: Callable[[AstrMessageEvent], AsyncGenerator[None, None]]
+    '''阶段的 process 方法'''
+    is_async_gen: bool
+    '''process 是否是异步生成器函数'''
+    exec_log: str
+    stop_log: str
+    latency: LatencyHistogram
+    '''记录该阶段每个事件的耗时'''
 
 class PipelineScheduler():
     def __init__(self, context: PipelineContext):
         registered_stages.sort(key=lambda x: STAGES_ORDER.index(x.__class__ .__name__))
         self.ctx = context
-        
+        self.plan: Tuple[PlannedStage, ...] = ()
+        '''编译好的执行计划'''
+
     async def initialize(self):
         for stage in registered_stages:
             logger.debug(f"初始化阶段 {stage.__class__ .__name__}")
-            
+
             await stage.initialize(self.ctx)
-            
-    async def _process_stages(self, event: AstrMessageEvent, from_stage=0):
-        for i in range(from_stage, len(registered_stages)):
-            stage = registered_stages[i]
-            logger.debug(f"执行阶段 {stage.__class__ .__name__}")
-            coro = stage.process(event)
-            if isinstance(coro, AsyncGenerator):
-                async for _ in coro:
-                    if event.is_stopped():
-                        logger.debug(f"阶段 {stage.__class__ .__name__} 已终止事件传播。")
-                        break
-                    await self._process_stages(event, i + 1)
-            else:
-                await coro
+        self.plan = self.compile_plan(registered_stages)
+
+    @staticmethod
+    def compile_plan(stages: List[Stage]) -> Tuple[PlannedStage, ...]:
+        '''将有序的阶段列表编译为扁平的执行计划'''
+        plan = []
+        for stage in stages:
+            name = stage.__class__.__name__
+            plan.append(PlannedStage(
+                name=name,
+                process=stage.process,
+                is_async_gen=inspect.isasyncgenfunction(stage.process),
+                exec_log=f"执行阶段 {name}",
+                stop_log=f"阶段 {name} 已终止事件传播。",
+                latency=stage_latency.get(name)
+            ))
+        return tuple(plan)
 
+    async def _process_stages(self, event: AstrMessageEvent):
+        '''按照执行计划执行各个阶段。
+
+        当一个阶段是异步生成器时，它每 yield 一次，其后的所有阶段都会被完整执行一次；生成器结束后，再继续执行其后的阶段。
+        这里用一个显式的栈保存被挂起的生成器，而不是递归调用。
+        
+        每个阶段的耗时只计算该阶段自身代码的执行时间，不包括生成器挂起期间执行其后阶段的时间。
+        '''
+        plan = self.plan
+        n = len(plan)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        perf_counter = time.perf_counter
+        stack: List[List] = [] # [阶段下标, 生成器, 累计耗时]
+        i = 0
+        while True:
+            # 依次执行阶段，直到遇到异步生成器阶段、事件被终止或者到达末尾
+            while i < n:
+                planned = plan[i]
+                if debug:
+                    logger.debug(planned.exec_log)
+                if planned.is_async_gen:
+                    stack.append([i, planned.process(event), 0.0])
+                    break
+                start = perf_counter()
+                await planned.process(event)
+                planned.latency.record(perf_counter() - start)
                 if event.is_stopped():
-                    logger.debug(f"阶段 {stage.__class__ .__name__} 已终止事件传播。")
+                    if debug:
+                        logger.debug(planned.stop_log)
                     break
+                i += 1
 
-            if event.is_stopped():
-                logger.debug(f"阶段 {stage.__class__ .__name__} 已终止事件传播。")
+            # 恢复最近一个被挂起的生成器
+            while stack:
+                frame = stack[-1]
+                idx = frame[0]
+                start = perf_counter()
+                try:
+                    await frame[1].__anext__()
+                except StopAsyncIteration:
+                    frame[2] += perf_counter() - start
+                    plan[idx].latency.record(frame[2])
+                    stack.pop()
+                    if event.is_stopped():
+                        if debug:
+                            logger.debug(plan[idx].stop_log)
+                        continue
+                    i = idx + 1
+                    break
+                frame[2] += perf_counter() - start
+                if event.is_stopped():
+                    if debug:
+                        logger.debug(plan[idx].stop_log)
+                    plan[idx].latency.record(frame[2])
+                    stack.pop()
+                    continue
+                i = idx + 1
                 break
-    
+            else:
+                return
+
     async def execute(self, event: AstrMessageEvent):
         '''执行 pipeline'''
+        start = time.perf_counter()
         await self._process_stages(event)
-        logger.debug("pipeline 执行完毕。")
\ No newline at end of file
+        pipeline_latency.record(time.perf_counter() - start)
+        logger.debug("pipeline 执行完毕。")
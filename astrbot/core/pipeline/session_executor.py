@@ -0,0 +1,56 @@
+import traceback
+from collections import deque
+from typing import Deque, Dict
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core import logger
+from .scheduler import PipelineScheduler
+
+class SessionOrderedExecutor():
+    '''按会话分片的流水线执行器。
+
+    同一会话（`unified_msg_origin`）的事件严格按照到达顺序依次执行，不同会话的事件互不阻塞、并行执行。
+
+    当某个会话正在被处理时，该会话后续到达的事件会进入这个会话的待处理队列，由正在处理该会话的协程在处理完当前事件后依次取出执行。
+    因此，一个会话在同一时刻最多只占用一个 EventBus 工作协程。
+    '''
+    def __init__(self, pipeline_scheduler: PipelineScheduler, max_pending_per_session: int = 0):
+        self.pipeline_scheduler = pipeline_scheduler
+        self.max_pending_per_session = max_pending_per_session
+        '''每个会话最多排队等待处理的事件数。小于等于 0 表示不限制。超出的事件会被丢弃且不会回复，因此默认不限制'''
+        self._mailboxes: Dict[str, Deque[AstrMessageEvent]] = {}
+        '''正在处理中的会话及其待处理事件队列'''
+        self.dropped = 0
+        '''因会话待处理队列已满而被丢弃的事件数'''
+
+    async def execute(self, event: AstrMessageEvent):
+        '''执行一个事件。如果该事件所在的会话正在被处理，那么事件会排队并立即返回。'''
+        key = event.unified_msg_origin
+        mailbox = self._mailboxes.get(key)
+        if mailbox is not None:
+            if 0 < self.max_pending_per_session <= len(mailbox):
+                self.dropped += 1
+                logger.warning(f"会话 {key} 待处理的事件过多，已丢弃此事件。")
+                return
+            mailbox.append(event)
+            return
+
+        mailbox = self._mailboxes[key] = deque()
+        try:
+            while True:
+                try:
+                    await self.pipeline_scheduler.execute(event)
+                except Exception:
+                    logger.error(traceback.format_exc())
+                if not mailbox:
+                    break
+                event = mailbox.popleft()
+        finally:
+            del self._mailboxes[key]
+
+    def get_stats(self) -> dict:
+        '''获取执行器的运行状态'''
+        return {
+            "active_sessions": len(self._mailboxes),
+            "pending": sum(len(mailbox) for mailbox in self._mailboxes.values()),
+            "session_dropped": self.dropped,
+        }
@@ -1,10 +1,13 @@
 from __future__ import annotations
 import abc
+import time
 import inspect
+import functools
 from typing import List, AsyncGenerator, Union, Awaitable
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from .context import PipelineContext
 from astrbot.core.message.message_event_result import MessageEventResult, CommandResult
+from astrbot.core.utils.latency import handler_latency
 
 registered_stages: List[Stage] = []
 '''维护了所有已注册的 Stage 实现类'''
@@ -38,29 +41,51 @@ class Stage(abc.ABC):
         handler: Awaitable,
         **params
     ) -> AsyncGenerator[None, None]:
-        '''调用 Handler。'''
-        # 判断 handler 是否是类方法（通过装饰器注册的没有 __self__ 属性）
-        ready_to_call = None
-        try:
-            ready_to_call = handler(event, **params)
-        except TypeError as e:
-            print(e)
-            # 向下兼容
-            ready_to_call = handler(event, ctx.plugin_manager.context, **params)
+        '''调用 Handler。
         
-        if isinstance(ready_to_call, AsyncGenerator):
-            async for ret in ready_to_call:
-                # 如果处理函数是生成器，返回值只能是 MessageEventResult 或者 None（无返回值）
+        Handler 自身的执行耗时会被记录到 `handler_latency` 中，不包括 yield 之后流水线处理结果的时间。
+        '''
+        latency = handler_latency.get(_get_handler_full_name(handler))
+        elapsed = 0.0
+        start = time.perf_counter()
+        try:
+            # 判断 handler 是否是类方法（通过装饰器注册的没有 __self__ 属性）
+            ready_to_call = None
+            try:
+                ready_to_call = handler(event, **params)
+            except TypeError as e:
+                print(e)
+                # 向下兼容
+                ready_to_call = handler(event, ctx.plugin_manager.context, **params)
+            
+            if isinstance(ready_to_call, AsyncGenerator):
+                async for ret in ready_to_call:
+                    elapsed += time.perf_counter() - start
+                    start = None
+                    # 如果处理函数是生成器，返回值只能是 MessageEventResult 或者 None（无返回值）
+                    if isinstance(ret, (MessageEventResult, CommandResult)):
+                        event.set_result(ret)
+                        yield
+                    else:
+                        yield ret
+                    start = time.perf_counter()
+            elif inspect.iscoroutine(ready_to_call):
+                # 如果只是一个 coroutine
+                ret = await ready_to_call
+                elapsed += time.perf_counter() - start
+                start = None
                 if isinstance(ret, (MessageEventResult, CommandResult)):
                     event.set_result(ret)
                     yield
                 else:
                     yield ret
-        elif inspect.iscoroutine(ready_to_call):
-            # 如果只是一个 coroutine
-            ret = await ready_to_call
-            if isinstance(ret, (MessageEventResult, CommandResult)):
-                event.set_result(ret)
-                yield
-            else:
-                yield ret
\ No newline at end of file
+        finally:
+            if start is not None:
+                elapsed += time.perf_counter() - start
+            latency.record(elapsed)
+
+def _get_handler_full_name(handler: Awaitable) -> str:
+    '''获取 Handler 的全名，与 StarHandlerMetadata.handler_full_name 的格式一致'''
+    if isinstance(handler, functools.partial):
+        handler = handler.func
+    return f"{getattr(handler, '__module__', '')}_{getattr(handler, '__name__', repr(handler))}"
@@ -4,8 +4,9 @@ from typing import Union, AsyncGenerator
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.message.message_event_result import MessageEventResult
 from astrbot.core.message.components import At
-from astrbot.core.star.star_handler import star_handlers_registry, EventType
 from astrbot.core.star.filter.command_group import CommandGroupFilter
+from astrbot.core.star.filter.regex import RegexFilter
+from astrbot.core.star.command_index import command_index
 
 
 @register_stage
@@ -68,9 +69,12 @@ class WakingCheckStage(Stage):
                 wake_prefix = ""
 
         # 检查插件的 handler filter
+        # 通过指令索引，只检查第一个词对应的指令 handler 和非指令 handler
         activated_handlers = []
         handlers_parsed_params = {}  # 注册了指令的 handler
-        for handler in star_handlers_registry.get_handlers_by_event_type(EventType.AdapterMessageEvent):
+        parsed_message = event.get_parsed_message()
+        regex_matched = None  # 所有 RegexFilter 的匹配结果，在第一次用到时计算
+        for handler in command_index.get_candidates(parsed_message.first_token()):
             # filter 需要满足 AND 的逻辑关系
             passed = True
             child_command_handler_md = None
@@ -91,6 +95,12 @@ class WakingCheckStage(Stage):
                         else:
                             handler = child_command_handler_md  # handler 覆盖
                             break
+                    elif isinstance(filter, RegexFilter) and filter in command_index.regex_dispatcher:
+                        if regex_matched is None:
+                            regex_matched = command_index.match_regex_filters(parsed_message.text)
+                        if filter not in regex_matched:
+                            passed = False
+                            break
                     else:
                         if not filter.filter(event, self.ctx.astrbot_config):
                             passed = False
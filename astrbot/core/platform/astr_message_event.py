@@ -4,7 +4,7 @@ from .astrbot_message import AstrBotMessage
 from .platform_metadata import PlatformMetadata
 from astrbot.core.message.message_event_result import MessageEventResult, MessageChain
 from astrbot.core.platform.message_type import MessageType
-from typing import List, Union
+from typing import List, Union, Tuple
 from astrbot.core.message.components import Plain, Image, BaseMessageComponent, Face, At, AtAll, Forward
 from astrbot.core.utils.metrics import Metric
 from astrbot.core.provider.entites import ProviderRequest
@@ -24,6 +24,30 @@ class MessageSesion:
         platform_name, message_type, session_id = session_str.split(":")
         return MessageSesion(platform_name, MessageType(message_type), session_id)
 
+@dataclass(frozen=True)
+class ParsedMessage:
+    '''消息字符串的分词结果。由 `AstrMessageEvent.get_parsed_message()` 生成并缓存，各个 filter 共享同一份结果。'''
+    
+    source: str
+    '''分词时的 message_str。用于判断 message_str 是否被改写过'''
+    text: str
+    '''去除首尾空白后的消息字符串。在 WakingCheckStage 之后，已经去除了唤醒前缀'''
+    tokens: Tuple[str, ...]
+    '''按空白分割后的词，不包含空字符串'''
+    
+    @staticmethod
+    def parse(message_str: str) -> "ParsedMessage":
+        text = message_str.strip()
+        return ParsedMessage(source=message_str, text=text, tokens=tuple(text.split()))
+    
+    def first_token(self) -> str:
+        '''获取第一个词。消息为空时返回空字符串'''
+        return self.tokens[0] if self.tokens else ""
+    
+    def args(self, offset: int = 1) -> Tuple[str, ...]:
+        '''获取从第 offset 个词开始的剩余参数'''
+        return self.tokens[offset:]
+
 class AstrMessageEvent(abc.ABC):
     def __init__(self, 
                 message_str: str,
@@ -37,6 +61,7 @@ class AstrMessageEvent(abc.ABC):
         self.role = "member"
         self.is_wake = False
         self._extras = {}
+        self._parsed_message: ParsedMessage = None
         self.session = MessageSesion(
             platform_name=platform_meta.name,
             message_type=message_obj.type,
@@ -63,6 +88,17 @@ class AstrMessageEvent(abc.ABC):
         '''
         return self.message_str
     
+    def get_parsed_message(self) -> ParsedMessage:
+        '''
+        获取消息字符串的分词结果。
+        
+        结果会被缓存，直到 message_str 被改写。返回的对象是不可变的，filter 不应该通过改写 message_str 来传递信息。
+        '''
+        parsed = self._parsed_message
+        if parsed is None or parsed.source is not self.message_str:
+            parsed = self._parsed_message = ParsedMessage.parse(self.message_str)
+        return parsed
+    
     def _outline_chain(self, chain: List[BaseMessageComponent]) -> str:
         outline = ""
         for i in chain:
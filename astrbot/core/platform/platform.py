@@ -1,17 +1,20 @@
 import abc
 from typing import Awaitable, Any
-from asyncio import Queue
+from asyncio import Queue, QueueFull
 from .platform_metadata import PlatformMetadata
 from .astr_message_event import AstrMessageEvent
 from astrbot.core.message.message_event_result import MessageChain
 from .astr_message_event import MessageSesion
 from astrbot.core.utils.metrics import Metric
+from astrbot.core import logger
 
 class Platform(abc.ABC):
     def __init__(self, event_queue: Queue):
         super().__init__()
         # 维护了消息平台的事件队列，EventBus 会从这里取出事件并处理。
         self._event_queue = event_queue
+        self.dropped_events = 0
+        '''因事件队列已满而被丢弃的事件数'''
     
     @abc.abstractmethod
     def run(self) -> Awaitable[Any]:
@@ -35,8 +38,16 @@ class Platform(abc.ABC):
         '''            
         await Metric.upload(msg_event_tick = 1, adapter_name = self.meta().name)
     
-    def commit_event(self, event: AstrMessageEvent):
+    def commit_event(self, event: AstrMessageEvent) -> bool:
         '''
         提交一个事件到事件队列。
+        
+        当事件队列已满时，事件会被丢弃并返回 False。适配器可以据此做出反应，比如提示用户稍后再试。
         '''
-        self._event_queue.put_nowait(event)
\ No newline at end of file
+        try:
+            self._event_queue.put_nowait(event)
+        except QueueFull:
+            self.dropped_events += 1
+            logger.warning(f"事件队列已满，已丢弃来自 {self.meta().name} 的事件。当前已丢弃 {self.dropped_events} 个事件。")
+            return False
+        return True
\ No newline at end of file
@@ -0,0 +1,80 @@
+'''
+提供商的并发限制。
+
+每个提供商同时进行的请求数不超过 max_concurrency，超出的请求排队等待。
+排队的请求数超过 max_queue 时，新的请求直接被拒绝；排队超过 queue_timeout 秒的请求也会被拒绝。
+'''
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from astrbot.core.utils.latency import LatencyHistogram
+
+class ProviderBusyError(Exception):
+    '''提供商繁忙，请求被拒绝'''
+
+class ConcurrencyLimiter():
+    def __init__(self, max_concurrency: int = 0, max_queue: int = 0, queue_timeout: float = 0):
+        '''
+        Args:
+            max_concurrency: 最大并发数。小于等于 0 表示不限制
+            max_queue: 最大排队数。小于等于 0 表示不限制
+            queue_timeout: 最长排队时间（秒）。小于等于 0 表示不限制
+        '''
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        '''因为队列已满被拒绝的请求数'''
+        self.timed_out = 0
+        '''因为排队超时被拒绝的请求数'''
+        self.wait_latency = LatencyHistogram()
+        '''请求的排队时间'''
+
+    async def _acquire(self):
+        if self._semaphore is None:
+            return
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            self.wait_latency.record(0.0)
+            return
+        if self.max_queue > 0 and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise ProviderBusyError(f"请求过多，排队的请求数已达到上限 {self.max_queue}。")
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            if self.queue_timeout > 0:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            else:
+                await self._semaphore.acquire()
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise ProviderBusyError(f"请求过多，排队超过 {self.queue_timeout} 秒。")
+        finally:
+            self.queued -= 1
+            self.wait_latency.record(time.perf_counter() - start)
+
+    @asynccontextmanager
+    async def slot(self):
+        '''占用一个并发名额，直到退出上下文'''
+        await self._acquire()
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+    def get_stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait": self.wait_latency.snapshot(),
+        }
@@ -27,6 +27,9 @@ class ProviderRequest():
     system_prompt: str = ""
     '''系统提示词'''
     
+    tool_messages: List = None
+    '''本次请求中工具调用的记录，接在提示词之后发送。包括 assistant 的 tool_calls 记录和 tool 角色的工具结果记录'''
+    
     
 @dataclass
 class LLMResponse:
@@ -37,4 +40,8 @@ class LLMResponse:
     tools_call_args: List[Dict[str, any]] = None
     '''工具调用参数'''
     tools_call_name: List[str] = None
-    '''工具调用名称'''
\ No newline at end of file
+    '''工具调用名称'''
+    tools_call_ids: List[str] = None
+    '''工具调用 ID，与 tools_call_name 一一对应'''
+    is_chunk: bool = False
+    '''是否是流式输出中的一个文本增量。为 True 时，completion_text 只是新产生的部分'''
\ No newline at end of file
@@ -1,7 +1,8 @@
 import json
 import textwrap
-from typing import Dict, List, Awaitable
+from typing import Dict, List, Awaitable, Optional, Tuple
 from dataclasses import dataclass
+from astrbot.core.utils.ttl_cache import TTLCache
 
 
 @dataclass
@@ -17,6 +18,9 @@ class FuncTool:
 
     active: bool = True
     '''是否激活'''
+    
+    cache_ttl: float = 0
+    '''工具返回值的缓存时间（秒）。大于 0 时，相同参数的调用在缓存时间内直接返回缓存的结果。默认不缓存'''
 
 SUPPORTED_TYPES = [
     "string",
@@ -30,6 +34,35 @@ SUPPORTED_TYPES = [
 class FuncCall:
     def __init__(self) -> None:
         self.func_list: List[FuncTool] = []
+        self._index: Dict[str, FuncTool] = {}
+        '''工具名 -> 工具。同名的工具只索引最早添加的一个，与按顺序查找的结果一致'''
+        self.version = 0
+        '''工具列表的版本号。添加、删除、激活、停用工具时递增'''
+        self._schema_cache: Tuple[Tuple[int, int], list] = None
+        '''缓存的 OpenAI 风格的工具描述。key 是 (version, len(func_list))'''
+        self.result_cache = TTLCache(max_size=256, ttl=600, max_bytes=8 << 20)
+        '''工具返回值的缓存。只缓存设置了 cache_ttl 的工具'''
+        
+    def configure_cache(self, max_entries: int = 256, max_memory_mb: float = 8):
+        '''设置工具返回值缓存的大小。会清空已有的缓存'''
+        self.result_cache = TTLCache(max_size=max_entries, ttl=600, max_bytes=int(max_memory_mb * (1 << 20)))
+        
+    @staticmethod
+    def make_cache_key(name: str, args: dict) -> str:
+        '''由工具名和规范化的参数（按键排序的 JSON）生成缓存键'''
+        return name + ":" + json.dumps(args, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    
+    def get_cached_result(self, func_tool: FuncTool, args: dict) -> Optional[str]:
+        '''获取缓存的工具返回值。工具没有启用缓存或者未命中时返回 None'''
+        if func_tool.cache_ttl <= 0:
+            return None
+        return self.result_cache.get(self.make_cache_key(func_tool.name, args))
+    
+    def set_cached_result(self, func_tool: FuncTool, args: dict, result: str):
+        if func_tool.cache_ttl <= 0 or result is None:
+            return
+        result = str(result)
+        self.result_cache.set(self.make_cache_key(func_tool.name, args), result, ttl=func_tool.cache_ttl, size=len(result.encode("utf-8")))
 
     def empty(self) -> bool:
         return len(self.func_list) == 0
@@ -40,6 +73,7 @@ class FuncCall:
         func_args: list,
         desc: str,
         handler: Awaitable,
+        cache_ttl: float = 0,
     ) -> None:
         """
         为函数调用（function-calling / tools-use）添加工具。
@@ -48,6 +82,7 @@ class FuncCall:
         @param func_args: 函数参数列表，格式为 [{"type": "string", "name": "arg_name", "description": "arg_description"}, ...]
         @param desc: 函数描述
         @param func_obj: 处理函数
+        @param cache_ttl: 返回值的缓存时间（秒）。0 表示不缓存
         """
         params = {
             "type": "object",  # hard-coded here
@@ -63,28 +98,61 @@ class FuncCall:
             parameters=params,
             description=desc,
             handler=handler,
+            cache_ttl=cache_ttl,
         )
         self.func_list.append(_func)
+        self._index.setdefault(name, _func)
+        self.version += 1
 
     def remove_func(self, name: str) -> None:
         """
         删除一个函数调用工具。
         """
         for i, f in enumerate(self.func_list):
-            if f["name"] == name:
+            if f.name == name:
                 self.func_list.pop(i)
                 break
+        self._index.pop(name, None)
+        for f in self.func_list:
+            if f.name == name:
+                self._index[name] = f
+                break
+        self.version += 1
 
     def get_func(self, name) -> FuncTool:
+        func = self._index.get(name)
+        if func is None and len(self._index) != len(self.func_list):
+            # func_list 被直接修改过，重建索引
+            self._reindex()
+            func = self._index.get(name)
+        return func
+
+    def _reindex(self):
+        self._index = {}
         for f in self.func_list:
-            if f.name == name:
-                return f
-        return None
+            self._index.setdefault(f.name, f)
+
+    def set_active(self, name: str, active: bool) -> bool:
+        """
+        激活或者停用一个工具。没找到时返回 False
+        """
+        func = self.get_func(name)
+        if func is None:
+            return False
+        if func.active != active:
+            func.active = active
+            self.version += 1
+        return True
 
     def get_func_desc_openai_style(self) -> list:
         """
-        获得 OpenAI API 风格的**已经激活**的工具描述
+        获得 OpenAI API 风格的**已经激活**的工具描述。
+
+        结果会被缓存，直到工具被添加、删除、激活或者停用。请不要修改返回的列表。
         """
+        key = (self.version, len(self.func_list))
+        if self._schema_cache is not None and self._schema_cache[0] == key:
+            return self._schema_cache[1]
         _l = []
         for f in self.func_list:
             if not f.active:
@@ -99,6 +167,7 @@ class FuncCall:
                     },
                 }
             )
+        self._schema_cache = (key, _l)
         return _l
 
     async def func_call(self, question: str, session_id: str, provider) -> tuple:
@@ -0,0 +1,138 @@
+'''
+视觉请求的图片预处理。
+
+将图片（URL、本地路径或者 base64://）转换为 data URL：
+- 并发地下载同一条消息中的多张图片，本地文件在工作线程中读取；
+- 根据文件头识别图片的 MIME 类型；
+- 在工作线程中将边长超过 max_edge 的图片缩小并重新编码，以减少上传的流量和图片占用的 token；
+- 按图片内容的哈希缓存编码后的结果，重试请求或者重复发送同一张图片时不需要重新处理。
+'''
+import io
+import base64
+import asyncio
+import hashlib
+from typing import List, Optional
+from PIL import Image, ImageOps
+from astrbot.core.utils.ttl_cache import TTLCache
+from astrbot.core.utils.io import download_bytes_by_url
+from astrbot.core import logger
+
+def detect_mime(data: bytes) -> str:
+    '''根据文件头识别图片的 MIME 类型。无法识别时返回 image/jpeg'''
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data.startswith(b"BM"):
+        return "image/bmp"
+    return "image/jpeg"
+
+SUPPORTED_MIMES = ("image/png", "image/jpeg", "image/gif", "image/webp")
+'''大模型 API 普遍支持的图片格式。其他格式会被重新编码'''
+
+class ImageProcessor():
+    def __init__(self, max_edge: int = 1568, jpeg_quality: int = 85, cache_entries: int = 64, cache_memory_mb: float = 32):
+        '''
+        Args:
+            max_edge: 图片最长边的上限（像素）。0 表示不缩小
+            jpeg_quality: 重新编码为 JPEG 时的质量
+        '''
+        self.max_edge = max_edge
+        self.jpeg_quality = jpeg_quality
+        self.cache = TTLCache(max_size=cache_entries, ttl=3600, max_bytes=int(cache_memory_mb * (1 << 20)))
+        '''图片内容的哈希 -> 编码后的 data URL'''
+        self.url_cache = TTLCache(max_size=cache_entries * 4, ttl=3600)
+        '''图片 URL -> 图片内容的哈希。重试请求时不需要重新下载'''
+
+    def configure(self, cfg: dict):
+        '''根据 `provider_settings.image_preprocess` 配置。会清空已有的缓存'''
+        self.__init__(
+            cfg.get("max_edge", 1568),
+            cfg.get("jpeg_quality", 85),
+            cfg.get("cache_entries", 64),
+            cfg.get("cache_memory_mb", 32)
+        )
+
+    async def _load(self, image_url: str) -> bytes:
+        if image_url.startswith("base64://"):
+            return base64.b64decode(image_url[len("base64://"):])
+        if image_url.startswith("http"):
+            return await download_bytes_by_url(image_url)
+        if image_url.startswith("file:///"):
+            image_url = image_url[len("file:///"):]
+        return await asyncio.to_thread(self._read_file, image_url)
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _process(self, data: bytes) -> str:
+        '''识别类型，必要时缩小并重新编码，返回 data URL。在工作线程中执行'''
+        mime = detect_mime(data)
+        need_resize = False
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                if getattr(img, "is_animated", False):
+                    # 动图保持原样
+                    raise ValueError("animated image")
+                need_resize = self.max_edge > 0 and max(img.size) > self.max_edge
+                if need_resize or mime not in SUPPORTED_MIMES:
+                    # 重新编码会丢弃 EXIF 中的方向信息，先按方向旋转图片（如竖着拍的手机照片）
+                    img = ImageOps.exif_transpose(img)
+                    if need_resize:
+                        img.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+                    out = io.BytesIO()
+                    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+                        # 保留透明通道
+                        img.save(out, format="PNG", optimize=True)
+                        new_mime = "image/png"
+                    else:
+                        img.convert("RGB").save(out, format="JPEG", quality=self.jpeg_quality, optimize=True)
+                        new_mime = "image/jpeg"
+                    # 重新编码后反而更大时，只要原格式可用就保留原图
+                    if need_resize or mime not in SUPPORTED_MIMES or out.tell() < len(data):
+                        data, mime = out.getvalue(), new_mime
+        except Exception:
+            pass
+        return f"data:{mime};base64," + base64.b64encode(data).decode("utf-8")
+
+    async def encode(self, image_url: str) -> str:
+        '''将图片转换为 data URL'''
+        content_key: Optional[str] = self.url_cache.get(image_url) if image_url.startswith("http") else None
+        if content_key:
+            data_url = self.cache.get(content_key)
+            if data_url:
+                return data_url
+        data = await self._load(image_url)
+        content_key = hashlib.sha256(data).hexdigest()
+        if image_url.startswith("http"):
+            self.url_cache.set(image_url, content_key)
+        data_url = self.cache.get(content_key)
+        if data_url is None:
+            data_url = await asyncio.to_thread(self._process, data)
+            self.cache.set(content_key, data_url, size=len(data_url))
+        return data_url
+
+    async def encode_all(self, image_urls: List[str]) -> List[str]:
+        '''并发地转换多张图片，结果与 image_urls 的顺序一致。无法获取的图片会被跳过，不影响其他图片'''
+        results = await asyncio.gather(*[self.encode(image_url) for image_url in image_urls], return_exceptions=True)
+        data_urls = []
+        for image_url, result in zip(image_urls, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BaseException):
+                logger.warning(f"获取图片 {image_url[:100]} 失败：{type(result).__name__}: {result}。已跳过这张图片。")
+                continue
+            data_urls.append(result)
+        return data_urls
+
+    def get_stats(self) -> dict:
+        return self.cache.get_stats()
+
+image_processor = ImageProcessor()
+'''全局的图片预处理器'''
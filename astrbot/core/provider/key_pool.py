@@ -0,0 +1,144 @@
+'''
+API Key 池。
+
+在提供商配置的多个 API Key 之间分配请求，支持轮询（round_robin）和最少并发（least_in_flight）两种策略。
+返回 429 的 Key 会被冷却一段时间，返回 401/403 的 Key 会被移出 Key 池，直到管理员通过 `/key` 手动切换到它。
+'''
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+from astrbot.core import logger
+
+KEY_STRATEGIES = ("round_robin", "least_in_flight")
+
+@dataclass
+class APIKeyState():
+    key: str
+    in_flight: int = 0
+    '''正在使用这个 Key 的请求数'''
+    requests: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    '''返回 429 的次数'''
+    cooldown_until: float = 0.0
+    '''冷却结束的时间（time.monotonic）'''
+    disabled: bool = False
+    '''是否因为返回 401/403 被移出 Key 池'''
+    last_error: str = ""
+
+    def available(self, now: float) -> bool:
+        return not self.disabled and self.cooldown_until <= now
+
+def get_status_code(error: Exception) -> Optional[int]:
+    '''获取 API 错误的 HTTP 状态码，如 openai.APIStatusError'''
+    status_code = getattr(error, "status_code", None)
+    return status_code if isinstance(status_code, int) else None
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    '''获取 429 响应的 Retry-After 头（秒）'''
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class APIKeyPool():
+    def __init__(self, keys: List[str], strategy: str = "round_robin", cooldown: float = 60):
+        if strategy not in KEY_STRATEGIES:
+            logger.warning(f"未知的 Key 选择策略 {strategy}，将使用 round_robin。")
+            strategy = "round_robin"
+        self.strategy = strategy
+        self.cooldown = cooldown
+        '''返回 429 时 Key 的冷却时间（秒）。响应中带有 Retry-After 时以其为准'''
+        self.states: List[APIKeyState] = [APIKeyState(key) for key in dict.fromkeys(keys) if key]
+        self.pinned: Optional[APIKeyState] = None
+        '''通过 `/key` 指定的 Key。可用时总是优先使用'''
+        self.current: Optional[str] = self.states[0].key if self.states else None
+        '''最近一次选择的 Key'''
+        self._cursor = 0
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def available_count(self) -> int:
+        now = time.monotonic()
+        return sum(1 for state in self.states if state.available(now))
+
+    def pin(self, key: str):
+        '''指定优先使用的 Key。被移出 Key 池的 Key 会被重新启用'''
+        for state in self.states:
+            if state.key == key:
+                break
+        else:
+            state = APIKeyState(key)
+            self.states.append(state)
+        state.disabled = False
+        state.cooldown_until = 0.0
+        self.pinned = state
+        self.current = key
+
+    def _select(self) -> APIKeyState:
+        now = time.monotonic()
+        if self.pinned and self.pinned.available(now):
+            return self.pinned
+        candidates = [state for state in self.states if state.available(now)]
+        if not candidates:
+            # 没有可用的 Key 时，使用最早结束冷却的 Key；所有 Key 都被移出时仍然尝试，让请求返回真实的错误
+            candidates = [state for state in self.states if not state.disabled] or self.states
+            return min(candidates, key=lambda state: state.cooldown_until)
+        if self.strategy == "least_in_flight":
+            return min(candidates, key=lambda state: (state.in_flight, state.requests))
+        state = candidates[self._cursor % len(candidates)]
+        self._cursor += 1
+        return state
+
+    def acquire(self) -> APIKeyState:
+        '''选择一个 Key。请求结束后必须调用 `release`。没有配置 Key 时返回一个 key 为空字符串的状态'''
+        if not self.states:
+            # 没有配置 Key，由客户端使用默认的 Key（如环境变量）
+            return APIKeyState("", in_flight=1, requests=1)
+        state = self._select()
+        state.in_flight += 1
+        state.requests += 1
+        self.current = state.key
+        return state
+
+    def release(self, state: APIKeyState, error: Exception = None) -> bool:
+        '''释放一个 Key。返回请求的错误是否与 Key 有关（429/401/403），此时可以换一个 Key 重试'''
+        state.in_flight -= 1
+        if error is None:
+            return False
+        state.errors += 1
+        state.last_error = str(error)[:200]
+        status_code = get_status_code(error)
+        if status_code == 429:
+            state.rate_limited += 1
+            cooldown = get_retry_after(error) or self.cooldown
+            state.cooldown_until = time.monotonic() + cooldown
+            logger.warning(f"API Key {state.key[:8]} 被限流，冷却 {cooldown} 秒。")
+            return True
+        if status_code in (401, 403):
+            state.disabled = True
+            if self.pinned is state:
+                self.pinned = None
+            logger.warning(f"API Key {state.key[:8]} 无效（{status_code}），已移出 Key 池。")
+            return True
+        return False
+
+    def get_stats(self) -> List[dict]:
+        '''各个 Key 的状态，顺序与 `states` 相同。Key 只显示前 8 位，不同的 Key 可能相同（如 `sk-proj-`），应当按 index 区分'''
+        now = time.monotonic()
+        return [{
+            "index": i,
+            "key": state.key[:8],
+            "in_flight": state.in_flight,
+            "requests": state.requests,
+            "errors": state.errors,
+            "rate_limited": state.rate_limited,
+            "cooldown": round(max(0.0, state.cooldown_until - now), 1),
+            "disabled": state.disabled,
+            "last_error": state.last_error,
+        } for i, state in enumerate(self.states)]
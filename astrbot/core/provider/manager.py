@@ -5,6 +5,9 @@ from typing import List
 from astrbot.core.db import BaseDatabase
 from collections import defaultdict
 from .register import provider_cls_map, llm_tools
+from .response_cache import llm_response_cache
+from .image_processor import image_processor
+from .summarizer import context_summarizer
 from astrbot.core import logger
 
 class ProviderManager():
@@ -17,6 +20,11 @@ class ProviderManager():
         self.curr_provider_inst: Provider = None
         self.loaded_ids = defaultdict(bool)
         self.db_helper = db_helper
+        llm_response_cache.configure(self.provider_settings.get('response_cache', {}))
+        context_summarizer.configure(self.provider_settings.get('summarization', {}), self)
+        tool_cache_cfg = self.provider_settings.get('tool_cache', {})
+        llm_tools.configure_cache(tool_cache_cfg.get('max_entries', 256), tool_cache_cfg.get('max_memory_mb', 8))
+        image_processor.configure(self.provider_settings.get('image_preprocess', {}))
         
         for provider_cfg in self.providers_config:
             if not provider_cfg['enable']:
@@ -31,6 +39,8 @@ class ProviderManager():
                     from .sources.openai_source import ProviderOpenAIOfficial # noqa: F401
                 case "zhipu_chat_completion":
                     from .sources.zhipu_source import ProviderZhipu # noqa: F401
+                case "routing":
+                    from .sources.routing_source import ProviderRouting # noqa: F401
                 case "llm_tuner":
                     logger.info("加载 LLM Tuner 工具 ...")
                     from .sources.llmtuner_source import LLMTunerModelLoader # noqa: F401
@@ -52,6 +62,10 @@ class ProviderManager():
                 traceback.print_exc()
                 logger.error(f"实例化 {provider_config['type']}({provider_config['id']}) 大模型提供商适配器 失败：{e}")
         
+        for inst in self.provider_insts:
+            if inst.provider_config['type'] == "routing":
+                inst.set_providers(self.provider_insts)
+        
         if len(self.provider_insts) > 0:
             self.curr_provider_inst = self.provider_insts[0]
         else:
@@ -1,12 +1,14 @@
 import abc
-import json
-from collections import defaultdict
-from typing import List
+from typing import List, AsyncGenerator
 from astrbot.core.db import BaseDatabase
 from astrbot.core import logger
 from typing import TypedDict
 from astrbot.core.provider.func_tool_manager import FuncCall
 from astrbot.core.provider.entites import LLMResponse
+from astrbot.core.provider.tokenizer import get_tokenizer, count_message_tokens, trim_contexts
+from astrbot.core.provider.key_pool import APIKeyPool
+from astrbot.core.provider.concurrency import ConcurrencyLimiter
+from astrbot.core.provider.session_memory import SessionMemory
 from dataclasses import dataclass
 class Personality(TypedDict):
     prompt: str = ""
@@ -30,8 +32,15 @@ class Provider(abc.ABC):
         self.model_name = ""
         '''当前使用的模型名称'''
         
-        self.session_memory = defaultdict(list)
-        '''维护了 session_id 的上下文，**不包含 system 指令**。'''
+        memory_cfg = provider_settings.get("session_memory", {})
+        self.session_memory = SessionMemory(
+            db_helper,
+            provider_config['type'],
+            persistant_history,
+            memory_cfg.get("max_sessions", 1000),
+            int(memory_cfg.get("max_memory_mb", 64) * (1 << 20))
+        )
+        '''维护了 session_id 的上下文，**不包含 system 指令**。会话的上下文在第一次被访问时从数据库中读取'''
         
         self.provider_config = provider_config
         
@@ -42,14 +51,20 @@ class Provider(abc.ABC):
         
         self.db_helper = db_helper
         '''用于持久化的数据库操作对象。'''
-
-        if persistant_history:
-            # 读取历史记录
-            try:
-                for history in db_helper.get_llm_history(provider_type=provider_config['type']):
-                    self.session_memory[history.session_id] = json.loads(history.content)
-            except BaseException as e:
-                logger.warning(f"读取 LLM 对话历史记录 失败：{e}。仍可正常使用。")
+        
+        self.key_pool = APIKeyPool(
+            provider_config.get("key", []),
+            provider_config.get("key_strategy", "round_robin"),
+            provider_config.get("key_cooldown", 60)
+        )
+        '''API Key 池。提供商适配器在每次请求时从中选择 Key'''
+        
+        self.concurrency = ConcurrencyLimiter(
+            provider_config.get("max_concurrency", 0),
+            provider_config.get("max_queue", 0),
+            provider_config.get("queue_timeout", 0)
+        )
+        '''并发限制。提供商适配器在请求模型时占用一个名额'''
 
     def set_model(self, model_name: str):
         '''设置当前使用的模型名称'''
@@ -59,6 +74,28 @@ class Provider(abc.ABC):
         '''获得当前使用的模型名称'''
         return self.model_name
     
+    def fit_contexts(self, contexts: List[dict], *reserved_messages: dict) -> List[dict]:
+        '''按照提供商配置的上下文长度限制 `max_context_tokens`，从最早的记录开始裁剪上下文。
+        
+        Args:
+            contexts: 上下文
+            reserved_messages: 一定会发送的记录，如系统提示词和本次的提示词。为 None 的记录会被忽略
+            
+        Returns:
+            裁剪后的上下文。没有配置上下文长度限制或者不需要裁剪时返回 contexts 本身
+        '''
+        limit = self.provider_config.get("max_context_tokens", 0)
+        if not limit or limit <= 0 or not contexts:
+            return contexts
+        tokenizer = get_tokenizer(self.get_model())
+        # 为模型的输出预留空间
+        budget = limit - (self.provider_config.get("model_config", {}).get("max_tokens") or 0)
+        budget -= sum(count_message_tokens(message, tokenizer) for message in reserved_messages if message)
+        trimmed = trim_contexts(contexts, budget, tokenizer)
+        if trimmed is not contexts:
+            logger.debug(f"上下文超过长度限制 {limit} tokens，已丢弃最早的 {len(contexts) - len(trimmed)} 条记录。")
+        return trimmed
+    
     @abc.abstractmethod
     def get_current_key(self) -> str:
         raise NotImplementedError()
@@ -112,7 +149,7 @@ class Provider(abc.ABC):
             kwargs: 其他参数
             
         Notes:
-            - 如果传入了 contexts，将会提前加上上下文。否则使用 session_memory 中的上下文。
+            - 如果传入了 contexts，将会提前加上上下文。否则（None 或者空列表）使用 session_memory 中 session_id 对应的上下文。
             - 可以选择性地传入 session_id，如果传入了 session_id，将会使用 session_id 对应的上下文进行对话，
             并且也会记录相应的对话上下文，实现多轮对话。如果不传入则不会记录上下文。
             - 如果传入了 image_urls，将会在对话时附上图片。如果模型不支持图片输入，将会抛出错误。
@@ -120,6 +157,23 @@ class Provider(abc.ABC):
         '''
         raise NotImplementedError()
     
+    async def text_chat_stream(self,
+                               prompt: str,
+                               session_id: str=None,
+                               image_urls: List[str]=None,
+                               func_tool: FuncCall=None,
+                               contexts: List=None,
+                               system_prompt: str=None,
+                               **kwargs) -> AsyncGenerator[LLMResponse, None]:
+        '''流式地获得 LLM 的文本对话结果。参数与 `text_chat` 相同。
+        
+        先产出若干个 `is_chunk` 为 True 的文本增量，最后产出一个完整的 LLMResponse（完整的文本或者工具调用）。
+        上下文只会在最后记录。
+        
+        默认实现不支持流式输出，只产出 `text_chat` 的结果。
+        '''
+        yield await self.text_chat(prompt, session_id, image_urls, func_tool, contexts, system_prompt, **kwargs)
+    
     @abc.abstractmethod
     async def forget(self, session_id: str) -> bool:
         '''重置某一个 session_id 的上下文'''
@@ -0,0 +1,139 @@
+'''
+LLM 回复缓存。
+
+对于不带工具、不带图片的请求，以提供商 ID 和请求体（模型、系统提示词、上下文和提示词）的哈希作为键缓存 LLM 的文本回复，
+相同的请求可以直接返回缓存的回复而不需要再次请求 LLM。
+
+内存中的缓存按照 LRU 和过期时间淘汰，并限制总的内存占用。可选地将回复同时写入 SQLite 数据库，内存中未命中时再查询数据库。
+'''
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import traceback
+from typing import Optional
+from astrbot.core import logger
+from astrbot.core.utils.ttl_cache import TTLCache
+from .entites import LLMResponse
+
+CACHE_DB_PATH = "data/llm_response_cache.db"
+
+class LLMResponseCache():
+    '''LLM 回复缓存。默认不启用'''
+    def __init__(self):
+        self.enable = False
+        self.memory = TTLCache(max_size=1024, ttl=3600, max_bytes=16 << 20)
+        self.ttl = 3600
+        self.conn: Optional[sqlite3.Connection] = None
+        '''SQLite 缓存的连接。为 None 时不使用 SQLite 缓存'''
+        self.disk_hits = 0
+        self.bypassed = 0
+        '''因为带有工具或者图片而跳过缓存的请求数'''
+
+    def configure(self, cfg: dict, db_path: str = CACHE_DB_PATH):
+        '''根据 `provider_settings.response_cache` 配置缓存'''
+        self.enable = cfg.get("enable", False)
+        self.ttl = cfg.get("ttl", 3600)
+        self.memory = TTLCache(
+            max_size=cfg.get("max_entries", 1024),
+            ttl=self.ttl,
+            max_bytes=int(cfg.get("max_memory_mb", 16) * (1 << 20))
+        )
+        self.close()
+        if self.enable and cfg.get("sqlite", False):
+            try:
+                os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+                self.conn = sqlite3.connect(db_path)
+                self.conn.execute('''
+                    CREATE TABLE IF NOT EXISTS llm_response_cache(
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expire_at REAL NOT NULL
+                    )
+                ''')
+                # 启动时清理已经过期的条目
+                self.conn.execute("DELETE FROM llm_response_cache WHERE expire_at > 0 AND expire_at <= ?", (time.time(), ))
+                self.conn.commit()
+            except Exception as e:
+                logger.warning(f"打开 LLM 回复缓存数据库失败：{e}。将只使用内存缓存。")
+                self.conn = None
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    @staticmethod
+    def make_key(provider_id: str, payloads: dict) -> str:
+        '''根据提供商 ID 和请求体生成缓存键。payloads 中包含模型、系统提示词、上下文和提示词'''
+        raw = json.dumps({"provider": provider_id, "payloads": payloads}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def should_bypass(self, payloads: dict, func_tool = None) -> bool:
+        '''带有工具或者图片的请求不使用缓存。只看实际发送的工具，注册了但没有激活的工具不算'''
+        if func_tool and func_tool.get_func_desc_openai_style():
+            return True
+        for message in payloads.get("messages", []):
+            # 带图片的消息的 content 是 list
+            if isinstance(message.get("content"), list):
+                return True
+        return False
+
+    def get(self, key: str) -> Optional[LLMResponse]:
+        text = self.memory.get(key)
+        if text is None and self.conn:
+            try:
+                row = self.conn.execute(
+                    "SELECT value, expire_at FROM llm_response_cache WHERE key = ?", (key, )
+                ).fetchone()
+            except Exception:
+                logger.warning(traceback.format_exc())
+                row = None
+            if row:
+                value, expire_at = row
+                if expire_at and expire_at <= time.time():
+                    self.conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key, ))
+                    self.conn.commit()
+                else:
+                    text = value
+                    self.disk_hits += 1
+                    # 回填到内存中
+                    ttl = expire_at - time.time() if expire_at else 0
+                    self.memory.set(key, text, ttl=ttl, size=len(text.encode("utf-8")))
+        if text is None:
+            return None
+        return LLMResponse("assistant", text)
+
+    def set(self, key: str, llm_response: LLMResponse):
+        '''缓存一个回复。只缓存文本回复'''
+        if not llm_response or llm_response.role != "assistant" or not llm_response.completion_text:
+            return
+        text = llm_response.completion_text
+        self.memory.set(key, text, size=len(text.encode("utf-8")))
+        if self.conn:
+            try:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO llm_response_cache(key, value, expire_at) VALUES (?, ?, ?)",
+                    (key, text, time.time() + self.ttl if self.ttl > 0 else 0)
+                )
+                self.conn.commit()
+            except Exception:
+                logger.warning(traceback.format_exc())
+
+    def get_stats(self) -> dict:
+        memory_stats = self.memory.get_stats()
+        # 内存未命中但 SQLite 命中的请求也算作命中
+        hits = memory_stats["hits"] + self.disk_hits
+        total = memory_stats["hits"] + memory_stats["misses"]
+        return {
+            "enable": self.enable,
+            "sqlite": self.conn is not None,
+            **memory_stats,
+            "disk_hits": self.disk_hits,
+            "bypassed": self.bypassed,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+
+llm_response_cache = LLMResponseCache()
+'''全局的 LLM 回复缓存'''
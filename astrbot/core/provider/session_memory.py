@@ -0,0 +1,161 @@
+'''
+按需加载、有内存上限的会话上下文。
+
+提供商启动时不再读取全部对话历史记录。会话的上下文在第一次被访问时从数据库中读取，
+并保存在一个 LRU 中。会话数或者上下文的总大小超过上限时，淘汰最久未使用的会话；被修改过的会话在淘汰前会被写回数据库。
+
+`SessionMemory` 的用法与原来的 `defaultdict(list)` 相同：`memory[session_id]` 在会话不存在时返回一个新的空列表。
+'''
+import json
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Set
+from astrbot.core.db import BaseDatabase
+from astrbot.core import logger
+
+class SessionMemory():
+    def __init__(
+        self,
+        db_helper: BaseDatabase,
+        provider_type: str,
+        load_history: bool = True,
+        max_sessions: int = 1000,
+        max_bytes: int = 0
+    ):
+        '''
+        Args:
+            load_history: 是否读取之前保存的对话历史记录。为 False 时只会读取本次运行期间写回的会话
+            max_sessions: 内存中最多保存的会话数。小于等于 0 表示不限制
+            max_bytes: 内存中的上下文的总大小上限（按 JSON 的长度估算）。小于等于 0 表示不限制
+        '''
+        self.db_helper = db_helper
+        self.provider_type = provider_type
+        self.load_history = load_history
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._dirty: Set[str] = set()
+        '''在内存中被修改过、还没有写回数据库的会话'''
+        self._written: Set[str] = set()
+        '''本次运行期间写入过数据库的会话'''
+        self.total_bytes = 0
+        self.hits = 0
+        self.loads = 0
+        '''从数据库读取会话的次数'''
+        self.evictions = 0
+
+    def _load(self, session_id: str) -> Optional[List[dict]]:
+        '''从数据库读取会话的上下文。会话不存在时返回 None'''
+        if self.db_helper is None or not (self.load_history or session_id in self._written):
+            return None
+        try:
+            histories = self.db_helper.get_llm_history(session_id=session_id, provider_type=self.provider_type)
+        except BaseException as e:
+            logger.warning(f"读取会话 {session_id} 的 LLM 对话历史记录失败：{e}。仍可正常使用。")
+            return None
+        if not histories:
+            return None
+        self.loads += 1
+        return json.loads(histories[0].content)
+
+    def _lookup(self, session_id: str) -> Optional[List[dict]]:
+        if session_id in self._data:
+            self.hits += 1
+            self._data.move_to_end(session_id)
+            return self._data[session_id]
+        contexts = self._load(session_id)
+        if contexts is not None:
+            self._put(session_id, contexts)
+        return contexts
+
+    def _put(self, session_id: str, contexts: List[dict]):
+        size = len(json.dumps(contexts, ensure_ascii=False))
+        self.total_bytes += size - self._sizes.get(session_id, 0)
+        self._sizes[session_id] = size
+        self._data[session_id] = contexts
+        self._data.move_to_end(session_id)
+        self._evict()
+
+    def _evict(self):
+        while len(self._data) > 1 and (
+            (self.max_sessions > 0 and len(self._data) > self.max_sessions)
+            or (self.max_bytes > 0 and self.total_bytes > self.max_bytes)
+        ):
+            session_id = next(iter(self._data))
+            if session_id in self._dirty:
+                self.persist(session_id)
+            self._data.pop(session_id)
+            self.total_bytes -= self._sizes.pop(session_id)
+            self.evictions += 1
+
+    def persist(self, session_id: str):
+        '''将会话的上下文写入数据库'''
+        contexts = self._data.get(session_id)
+        if contexts is None:
+            return
+        content = json.dumps(contexts)
+        self._dirty.discard(session_id)
+        if self.db_helper is None:
+            return
+        self.db_helper.update_llm_history(session_id, content, self.provider_type)
+        self._written.add(session_id)
+        # 原地修改过的上下文大小可能已经变化
+        size = len(json.dumps(contexts, ensure_ascii=False))
+        self.total_bytes += size - self._sizes.get(session_id, 0)
+        self._sizes[session_id] = size
+
+    def flush(self):
+        '''将所有被修改过的会话写回数据库'''
+        for session_id in list(self._dirty):
+            self.persist(session_id)
+
+    def get(self, session_id: str, default=None) -> Optional[List[dict]]:
+        '''获取会话的上下文，会话不存在时返回 default 并且不会创建会话'''
+        contexts = self._lookup(session_id)
+        return default if contexts is None else contexts
+
+    def __getitem__(self, session_id: str) -> List[dict]:
+        '''获取会话的上下文，会话不存在时创建。原地修改返回的列表后，需要调用 `persist` 或者 `mark_dirty`'''
+        contexts = self._lookup(session_id)
+        if contexts is None:
+            contexts = []
+            self._put(session_id, contexts)
+        return contexts
+
+    def mark_dirty(self, session_id: str):
+        '''标记会话的上下文被原地修改过，在被淘汰时写回数据库'''
+        if session_id in self._data:
+            self._dirty.add(session_id)
+
+    def __setitem__(self, session_id: str, contexts: List[dict]):
+        self._dirty.add(session_id)
+        self._put(session_id, contexts)
+
+    def __delitem__(self, session_id: str):
+        '''从内存中移除会话，不会删除数据库中的记录'''
+        self._data.pop(session_id, None)
+        self.total_bytes -= self._sizes.pop(session_id, 0)
+        self._dirty.discard(session_id)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self._lookup(session_id) is not None
+
+    def __len__(self) -> int:
+        '''内存中的会话数'''
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[str]:
+        '''遍历内存中的会话'''
+        return iter(list(self._data))
+
+    def get_stats(self) -> dict:
+        return {
+            "sessions": len(self._data),
+            "max_sessions": self.max_sessions,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "dirty": len(self._dirty),
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
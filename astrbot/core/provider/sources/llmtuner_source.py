@@ -1,4 +1,3 @@
-import json
 import os
 from llmtuner.chat import ChatModel
 from typing import List
@@ -63,7 +62,7 @@ class LLMTunerModelLoader(Provider):
         system_prompt = ""
         if not contexts:
             query_context = [
-                *self.session_memory[session_id],
+                *self.session_memory.get(session_id, []),
                 {"role": "user", "content": prompt},
             ]
             system_prompt = self.curr_personality["prompt"]
@@ -85,7 +84,8 @@ class LLMTunerModelLoader(Provider):
         if func_tool:
             conf["tools"] = func_tool
 
-        responses = await self.model.achat(**conf)
+        async with self.concurrency.slot():
+            responses = await self.model.achat(**conf)
 
         if session_id:
             if not contexts:
@@ -101,7 +101,7 @@ class LLMTunerModelLoader(Provider):
                     {"role": "user", "content": prompt},
                     {"role": "assistant", "content": responses[-1].response_text},
                 ]
-            self.db_helper.update_llm_history(session_id, json.dumps(self.session_memory[session_id]), self.meta().type)
+            self.session_memory.persist(session_id)
         return responses[-1].response_text
 
     async def forget(self, session_id):
@@ -1,19 +1,21 @@
-import traceback
-import base64
 import json
 
 from openai import AsyncOpenAI, NOT_GIVEN
 from openai.types.chat.chat_completion import ChatCompletion
 from openai._exceptions import NotFoundError
-from astrbot.core.utils.io import download_image_by_url
 
 from astrbot.core.db import BaseDatabase
 from astrbot.api.provider import Provider
 from astrbot import logger
 from astrbot.core.provider.func_tool_manager import FuncCall
-from typing import List
+from typing import List, AsyncGenerator, Dict, Optional, Tuple, Any
 from ..register import register_provider_adapter
 from astrbot.core.provider.entites import LLMResponse
+from astrbot.core.provider.response_cache import llm_response_cache
+from astrbot.core.provider.tokenizer import drop_oldest_round
+from astrbot.core.provider.summarizer import context_summarizer
+from astrbot.core.provider.key_pool import APIKeyState
+from astrbot.core.provider.image_processor import image_processor
 
 @register_provider_adapter("openai_chat_completion", "OpenAI API Chat Completion 提供商适配器")
 class ProviderOpenAIOfficial(Provider):
@@ -25,15 +27,16 @@ class ProviderOpenAIOfficial(Provider):
         persistant_history = True
     ) -> None:
         super().__init__(provider_config, provider_settings, persistant_history, db_helper)
-        self.chosen_api_key = None
         self.api_keys: List = provider_config.get("key", [])
-        self.chosen_api_key = self.api_keys[0] if len(self.api_keys) > 0 else None
+        self.chosen_api_key = self.key_pool.current
 
         self.client = AsyncOpenAI(
             api_key=self.chosen_api_key,
             base_url=provider_config.get("api_base", None),
             timeout=provider_config.get("timeout", NOT_GIVEN),
         )
+        self._key_clients: Dict[str, AsyncOpenAI] = {}
+        '''每个 Key 对应的客户端。它们共享 self.client 的连接池'''
         self.set_model(provider_config['model_config']['model'])
     
     async def get_human_readable_context(self, session_id, page, page_size):
@@ -81,30 +84,55 @@ class ProviderOpenAIOfficial(Provider):
         if len(self.session_memory[session_id]) == 0:
             return None
 
+        record = None
         for i in range(len(self.session_memory[session_id])):
             # 检查是否是 system prompt
-            if not pop_system_prompt and self.session_memory[session_id][i]['user']['role'] == "system":
+            if not pop_system_prompt and self.session_memory[session_id][i]['role'] == "system":
                 # 如果只有一个 system prompt，才不删掉
                 f = False
                 for j in range(i+1, len(self.session_memory[session_id])):
-                    if self.session_memory[session_id][j]['user']['role'] == "system":
+                    if self.session_memory[session_id][j]['role'] == "system":
                         f = True
                         break
                 if not f:
                     continue
             record = self.session_memory[session_id].pop(i)
+            self.session_memory.mark_dirty(session_id)
             break
 
         return record
     
+    def _client_for(self, key: str) -> AsyncOpenAI:
+        if not key or key == self.client.api_key:
+            return self.client
+        client = self._key_clients.get(key)
+        if client is None:
+            client = self._key_clients[key] = self.client.with_options(api_key=key)
+        return client
+    
+    async def _create_completion(self, payloads: dict, stream: bool) -> Tuple[APIKeyState, Any]:
+        '''从 Key 池中选择一个 Key 发起请求，返回 (Key, 请求结果)。调用方在请求结束后需要释放 Key。
+        
+        Key 被限流或者无效时，换一个可用的 Key 重试。
+        '''
+        attempts = max(1, len(self.key_pool))
+        for attempt in range(attempts):
+            state = self.key_pool.acquire()
+            try:
+                return state, await self._client_for(state.key).chat.completions.create(**payloads, stream=stream)
+            except Exception as e:
+                key_error = self.key_pool.release(state, e)
+                if not key_error or attempt == attempts - 1 or not self.key_pool.available_count():
+                    raise
+    
     async def _query(self, payloads: dict, tools: FuncCall) -> LLMResponse:
-        if tools:
-            payloads["tools"] = tools.get_func_desc_openai_style()
+        tools_desc = tools.get_func_desc_openai_style() if tools else None
+        if tools_desc:
+            payloads["tools"] = tools_desc
         
-        completion = await self.client.chat.completions.create(
-            **payloads,
-            stream=False
-        )
+        async with self.concurrency.slot():
+            state, completion = await self._create_completion(payloads, stream=False)
+            self.key_pool.release(state)
         
         assert isinstance(completion, ChatCompletion)
         logger.debug(f"completion: {completion.usage}")
@@ -121,17 +149,101 @@ class ProviderOpenAIOfficial(Provider):
             # tools call (function calling)
             args_ls = []
             func_name_ls = []
+            ids_ls = []
             for tool_call in choice.message.tool_calls:
-                for tool in tools.func_list:
-                    if tool.name == tool_call.function.name:
-                        args = json.loads(tool_call.function.arguments)
-                        args_ls.append(args)
-                        func_name_ls.append(tool_call.function.name)
-            return LLMResponse(role="tool", tools_call_args=args_ls, tools_call_name=func_name_ls)
+                if tools.get_func(tool_call.function.name) is not None:
+                    args = json.loads(tool_call.function.arguments)
+                    args_ls.append(args)
+                    func_name_ls.append(tool_call.function.name)
+                    ids_ls.append(tool_call.id)
+            return LLMResponse(role="tool", tools_call_args=args_ls, tools_call_name=func_name_ls, tools_call_ids=ids_ls)
         else:
             raise Exception("Internal Error")
 
-    async def text_chat(
+    async def _query_stream(self, payloads: dict, tools: FuncCall) -> AsyncGenerator[LLMResponse, None]:
+        '''流式请求。先产出文本增量，最后产出完整的结果'''
+        tools_desc = tools.get_func_desc_openai_style() if tools else None
+        if tools_desc:
+            payloads["tools"] = tools_desc
+        
+        async with self.concurrency.slot():
+            state, stream = await self._create_completion(payloads, stream=True)
+        
+            text_parts = []
+            tool_calls: Dict[int, dict] = {} # tool_call 的下标 -> 拼接中的 name 和 arguments
+            error = None
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if delta.content:
+                        text_parts.append(delta.content)
+                        yield LLMResponse("assistant", delta.content, is_chunk=True)
+                    if delta.tool_calls:
+                        for tool_call in delta.tool_calls:
+                            call = tool_calls.setdefault(tool_call.index, {"id": "", "name": "", "arguments": ""})
+                            if tool_call.id:
+                                call["id"] = tool_call.id
+                            if tool_call.function and tool_call.function.name:
+                                call["name"] += tool_call.function.name
+                            if tool_call.function and tool_call.function.arguments:
+                                call["arguments"] += tool_call.function.arguments
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                self.key_pool.release(state, error)
+        
+        if text_parts:
+            # text completion
+            yield LLMResponse("assistant", "".join(text_parts).strip())
+        elif tool_calls:
+            # tools call (function calling)
+            args_ls = []
+            func_name_ls = []
+            ids_ls = []
+            for _, call in sorted(tool_calls.items()):
+                if tools.get_func(call["name"]) is not None:
+                    args_ls.append(json.loads(call["arguments"]) if call["arguments"] else {})
+                    func_name_ls.append(call["name"])
+                    ids_ls.append(call["id"])
+            yield LLMResponse(role="tool", tools_call_args=args_ls, tools_call_name=func_name_ls, tools_call_ids=ids_ls)
+        else:
+            raise Exception("API 返回的 completion 为空。")
+
+    def _session_contexts(self, session_id: str, contexts: List) -> List:
+        '''没有传入 contexts（None 或者空列表）时，使用 session_id 对应的上下文'''
+        if not contexts and session_id:
+            return self.session_memory.get(session_id, [])
+        return contexts or []
+
+    async def _prepare_payloads(self, prompt: str, session_id: str, image_urls: List[str], contexts: List, system_prompt: str, tool_messages: List = None):
+        '''组装请求，返回 (本次的用户 record, 裁剪后的上下文, payloads)。contexts 是已经确定的上下文，见 `_session_contexts`'''
+        new_record = await self.assemble_context(prompt, image_urls)
+        tool_messages = tool_messages or []
+        system_record = {"role": "system", "content": system_prompt} if system_prompt else None
+        contexts = self.fit_contexts(contexts, new_record, system_record, *tool_messages)
+        context_query = [*contexts, new_record, *tool_messages]
+        if system_record:
+            context_query.insert(0, system_record)
+
+        payloads = {
+            "messages": context_query,
+            **self.provider_config.get("model_config", {})
+        }
+        return new_record, contexts, payloads
+    
+    def _get_cache_key(self, payloads: dict, func_tool: FuncCall) -> Optional[str]:
+        '''获取回复缓存的键。不使用缓存时返回 None'''
+        if not llm_response_cache.enable:
+            return None
+        if llm_response_cache.should_bypass(payloads, func_tool):
+            llm_response_cache.bypassed += 1
+            return None
+        return llm_response_cache.make_key(self.provider_config.get("id", ""), payloads)
+
+    async def text_chat_stream(
         self,
         prompt: str,
         session_id: str,
@@ -139,29 +251,77 @@ class ProviderOpenAIOfficial(Provider):
         func_tool: FuncCall=None,
         contexts=None,
         system_prompt=None,
+        tool_messages=None,
         **kwargs
-    ) -> LLMResponse: 
-        new_record = await self.assemble_context(prompt, image_urls)
-        context_query = []
-        if not contexts:
-            context_query = [*self.session_memory[session_id], new_record]
-        else:
-            context_query = [*contexts, new_record]
-        if system_prompt:
-            context_query.insert(0, {"role": "system", "content": system_prompt})
-
-        payloads = {
-            "messages": context_query,
-            **self.provider_config.get("model_config", {})
-        }
-
+    ) -> AsyncGenerator[LLMResponse, None]:
+        contexts = self._session_contexts(session_id, contexts)
+        new_record, contexts, payloads = await self._prepare_payloads(prompt, session_id, image_urls, contexts, system_prompt, tool_messages)
+        cache_key = self._get_cache_key(payloads, func_tool)
+        if cache_key:
+            llm_response = llm_response_cache.get(cache_key)
+            if llm_response:
+                await self.save_history(contexts, new_record, session_id, llm_response)
+                yield llm_response
+                return
+        started = False
         try:
-            llm_response = await self._query(payloads, func_tool)
+            async for llm_response in self._stream_and_save(payloads, func_tool, cache_key, contexts, new_record, session_id):
+                started = True
+                yield llm_response
         except Exception as e:
-            if "maximum context length" in str(e):
-                logger.warning(f"请求失败：{e}。上下文长度超过限制。尝试弹出最早的记录然后重试。")
-                self.pop_record(session_id)
-            logger.warning(traceback.format_exc())
+            # 已经产出文本增量后不能再重试
+            if started or not self._is_context_length_error(e, contexts):
+                raise
+            logger.warning(f"请求失败：{e}。上下文长度超过限制。丢弃最早的一轮对话后重试。")
+            new_record, contexts, payloads = await self._prepare_payloads(prompt, session_id, image_urls, drop_oldest_round(contexts), system_prompt, tool_messages)
+            async for llm_response in self._stream_and_save(payloads, func_tool, cache_key, contexts, new_record, session_id):
+                yield llm_response
+
+    async def _stream_and_save(self, payloads: dict, func_tool: FuncCall, cache_key: Optional[str], contexts: List, new_record: dict, session_id: str):
+        async for llm_response in self._query_stream(payloads, func_tool):
+            if llm_response.is_chunk:
+                yield llm_response
+            else:
+                # 完整的回复生成后才记录上下文
+                if cache_key:
+                    llm_response_cache.set(cache_key, llm_response)
+                await self.save_history(contexts, new_record, session_id, llm_response)
+                yield llm_response
+
+    @staticmethod
+    def _is_context_length_error(error: Exception, contexts: List) -> bool:
+        '''是否是上下文过长导致的错误，并且还有可以丢弃的上下文。
+        
+        没有配置上下文长度限制，或者本地估算的 token 数偏小时，会丢弃最早的一轮对话后重试一次。
+        '''
+        return "maximum context length" in str(error) and bool(contexts)
+
+    async def text_chat(
+        self,
+        prompt: str,
+        session_id: str,
+        image_urls: List[str]=None,
+        func_tool: FuncCall=None,
+        contexts=None,
+        system_prompt=None,
+        tool_messages=None,
+        **kwargs
+    ) -> LLMResponse: 
+        contexts = self._session_contexts(session_id, contexts)
+        new_record, contexts, payloads = await self._prepare_payloads(prompt, session_id, image_urls, contexts, system_prompt, tool_messages)
+        cache_key = self._get_cache_key(payloads, func_tool)
+        llm_response = llm_response_cache.get(cache_key) if cache_key else None
+        if llm_response is None:
+            try:
+                llm_response = await self._query(payloads, func_tool)
+            except Exception as e:
+                if not self._is_context_length_error(e, contexts):
+                    raise
+                logger.warning(f"请求失败：{e}。上下文长度超过限制。丢弃最早的一轮对话后重试。")
+                new_record, contexts, payloads = await self._prepare_payloads(prompt, session_id, image_urls, drop_oldest_round(contexts), system_prompt, tool_messages)
+                llm_response = await self._query(payloads, func_tool)
+            if cache_key:
+                llm_response_cache.set(cache_key, llm_response)
             
         await self.save_history(contexts, new_record, session_id, llm_response)
 
@@ -170,33 +330,27 @@ class ProviderOpenAIOfficial(Provider):
     async def save_history(self, contexts: List, new_record: dict, session_id: str, llm_response: LLMResponse):
         if llm_response.role == "assistant" and session_id:
             # 文本回复
-            if not contexts:
-                # 添加用户 record
-                self.session_memory[session_id].append(new_record)
-                # 添加 assistant record
-                self.session_memory[session_id].append({
-                    "role": "assistant",
-                    "content": llm_response.completion_text
-                })
-            else:
-                self.session_memory[session_id] = [*contexts, new_record, {
-                    "role": "assistant",
-                    "content": llm_response.completion_text
-                }]
-            self.db_helper.update_llm_history(session_id, json.dumps(self.session_memory[session_id]), self.provider_config['type'])
+            # 添加用户 record 和 assistant record
+            self.session_memory[session_id] = [*contexts, new_record, {
+                "role": "assistant",
+                "content": llm_response.completion_text
+            }]
+            self.session_memory.persist(session_id)
+            context_summarizer.maybe_schedule(self, session_id)
         
     async def forget(self, session_id: str) -> bool:
         self.session_memory[session_id] = []
         return True
 
     def get_current_key(self) -> str:
-        return self.client.api_key
+        return self.key_pool.current or self.client.api_key
 
     def get_keys(self) -> List[str]:
         return self.api_keys
     
     def set_key(self, key):
         self.client.api_key = key
+        self.key_pool.pin(key)
         
     async def assemble_context(self, text: str, image_urls: List[str] = None):
         '''
@@ -204,12 +358,7 @@ class ProviderOpenAIOfficial(Provider):
         '''
         if image_urls:
             user_content = {"role": "user","content": [{"type": "text", "text": text}]}
-            for image_url in image_urls:
-                if image_url.startswith("http"):
-                    image_path = await download_image_by_url(image_url)
-                    image_data = await self.encode_image_bs64(image_path)
-                else:
-                    image_data = await self.encode_image_bs64(image_url)
+            for image_data in await image_processor.encode_all(image_urls):
                 user_content["content"].append({"type": "image_url", "image_url": {"url": image_data}})
             return user_content
         else:
@@ -217,11 +366,6 @@ class ProviderOpenAIOfficial(Provider):
 
     async def encode_image_bs64(self, image_url: str) -> str:
         '''
-        将图片转换为 base64
+        将图片转换为 base64 的 data URL
         '''
-        if image_url.startswith("base64://"):
-            return image_url.replace("base64://", "data:image/jpeg;base64,")
-        with open(image_url, "rb") as f:
-            image_bs64 = base64.b64encode(f.read()).decode('utf-8')
-            return "data:image/jpeg;base64," + image_bs64
-        return ''
\ No newline at end of file
+        return await image_processor.encode(image_url)
\ No newline at end of file
@@ -0,0 +1,308 @@
+import time
+import asyncio
+from typing import List, AsyncGenerator, Dict, Optional
+from astrbot.core.db import BaseDatabase
+from astrbot.api.provider import Provider
+from astrbot import logger
+from astrbot.core.provider.func_tool_manager import FuncCall
+from astrbot.core.provider.entites import LLMResponse
+from astrbot.core.provider.summarizer import context_summarizer
+from astrbot.core.utils.latency import provider_latency
+from ..register import register_provider_adapter
+
+class CircuitBreaker():
+    '''熔断器。
+
+    连续失败 failure_threshold 次后断开（open），此时不再向该提供商发送请求；
+    断开 recovery_time 秒后进入半开（half_open）状态，放行一个探测请求，成功则恢复（closed），失败则重新断开。
+    '''
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, recovery_time: float = 30):
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_time = recovery_time
+        self.state = self.CLOSED
+        self.failures = 0
+        '''连续失败的次数'''
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        '''是否允许发送请求。半开状态下只放行一个探测请求'''
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_time:
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"提供商连续失败 {self.failures} 次，已熔断 {self.recovery_time} 秒。")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        '''探测请求被取消时调用，允许下一个请求继续探测'''
+        self._probing = False
+
+@register_provider_adapter("routing", "多提供商路由，支持故障转移和对冲请求")
+class ProviderRouting(Provider):
+    '''将请求路由到多个提供商。
+
+    按照 `providers` 中的顺序选择第一个没有熔断的提供商，请求失败或者超时后依次尝试下一个。
+    启用对冲（hedge）时，如果第一个提供商在其 p95 耗时内没有返回，会同时向下一个提供商发送请求，采用先返回的结果。
+
+    上下文由路由提供商自己维护，被路由的提供商不会记录这些会话的上下文。
+    '''
+    def __init__(
+        self,
+        provider_config: dict,
+        provider_settings: dict,
+        db_helper: BaseDatabase,
+        persistant_history = True
+    ) -> None:
+        super().__init__(provider_config, provider_settings, persistant_history, db_helper)
+        self.provider_ids: List[str] = provider_config.get("providers", [])
+        self.timeout = provider_config.get("timeout", 60)
+        '''单个提供商的超时时间（秒）。小于等于 0 表示不限制'''
+        self.hedge = provider_config.get("hedge", False)
+        self.hedge_delay = provider_config.get("hedge_delay", 5)
+        '''提供商的耗时样本不足时，发出对冲请求前等待的时间（秒）'''
+        self.hedge_min_samples = provider_config.get("hedge_min_samples", 20)
+        breaker_cfg = provider_config.get("circuit_breaker", {})
+        self.breaker_cfg = (breaker_cfg.get("failure_threshold", 3), breaker_cfg.get("recovery_time", 30))
+        self.providers: List[Provider] = []
+        '''被路由的提供商，在 `set_providers` 中设置'''
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.hedged = 0
+        '''发出的对冲请求数'''
+        self.failovers = 0
+        '''故障转移的次数'''
+
+    def set_providers(self, provider_insts: List[Provider]):
+        '''根据配置的提供商 ID 找到被路由的提供商实例。由 ProviderManager 在所有提供商实例化之后调用'''
+        insts = {inst.provider_config['id']: inst for inst in provider_insts if inst is not self}
+        self.providers = []
+        for provider_id in self.provider_ids:
+            inst = insts.get(provider_id)
+            if inst is None or isinstance(inst, ProviderRouting):
+                logger.warning(f"路由提供商 {self.provider_config['id']} 中的提供商 {provider_id} 不存在或者不可被路由，已跳过。")
+                continue
+            self.providers.append(inst)
+            self.breakers[provider_id] = CircuitBreaker(*self.breaker_cfg)
+        if not self.providers:
+            logger.warning(f"路由提供商 {self.provider_config['id']} 没有可用的提供商。")
+        else:
+            self.set_model(self.providers[0].get_model())
+
+    def _candidates(self):
+        '''按顺序产出允许发送请求的提供商。熔断器的判断推迟到真正需要下一个提供商时'''
+        for inst in self.providers:
+            if self.breakers[inst.provider_config['id']].allow():
+                yield inst
+
+    def _hedge_delay(self, inst: Provider) -> float:
+        histogram = provider_latency.get(inst.provider_config['id'])
+        if histogram.count >= self.hedge_min_samples:
+            return histogram.percentile(0.95)
+        return self.hedge_delay
+
+    async def _call(self, inst: Provider, **kwargs) -> LLMResponse:
+        provider_id = inst.provider_config['id']
+        breaker = self.breakers[provider_id]
+        start = time.perf_counter()
+        try:
+            if self.timeout and self.timeout > 0:
+                llm_response = await asyncio.wait_for(inst.text_chat(**kwargs), self.timeout)
+            else:
+                llm_response = await inst.text_chat(**kwargs)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            breaker.record_failure()
+            logger.warning(f"提供商 {provider_id} 请求失败：{type(e).__name__}: {e}")
+            raise
+        provider_latency.record(provider_id, time.perf_counter() - start)
+        breaker.record_success()
+        return llm_response
+
+    async def _route(self, **kwargs) -> LLMResponse:
+        candidates = self._candidates()
+        primary = next(candidates, None)
+        if primary is None:
+            raise Exception("所有提供商都已熔断或者没有可用的提供商。")
+        pending = {asyncio.create_task(self._call(primary, **kwargs))}
+        hedge_delay = self._hedge_delay(primary) if self.hedge else None
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # 第一个提供商没有在 p95 耗时内返回，向下一个提供商发送对冲请求。只对冲一次
+                    hedge_delay = None
+                    inst = next(candidates, None)
+                    if inst is not None:
+                        self.hedged += 1
+                        logger.debug(f"提供商 {primary.provider_config['id']} 响应较慢，向 {inst.provider_config['id']} 发送对冲请求。")
+                        pending.add(asyncio.create_task(self._call(inst, **kwargs)))
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                if not pending:
+                    # 故障转移到下一个提供商
+                    hedge_delay = None
+                    inst = next(candidates, None)
+                    if inst is not None:
+                        self.failovers += 1
+                        pending.add(asyncio.create_task(self._call(inst, **kwargs)))
+        finally:
+            for task in pending:
+                task.cancel()
+        raise Exception(f"所有提供商都请求失败。最后一个错误：{last_error}")
+
+    async def text_chat(
+        self,
+        prompt: str,
+        session_id: str,
+        image_urls: List[str]=None,
+        func_tool: FuncCall=None,
+        contexts=None,
+        system_prompt=None,
+        **kwargs
+    ) -> LLMResponse:
+        if not contexts:
+            contexts = self.session_memory.get(session_id, []) if session_id else []
+        contexts = self.fit_contexts(contexts, {"role": "user", "content": prompt}, {"role": "system", "content": system_prompt} if system_prompt else None)
+        llm_response = await self._route(
+            prompt=prompt, session_id=None, image_urls=image_urls, func_tool=func_tool,
+            contexts=contexts, system_prompt=system_prompt, **kwargs
+        )
+        await self.save_history(contexts, prompt, session_id, llm_response)
+        return llm_response
+
+    async def text_chat_stream(
+        self,
+        prompt: str,
+        session_id: str,
+        image_urls: List[str]=None,
+        func_tool: FuncCall=None,
+        contexts=None,
+        system_prompt=None,
+        **kwargs
+    ) -> AsyncGenerator[LLMResponse, None]:
+        '''流式请求不对冲。只有在产出第一个文本增量之前失败时才会故障转移'''
+        if not contexts:
+            contexts = self.session_memory.get(session_id, []) if session_id else []
+        contexts = self.fit_contexts(contexts, {"role": "user", "content": prompt}, {"role": "system", "content": system_prompt} if system_prompt else None)
+        last_error = None
+        for inst in self._candidates():
+            provider_id = inst.provider_config['id']
+            breaker = self.breakers[provider_id]
+            started = False
+            start = time.perf_counter()
+            try:
+                async for llm_response in inst.text_chat_stream(
+                    prompt=prompt, session_id=None, image_urls=image_urls, func_tool=func_tool,
+                    contexts=contexts, system_prompt=system_prompt, **kwargs
+                ):
+                    if not started:
+                        started = True
+                        provider_latency.record(provider_id, time.perf_counter() - start)
+                    if not llm_response.is_chunk:
+                        await self.save_history(contexts, prompt, session_id, llm_response)
+                    yield llm_response
+            except Exception as e:
+                breaker.record_failure()
+                if started:
+                    raise
+                last_error = e
+                self.failovers += 1
+                logger.warning(f"提供商 {provider_id} 请求失败：{type(e).__name__}: {e}")
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record_success()
+            return
+        raise Exception(f"所有提供商都请求失败。最后一个错误：{last_error}")
+
+    async def save_history(self, contexts: List, prompt: str, session_id: str, llm_response: LLMResponse):
+        if not session_id or llm_response.role != "assistant":
+            return
+        self.session_memory[session_id] = [*contexts, {"role": "user", "content": prompt}, {
+            "role": "assistant",
+            "content": llm_response.completion_text
+        }]
+        self.session_memory.persist(session_id)
+        context_summarizer.maybe_schedule(self, session_id)
+
+    async def get_human_readable_context(self, session_id, page, page_size):
+        if session_id not in self.session_memory:
+            raise Exception("会话 ID 不存在")
+        contexts = []
+        for record in self.session_memory[session_id]:
+            if record['role'] == "user":
+                contexts.append(f"User: {record['content']}")
+            elif record['role'] == "assistant":
+                contexts.append(f"Assistant: {record['content']}")
+        paged_contexts = contexts[(page-1)*page_size:page*page_size]
+        total_pages = (len(contexts) + page_size - 1) // page_size
+        return paged_contexts, total_pages
+
+    async def forget(self, session_id: str) -> bool:
+        self.session_memory[session_id] = []
+        return True
+
+    def _primary(self) -> Optional[Provider]:
+        return self.providers[0] if self.providers else None
+
+    def set_model(self, model_name: str):
+        super().set_model(model_name)
+        if self._primary() and self._primary().get_model() != model_name:
+            self._primary().set_model(model_name)
+
+    async def get_models(self) -> List[str]:
+        return await self._primary().get_models() if self._primary() else []
+
+    def get_current_key(self) -> str:
+        return self._primary().get_current_key() if self._primary() else ""
+
+    def get_keys(self) -> List[str]:
+        return self._primary().get_keys() if self._primary() else []
+
+    def set_key(self, key: str):
+        if self._primary():
+            self._primary().set_key(key)
+
+    def get_stats(self) -> dict:
+        '''各个被路由的提供商的熔断状态和耗时'''
+        return {
+            "hedged": self.hedged,
+            "failovers": self.failovers,
+            "providers": {
+                inst.provider_config['id']: {
+                    "state": self.breakers[inst.provider_config['id']].state,
+                    "failures": self.breakers[inst.provider_config['id']].failures,
+                    **provider_latency.get(inst.provider_config['id']).snapshot(),
+                } for inst in self.providers
+            }
+        }
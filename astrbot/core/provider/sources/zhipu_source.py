@@ -1,10 +1,7 @@
-import traceback
 from astrbot.core.db import BaseDatabase
 from astrbot import logger
-from astrbot.core.provider.func_tool_manager import FuncCall
 from typing import List
 from ..register import register_provider_adapter
-from astrbot.core.provider.entites import LLMResponse
 from .openai_source import ProviderOpenAIOfficial
 
 @register_provider_adapter("zhipu_chat_completion", "智浦 Chat Completion 提供商适配器")
@@ -18,23 +15,12 @@ class ProviderZhipu(ProviderOpenAIOfficial):
     ) -> None:
         super().__init__(provider_config, provider_settings, db_helper, persistant_history)
     
-    async def text_chat(
-        self,
-        prompt: str,
-        session_id: str,
-        image_urls: List[str]=None,
-        func_tool: FuncCall=None,
-        contexts=None,
-        system_prompt=None,
-        **kwargs
-    ) -> LLMResponse: 
+    async def _prepare_payloads(self, prompt: str, session_id: str, image_urls: List[str], contexts: List, system_prompt: str, tool_messages: List = None):
         new_record = await self.assemble_context(prompt, image_urls)
-        context_query = []
-        
-        if not contexts:
-            context_query = [*self.session_memory[session_id], new_record]
-        else:
-            context_query = [*contexts, new_record]
+        tool_messages = tool_messages or []
+        system_record = {"role": "system", "content": system_prompt} if system_prompt else None
+        contexts = self.fit_contexts(contexts, new_record, system_record, *tool_messages)
+        context_query = [*contexts, new_record]
         
         model_cfgs: dict = self.provider_config.get("model_config", {})
         # glm-4v-flash 只支持一张图片
@@ -52,22 +38,12 @@ class ProviderZhipu(ProviderOpenAIOfficial):
             context_query = new_context_query_
             logger.debug(context_query)
             
-        if system_prompt:
-            context_query.insert(0, {"role": "system", "content": system_prompt})
+        context_query.extend(tool_messages)
+        if system_record:
+            context_query.insert(0, system_record)
             
         payloads = {
             "messages": context_query,
             **model_cfgs
-        }    
-        llm_response = None
-        try:
-            llm_response = await self._query(payloads, func_tool)
-        except Exception as e:
-            if "maximum context length" in str(e):
-                logger.warning(f"请求失败：{e}。上下文长度超过限制。尝试弹出最早的记录然后重试。")
-                self.pop_record(session_id)
-            logger.warning(traceback.format_exc())
-            
-        await self.save_history(contexts, new_record, session_id, llm_response)
-
-        return llm_response
\ No newline at end of file
+        }
+        return new_record, contexts, payloads
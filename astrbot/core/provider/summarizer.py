@@ -0,0 +1,144 @@
+'''
+滚动地总结会话上下文。
+
+当一个会话的上下文超过一定的轮数或者 token 数时，在后台用（通常是更便宜的）提供商将较早的对话总结为一条 system 记录，
+只保留最近的几轮对话原文，以此限制每个会话的上下文占用的内存和每次请求的 token 数。
+总结不在处理消息的路径上执行，总结完成前的请求仍然使用完整的上下文。
+'''
+import asyncio
+import traceback
+from typing import Dict, List, Tuple, TYPE_CHECKING
+from astrbot.core import logger
+from .tokenizer import get_tokenizer, count_message_tokens
+
+if TYPE_CHECKING:
+    from .provider import Provider
+    from .manager import ProviderManager
+
+SUMMARY_PREFIX = "以下是之前对话的摘要：\n"
+
+SUMMARY_SYSTEM_PROMPT = (
+    "你是一个对话总结助手。请用简洁的语言总结下面的对话，保留用户的身份、偏好、提到的事实和尚未解决的问题，"
+    "不要编造对话中没有的内容。直接输出总结，不要输出其他内容。"
+)
+
+class ContextSummarizer():
+    '''会话上下文总结器。默认不启用'''
+    def __init__(self):
+        self.enable = False
+        self.max_turns = 20
+        '''会话超过多少轮对话时触发总结。0 表示不按轮数触发'''
+        self.max_tokens = 4000
+        '''会话的上下文超过多少 token 时触发总结。0 表示不按 token 数触发'''
+        self.keep_turns = 4
+        '''总结时保留原文的最近的对话轮数'''
+        self.provider_id = ""
+        '''用于总结的提供商 ID。为空时使用会话所在的提供商'''
+        self.provider_manager: "ProviderManager" = None
+        self._tasks: Dict[Tuple[int, str], asyncio.Task] = {}
+        '''正在进行的总结任务。key 是 (提供商实例的 id, 会话 ID)'''
+        self.summarized = 0
+        self.failed = 0
+
+    def configure(self, cfg: dict, provider_manager: "ProviderManager" = None):
+        '''根据 `provider_settings.summarization` 配置总结器'''
+        self.enable = cfg.get("enable", False)
+        self.max_turns = cfg.get("max_turns", 20)
+        self.max_tokens = cfg.get("max_tokens", 4000)
+        self.keep_turns = max(1, cfg.get("keep_turns", 4))
+        self.provider_id = cfg.get("provider_id", "")
+        self.provider_manager = provider_manager
+
+    def _get_summary_provider(self, provider: "Provider") -> "Provider":
+        if self.provider_id and self.provider_manager:
+            for inst in self.provider_manager.get_insts():
+                if inst.provider_config.get("id") == self.provider_id:
+                    return inst
+            logger.warning(f"未找到用于总结上下文的提供商 {self.provider_id}，将使用 {provider.provider_config.get('id')}。")
+        return provider
+
+    def _split(self, contexts: List[dict]) -> int:
+        '''返回需要被总结的记录数，即倒数第 keep_turns 条 user 记录的下标。不需要总结时返回 0'''
+        user_indexes = [i for i, record in enumerate(contexts) if record.get("role") == "user"]
+        if len(user_indexes) <= self.keep_turns:
+            return 0
+        return user_indexes[-self.keep_turns]
+
+    def should_summarize(self, provider: "Provider", contexts: List[dict]) -> bool:
+        turns = sum(1 for record in contexts if record.get("role") == "user")
+        if turns <= self.keep_turns:
+            return False
+        if self.max_turns > 0 and turns > self.max_turns:
+            return True
+        if self.max_tokens > 0:
+            tokenizer = get_tokenizer(provider.get_model())
+            return sum(count_message_tokens(record, tokenizer) for record in contexts) > self.max_tokens
+        return False
+
+    def maybe_schedule(self, provider: "Provider", session_id: str):
+        '''在会话的上下文更新后调用。需要总结时创建后台任务'''
+        if not self.enable or not session_id:
+            return
+        key = (id(provider), session_id)
+        if key in self._tasks:
+            return
+        if not self.should_summarize(provider, provider.session_memory.get(session_id, [])):
+            return
+        task = asyncio.create_task(self._summarize(provider, session_id))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+    async def _summarize(self, provider: "Provider", session_id: str):
+        snapshot = list(provider.session_memory.get(session_id, []))
+        split = self._split(snapshot)
+        older = snapshot[:split]
+        if not older:
+            return
+        lines = []
+        for record in older:
+            content = record.get("content")
+            if isinstance(content, list):
+                # 带图片的记录只保留文本
+                content = " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+            if record.get("role") == "system":
+                lines.append(f"[之前的摘要] {content}")
+            elif record.get("role") == "user":
+                lines.append(f"User: {content}")
+            elif record.get("role") == "assistant":
+                lines.append(f"Assistant: {content}")
+        try:
+            summary_provider = self._get_summary_provider(provider)
+            llm_response = await summary_provider.text_chat(
+                prompt="\n".join(lines),
+                session_id=None,
+                contexts=[],
+                system_prompt=SUMMARY_SYSTEM_PROMPT
+            )
+            if not llm_response or llm_response.role != "assistant" or not llm_response.completion_text:
+                raise Exception(f"总结的结果不是文本：{llm_response}")
+        except Exception:
+            self.failed += 1
+            logger.warning(f"总结会话 {session_id} 的上下文失败：{traceback.format_exc()}")
+            return
+
+        current = provider.session_memory.get(session_id, [])
+        # 总结期间会话可能已经被重置或者裁剪，此时放弃这次总结
+        if len(current) < split or any(current[i] is not older[i] for i in range(split)):
+            logger.debug(f"会话 {session_id} 的上下文在总结期间发生了变化，已放弃这次总结。")
+            return
+        summary_record = {"role": "system", "content": SUMMARY_PREFIX + llm_response.completion_text}
+        provider.session_memory[session_id] = [summary_record, *current[split:]]
+        provider.session_memory.persist(session_id)
+        self.summarized += 1
+        logger.debug(f"已将会话 {session_id} 的 {split} 条记录总结为摘要。")
+
+    def get_stats(self) -> dict:
+        return {
+            "enable": self.enable,
+            "running": len(self._tasks),
+            "summarized": self.summarized,
+            "failed": self.failed,
+        }
+
+context_summarizer = ContextSummarizer()
+'''全局的会话上下文总结器'''
@@ -0,0 +1,123 @@
+'''
+在本地估算上下文的 token 数，并按照上下文长度限制裁剪上下文。
+
+不同模型的分词方式不同，可以通过 `register_tokenizer` 为名称以某个前缀开头的模型注册分词器。
+没有匹配的分词器时使用 `EstimateTokenizer` 按字符数粗略估算。安装了 tiktoken 时，OpenAI 的模型使用 tiktoken 计算。
+'''
+import re
+import abc
+from typing import Callable, Dict, List, Tuple
+from astrbot.core import logger
+
+class Tokenizer(abc.ABC):
+    @abc.abstractmethod
+    def count(self, text: str) -> int:
+        '''计算 text 的 token 数'''
+        raise NotImplementedError()
+
+class EstimateTokenizer(Tokenizer):
+    '''按字符数估算 token 数。中日韩字符每个字符算作 1 个 token，其他字符每 4 个字符算作 1 个 token'''
+    _CJK_PATTERN = re.compile(r'[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿＀-￯]')
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        cjk = len(self._CJK_PATTERN.findall(text))
+        return cjk + (len(text) - cjk + 3) // 4
+
+class TiktokenTokenizer(Tokenizer):
+    '''使用 tiktoken 计算 token 数。需要安装 tiktoken'''
+    def __init__(self, model: str):
+        import tiktoken
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+MESSAGE_OVERHEAD_TOKENS = 4
+'''每条记录除了内容之外额外占用的 token 数（角色、分隔符等）'''
+IMAGE_TOKENS = 765
+'''一张图片占用的 token 数。按 OpenAI 高精度模式下一张 1024x1024 的图片估算'''
+
+_tokenizer_factories: List[Tuple[str, Callable[[str], Tokenizer]]] = []
+_tokenizers: Dict[str, Tokenizer] = {}
+_default_tokenizer = EstimateTokenizer()
+
+def register_tokenizer(model_prefix: str, factory: Callable[[str], Tokenizer]):
+    '''为名称以 model_prefix 开头的模型（不区分大小写）注册分词器。factory 接收模型名称，返回分词器。后注册的优先匹配'''
+    _tokenizer_factories.insert(0, (model_prefix.lower(), factory))
+    _tokenizers.clear()
+
+def get_tokenizer(model: str) -> Tokenizer:
+    '''获取模型对应的分词器'''
+    key = (model or "").lower()
+    tokenizer = _tokenizers.get(key)
+    if tokenizer is None:
+        for prefix, factory in _tokenizer_factories:
+            if key.startswith(prefix):
+                try:
+                    tokenizer = factory(model)
+                except Exception as e:
+                    logger.warning(f"为模型 {model} 创建分词器失败：{e}。将按字符数估算 token 数。")
+                break
+        tokenizer = _tokenizers[key] = tokenizer or _default_tokenizer
+    return tokenizer
+
+def count_message_tokens(message: dict, tokenizer: Tokenizer) -> int:
+    '''估算一条 OpenAI 格式的记录的 token 数'''
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    content = message.get("content")
+    if isinstance(content, str):
+        tokens += tokenizer.count(content)
+    elif isinstance(content, list):
+        for part in content:
+            if part.get("type") == "text":
+                tokens += tokenizer.count(part.get("text", ""))
+            elif part.get("type") == "image_url":
+                tokens += IMAGE_TOKENS
+    for tool_call in message.get("tool_calls") or []:
+        function = tool_call.get("function", {})
+        tokens += tokenizer.count(function.get("name", "")) + tokenizer.count(function.get("arguments", ""))
+    return tokens
+
+def trim_contexts(contexts: List[dict], budget: int, tokenizer: Tokenizer) -> List[dict]:
+    '''从最早的记录开始丢弃，直到 contexts 的 token 数不超过 budget。
+
+    以轮为单位丢弃：丢弃一条记录后，会继续丢弃到下一条 user 记录之前，避免上下文以 assistant 或者 tool 的记录开头。
+    system 记录不会被丢弃。不需要裁剪时返回 contexts 本身。
+    '''
+    counts = [count_message_tokens(message, tokenizer) for message in contexts]
+    total = sum(counts)
+    if total <= budget:
+        return contexts
+    kept_system = []
+    i = 0
+    n = len(contexts)
+    while i < n and total > budget:
+        if contexts[i].get("role") == "system":
+            kept_system.append(contexts[i])
+            i += 1
+            continue
+        total -= counts[i]
+        i += 1
+        # 丢弃到下一条 user 记录之前
+        while i < n and contexts[i].get("role") not in ("user", "system"):
+            total -= counts[i]
+            i += 1
+    return [*kept_system, *contexts[i:]]
+
+def drop_oldest_round(contexts: List[dict]) -> List[dict]:
+    '''丢弃最早的一轮对话'''
+    return trim_contexts(contexts, sum(count_message_tokens(m, _default_tokenizer) for m in contexts) - 1, _default_tokenizer)
+
+try:
+    import tiktoken # noqa: F401
+    for _prefix in ("gpt-", "o1", "o3", "chatgpt-"):
+        register_tokenizer(_prefix, TiktokenTokenizer)
+except ImportError:
+    pass
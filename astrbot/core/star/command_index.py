@@ -0,0 +1,76 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Set
+from .star_handler import StarHandlerRegistry, StarHandlerMetadata, EventType, star_handlers_registry
+from .filter.command import CommandFilter
+from .filter.command_group import CommandGroupFilter
+from .filter.regex import RegexFilter, RegexDispatcher
+
+class CommandIndex():
+    '''AdapterMessageEvent Handler 的指令索引。
+    
+    以指令名、指令组名为 key，建立到 Handler 列表的哈希表。对于一条消息，只需要用它的第一个词查一次表，
+    就能得到需要检查 filter 的 Handler：第一个词对应的指令类 Handler，以及所有不含指令 filter 的 Handler（正则、消息类型、平台等）。
+    其余指令类 Handler 的 filter 不会被执行。返回的 Handler 保持注册顺序。
+    
+    所有 Handler 的 RegexFilter 被合并到一个 `RegexDispatcher` 中，一条消息只需要匹配一次。
+    
+    索引在插件载入时构建。注册表发生变化后，下一次查询会自动重建。
+    '''
+    def __init__(self, registry: StarHandlerRegistry):
+        self.registry = registry
+        self._by_token: Dict[str, List[StarHandlerMetadata]] = {}
+        self._non_command: List[StarHandlerMetadata] = []
+        self.regex_dispatcher = RegexDispatcher()
+        self._version = -1
+        
+    @staticmethod
+    def get_command_name(handler: StarHandlerMetadata) -> Optional[str]:
+        '''获取 Handler 的指令名或者指令组名。不是指令类 Handler 时返回 None。
+        
+        filter 之间是 AND 的关系，因此有多个指令 filter 时，只需要取第一个。
+        '''
+        for event_filter in handler.event_filters:
+            if isinstance(event_filter, CommandFilter):
+                return event_filter.command_name
+            if isinstance(event_filter, CommandGroupFilter):
+                return event_filter.group_name
+        return None
+        
+    def build(self):
+        '''根据注册表构建索引'''
+        non_command = []
+        by_token: Dict[str, list] = {}
+        regex_filters = []
+        handlers = self.registry.get_handlers_by_event_type(EventType.AdapterMessageEvent)
+        for pos, handler in enumerate(handlers):
+            if not handler.event_filters:
+                # 没有 filter 的 Handler 不会被激活
+                continue
+            regex_filters.extend(f for f in handler.event_filters if isinstance(f, RegexFilter))
+            name = self.get_command_name(handler)
+            if name is None:
+                non_command.append((pos, handler))
+            else:
+                by_token.setdefault(name, []).append((pos, handler))
+
+        self._non_command = [handler for _, handler in non_command]
+        self._by_token = {
+            name: [handler for _, handler in sorted(cmd_handlers + non_command, key=lambda x: x[0])]
+            for name, cmd_handlers in by_token.items()
+        }
+        self.regex_dispatcher.build(regex_filters)
+        self._version = self.registry.version
+        
+    def get_candidates(self, first_token: str) -> List[StarHandlerMetadata]:
+        '''获取第一个词为 first_token 的消息需要检查的 Handler 列表。返回的列表不应被修改。'''
+        if self._version != self.registry.version:
+            self.build()
+        return self._by_token.get(first_token, self._non_command)
+
+    def match_regex_filters(self, text: str) -> Set[RegexFilter]:
+        '''一次性匹配所有已索引的 RegexFilter，返回 match 成功的那些'''
+        if self._version != self.registry.version:
+            self.build()
+        return self.regex_dispatcher.match(text)
+
+command_index = CommandIndex(star_handlers_registry)
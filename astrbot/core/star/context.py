@@ -87,7 +87,7 @@ class Context:
             desc=desc
         )
         star_handlers_registry.append(md)
-        self.provider_manager.llm_tools.add_func(name, func_args, desc, func_obj, func_obj)
+        self.provider_manager.llm_tools.add_func(name, func_args, desc, func_obj)
     
     def unregister_llm_tool(self, name: str) -> None:
         '''删除一个函数调用工具。如果再要启用，需要重新注册。'''
@@ -99,22 +99,14 @@ class Context:
         Returns:
             如果没找到，会返回 False
         '''
-        func_tool = self.provider_manager.llm_tools.get_func(name)
-        if func_tool is not None:
-            func_tool.active = True
-            return True
-        return False
+        return self.provider_manager.llm_tools.set_active(name, True)
             
     def deactivate_llm_tool(self, name: str) -> bool:
         '''停用一个已经注册的函数调用工具。
         
         Returns:
             如果没找到，会返回 False'''
-        func_tool = self.provider_manager.llm_tools.get_func(name)
-        if func_tool is not None:
-            func_tool.active = False
-            return True
-        return False
+        return self.provider_manager.llm_tools.set_active(name, False)
     
     def register_commands(self, star_name: str, command_name: str, desc: str, priority: int, awaitable: Awaitable, use_regex=False, ignore_prefix=False):
         '''
@@ -1,6 +1,6 @@
 
-import re
 import inspect
+from typing import Tuple
 from . import HandlerFilter
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.config import AstrBotConfig
@@ -45,26 +45,18 @@ class CommandFilter(HandlerFilter, ParameterValidationMixin):
     def filter(self, event: AstrMessageEvent, cfg: AstrBotConfig) -> bool:
         if not event.is_wake_up():
             return False
+        return self.match_tokens(event, event.get_parsed_message().tokens)
+    
+    def match_tokens(self, event: AstrMessageEvent, tokens: Tuple[str, ...]) -> bool:
+        '''检查以 tokens[0] 开头的指令是否为本指令。tokens 可以是消息分词结果的一个切片，如指令组下的子指令。
         
-        message_str = event.get_message_str().strip()
-        # 分割为列表（每个参数之间可能会有多个空格）
-        ls = re.split(r"\s+", message_str)
-        if self.command_name != ls[0]:
+        匹配成功时，解析后的参数会被放入 event 的 extra 中。
+        '''
+        if not tokens or self.command_name != tokens[0]:
             return False
-        if len(self.handler_params) == 0 and len(ls) > 1:
+        if len(self.handler_params) == 0 and len(tokens) > 1:
             # 一定程度避免 LLM 聊天时误判为指令
             return False
-        # params_str = message_str[len(self.command_name):].strip()
-        ls = ls[1:]
-        # 去除空字符串
-        ls = [param for param in ls if param]
-        params = {}
-        try:
-            params = self.validate_and_convert_params(ls, self.handler_params)
-            
-        except ValueError as e:
-            raise e
-        
+        params = self.validate_and_convert_params(list(tokens[1:]), self.handler_params)
         event.set_extra("parsed_params", params)
-        
-        return True
\ No newline at end of file
+        return True
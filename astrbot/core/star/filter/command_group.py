@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import re
 from typing import List, Union, Tuple
 from . import HandlerFilter
 from .command import CommandFilter
@@ -39,32 +38,26 @@ class CommandGroupFilter(HandlerFilter):
     def filter(self, event: AstrMessageEvent, cfg: AstrBotConfig) -> Tuple[bool, StarHandlerMetadata]:
         if not event.is_wake_up():
             return False, None
-        
-        message_str = event.get_message_str().strip()
-        ls = re.split(r"\s+", message_str)
-        
-        if ls[0] != self.group_name:
+        return self.match_tokens(event, cfg, event.get_parsed_message().tokens)
+    
+    def match_tokens(self, event: AstrMessageEvent, cfg: AstrBotConfig, tokens: Tuple[str, ...]) -> Tuple[bool, StarHandlerMetadata]:
+        '''检查以 tokens[0] 开头的指令是否属于本指令组。子指令（组）使用去掉指令组名后的 tokens 切片继续匹配，不会改写 message_str。'''
+        if not tokens or tokens[0] != self.group_name:
             return False, None
-        # 改写 message_str
-        ls = ls[1:]
-        event.message_str = " ".join(ls)
-        event.message_str = event.message_str.strip()
+        sub_tokens = tokens[1:]
         
-        if event.message_str == "":
+        if not sub_tokens:
             # 当前还是指令组
             tree = self.group_name + "\n" + self.print_cmd_tree(self.sub_command_filters)
             raise ValueError(f"指令组 {self.group_name} 未填写完全。这个指令组下有如下指令：\n"+tree)
         
-        child_command_handler_md = None
         for sub_filter in self.sub_command_filters:
             if isinstance(sub_filter, CommandFilter):
-                if sub_filter.filter(event, cfg):
-                    child_command_handler_md = sub_filter.get_handler_md()
-                    return True, child_command_handler_md
+                if sub_filter.match_tokens(event, sub_tokens):
+                    return True, sub_filter.get_handler_md()
             elif isinstance(sub_filter, CommandGroupFilter):
-                ok, handler = sub_filter.filter(event, cfg)
+                ok, handler = sub_filter.match_tokens(event, cfg, sub_tokens)
                 if ok:
-                    child_command_handler_md = handler
-                    return True, child_command_handler_md
+                    return True, handler
         tree = self.group_name + "\n" + self.print_cmd_tree(self.sub_command_filters)
         raise ValueError(f"指令组 {self.group_name} 下没有找到对应的指令。这个指令组下有如下指令：\n"+tree)
@@ -1,5 +1,5 @@
-
 import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from . import HandlerFilter
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.config import AstrBotConfig
@@ -11,4 +11,130 @@ class RegexFilter(HandlerFilter):
         self.regex = re.compile(regex)
         
     def filter(self, event: AstrMessageEvent, cfg: AstrBotConfig) -> bool:
-        return bool(self.regex.match(event.get_message_str().strip()))
\ No newline at end of file
+        return bool(self.regex.match(event.get_parsed_message().text))
+
+try:
+    from re import _parser as sre_parse
+except ImportError: # Python < 3.11
+    import sre_parse
+
+_BACKREF = re.compile(r"\\[1-9]")
+_CONDITIONAL = re.compile(r"\(\?\(")
+_GLOBAL_FLAG = re.compile(r"\(\?[aiLmsux]+\)")
+
+def _first_literal(regex: re.Pattern) -> Optional[str]:
+    '''获取表达式 match 成功时，消息的第一个字符必须是的字符。无法确定时返回 None'''
+    if regex.flags & re.IGNORECASE:
+        return None
+    try:
+        parsed = sre_parse.parse(regex.pattern)
+    except Exception:
+        return None
+    for op, av in parsed:
+        if op is sre_parse.AT and av is sre_parse.AT_BEGINNING:
+            continue
+        if op is sre_parse.LITERAL:
+            return chr(av)
+        return None
+    return None
+
+class _CombinedRegex():
+    '''若干个表达式合并而成的一个表达式'''
+    def __init__(self, by_pattern: Dict[str, List[RegexFilter]]):
+        parts = [f"(?:(?={pattern})(?P<_r{i}>))?" for i, pattern in enumerate(by_pattern)]
+        self.regex = re.compile("".join(parts))
+        self.slots: List[Tuple[int, List[RegexFilter]]] = [
+            (self.regex.groupindex[f"_r{i}"], group) for i, group in enumerate(by_pattern.values())
+        ]
+        '''组序号 -> 对应的 RegexFilter'''
+    
+    def match(self, text: str, matched: Set[RegexFilter]):
+        regs = self.regex.match(text).regs
+        for idx, group in self.slots:
+            if regs[idx][0] != -1:
+                matched.update(group)
+
+class RegexDispatcher():
+    '''将多个 RegexFilter 合并，一次匹配就能得到所有命中的 RegexFilter。
+    
+    表达式先按照消息的第一个字符必须是的字符（字面量前缀）分桶，无法确定的放入公共桶。一条消息只需要检查公共桶和它的第一个字符对应的桶。
+    每个桶中的表达式被包装为 `(?:(?=表达式)(?P<_rN>))?` 后拼接为一个表达式。所有的前瞻都在消息开头进行，与 `re.match` 的语义一致，
+    捕获到的命名组就对应命中的表达式。相同的表达式只会被匹配一次。
+    
+    使用了命名组、反向引用、条件组或者全局标志（如 `(?i)`）的表达式无法安全地合并，会被单独匹配。
+    '''
+    def __init__(self, filters: Iterable[RegexFilter] = ()):
+        self._by_first_char: Dict[str, _CombinedRegex] = {}
+        self._anywhere: _CombinedRegex = None
+        '''没有字面量前缀的表达式'''
+        self._standalone: List[RegexFilter] = []
+        '''需要单独匹配的 RegexFilter'''
+        self._known: Set[RegexFilter] = set()
+        self.build(filters)
+        
+    @staticmethod
+    def _can_combine(regex: re.Pattern) -> bool:
+        if regex.groupindex or (regex.groups and _BACKREF.search(regex.pattern)):
+            return False
+        # 合并后组号会变化，条件组 `(?(1)...)` 会引用错误的组
+        if _CONDITIONAL.search(regex.pattern):
+            return False
+        # 全局标志会影响同一个桶中的所有表达式（Python 3.10 中位于表达式中间的 `(?i)` 也会作用于整个表达式）
+        if regex.flags & ~re.UNICODE or _GLOBAL_FLAG.search(regex.pattern):
+            return False
+        try:
+            re.compile(f"(?:(?={regex.pattern})(?P<_r>))?")
+        except re.error:
+            return False
+        return True
+    
+    def build(self, filters: Iterable[RegexFilter]):
+        buckets: Dict[Optional[str], Dict[str, List[RegexFilter]]] = {}
+        standalone = []
+        known = set()
+        for regex_filter in filters:
+            if regex_filter in known:
+                continue
+            known.add(regex_filter)
+            regex = regex_filter.regex
+            if self._can_combine(regex):
+                bucket = buckets.setdefault(_first_literal(regex), {})
+                bucket.setdefault(regex.pattern, []).append(regex_filter)
+            else:
+                standalone.append(regex_filter)
+        
+        by_first_char = {}
+        anywhere = None
+        for first_char, by_pattern in buckets.items():
+            try:
+                combined = _CombinedRegex(by_pattern)
+            except re.error:
+                # 理论上不会发生。退化为逐个匹配
+                for group in by_pattern.values():
+                    standalone.extend(group)
+                continue
+            if first_char is None:
+                anywhere = combined
+            else:
+                by_first_char[first_char] = combined
+        self._by_first_char = by_first_char
+        self._anywhere = anywhere
+        self._standalone = standalone
+        self._known = known
+    
+    def __contains__(self, regex_filter: RegexFilter) -> bool:
+        return regex_filter in self._known
+        
+    def match(self, text: str) -> Set[RegexFilter]:
+        '''返回所有 match 成功的 RegexFilter'''
+        matched = set()
+        if self._anywhere is not None:
+            self._anywhere.match(text, matched)
+        if text:
+            combined = self._by_first_char.get(text[0])
+            if combined is not None:
+                combined.match(text, matched)
+        for regex_filter in self._standalone:
+            if regex_filter.regex.match(text):
+                matched.add(regex_filter)
+        return matched
@@ -152,7 +152,7 @@ def register_on_llm_request():
     
     return decorator
 
-def register_llm_tool(name: str = None):
+def register_llm_tool(name: str = None, cache_ttl: float = 0):
     '''为函数调用（function-calling / tools-use）添加工具。
     
     请务必按照以下格式编写一个工具（包括函数注释，AstrBot 会尝试解析该函数注释）
@@ -169,6 +169,8 @@ def register_llm_tool(name: str = None):
     ```
     
     可接受的参数类型有：string, number, object, array, boolean。
+    
+    对于结果只取决于参数的工具（如搜索、抓取网页），可以设置 cache_ttl（秒），相同参数的调用在这段时间内直接返回缓存的结果。
     '''
     name_ = name
     
@@ -185,7 +187,7 @@ def register_llm_tool(name: str = None):
                 "description": arg.description
             })
         md = get_handler_or_create(awaitable, EventType.OnCallingFuncToolEvent)
-        llm_tools.add_func(llm_tool_name, args, docstring.short_description, md.handler)
+        llm_tools.add_func(llm_tool_name, args, docstring.short_description, md.handler, cache_ttl)
         
         logger.debug(f"LLM 函数工具 {llm_tool_name} 已注册")
         return awaitable
@@ -1,32 +1,80 @@
 from __future__ import annotations
 import enum
 from dataclasses import dataclass
-from typing import Awaitable, List, Dict, TypeVar, Generic
+from typing import Awaitable, List, Dict, Tuple, TypeVar, Generic
 from .filter import HandlerFilter
 
 T = TypeVar('T', bound='StarHandlerMetadata')
 class StarHandlerRegistry(Generic[T], List[T]):
-    '''用于存储所有的 Star Handler'''
+    '''用于存储所有的 Star Handler
+    
+    除了按注册顺序保存所有 Handler 外，还按事件类型和模块路径分桶。桶在添加、删除 Handler 时增量更新，
+    查询时直接返回桶本身，不需要遍历所有 Handler，也不会创建新的列表。
+    '''
     
     star_handlers_map: Dict[str, StarHandlerMetadata] = {}
     '''用于快速查找。key 是 handler_full_name'''
     
+    version: int = 0
+    '''每次添加、删除 Handler 时递增，用于使基于注册表构建的索引失效'''
+    
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._event_type_buckets: Dict[EventType, Tuple[StarHandlerMetadata, ...]] = {}
+        '''按事件类型分桶。桶是不可变的元组，在遍历的同时删除 Handler 也是安全的'''
+        self._module_buckets: Dict[str, Tuple[StarHandlerMetadata, ...]] = {}
+        '''按模块路径分桶'''
+        for handler in self:
+            self._add_to_buckets(handler)
+    
+    def _add_to_buckets(self, handler: StarHandlerMetadata):
+        buckets = self._event_type_buckets
+        buckets[handler.event_type] = buckets.get(handler.event_type, ()) + (handler,)
+        buckets = self._module_buckets
+        buckets[handler.handler_module_path] = buckets.get(handler.handler_module_path, ()) + (handler,)
+    
+    @staticmethod
+    def _remove_from_bucket(buckets: dict, key, handler: StarHandlerMetadata):
+        bucket = list(buckets.get(key, ()))
+        if handler in bucket:
+            bucket.remove(handler)
+        if bucket:
+            buckets[key] = tuple(bucket)
+        else:
+            buckets.pop(key, None)
+    
     def append(self, handler: StarHandlerMetadata):
         '''添加一个 Handler'''
         super().append(handler)
         self.star_handlers_map[handler.handler_full_name] = handler
+        self._add_to_buckets(handler)
+        self.version += 1
+    
+    def remove(self, handler: StarHandlerMetadata):
+        '''删除一个 Handler'''
+        super().remove(handler)
+        self._remove_from_bucket(self._event_type_buckets, handler.event_type, handler)
+        self._remove_from_bucket(self._module_buckets, handler.handler_module_path, handler)
+        self.version += 1
+        
+    def clear(self):
+        '''清空所有 Handler'''
+        super().clear()
+        self._event_type_buckets.clear()
+        self._module_buckets.clear()
+        self.version += 1
         
-    def get_handlers_by_event_type(self, event_type: EventType) -> List[StarHandlerMetadata]:
-        '''通过事件类型获取 Handler'''
-        return [handler for handler in self if handler.event_type == event_type]
+    def get_handlers_by_event_type(self, event_type: EventType) -> Tuple[StarHandlerMetadata, ...]:
+        '''通过事件类型获取 Handler。返回的元组按注册顺序排列'''
+        return self._event_type_buckets.get(event_type, ())
     
     def get_handler_by_full_name(self, full_name: str) -> StarHandlerMetadata:
         '''通过 Handler 的全名获取 Handler'''
         return self.star_handlers_map.get(full_name, None)
     
-    def get_handlers_by_module_name(self, module_name: str) -> List[StarHandlerMetadata]:
-        '''通过模块名获取 Handler'''
-        return [handler for handler in self if handler.handler_module_path == module_name]
+    def get_handlers_by_module_name(self, module_name: str) -> Tuple[StarHandlerMetadata, ...]:
+        '''通过模块名获取 Handler。返回的元组按注册顺序排列'''
+        return self._module_buckets.get(module_name, ())
     
 star_handlers_registry = StarHandlerRegistry()
 
@@ -17,6 +17,7 @@ from astrbot.core.utils.io import remove_dir
 from .star import star_registry, star_map
 from .star_handler import star_handlers_registry
 from astrbot.core.provider.register import llm_tools
+from .command_index import command_index
 
 from .star_handler import star_handlers_registry
 
@@ -222,6 +223,9 @@ class PluginManager:
                 traceback.print_exc()
                 fail_rec += f"加载 {path} 插件时出现问题，原因 {str(e)}\n"
 
+        # 构建指令索引
+        command_index.build()
+
         # 清除 pip.main 导致的多余的 logging handlers
         for handler in logging.root.handlers[:]:
             logging.root.removeHandler(handler)
@@ -0,0 +1,64 @@
+'''
+Aho-Corasick 多模式字符串匹配。
+
+将所有关键词构建为一个确定性有限自动机，扫描一遍文本就能找出其中出现的所有关键词，耗时与关键词的数量无关。
+'''
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+class AhoCorasick():
+    '''关键词自动机。构建完成后不可修改，需要更新关键词时重新构建一个。'''
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = list(dict.fromkeys(k for k in keywords if k))
+        '''去重后的关键词，保持原有顺序。空字符串会被忽略'''
+        
+        # 字典树
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Tuple[int, ...]] = [()]
+        for idx, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    outputs.append(())
+                    goto[state][ch] = nxt
+                state = nxt
+            outputs[state] += (idx,)
+        
+        # 按 BFS 顺序计算失配指针，并把失配转移展开为完整的转移表。
+        # 这样扫描时每个字符只需要查一次表，不需要沿着失配指针回退。
+        transitions: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            transitions[state] = {**transitions[fail[state]], **goto[state]}
+            for ch, nxt in goto[state].items():
+                fail[nxt] = transitions[fail[state]].get(ch, 0) if state else 0
+                outputs[nxt] += outputs[fail[nxt]]
+                queue.append(nxt)
+        
+        self._transitions = transitions
+        self._outputs = outputs
+        
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        '''按出现顺序产出 (关键词结束位置, 关键词)。同一个关键词出现多次时会产出多次'''
+        transitions = self._transitions
+        outputs = self._outputs
+        keywords = self.keywords
+        state = 0
+        for i, ch in enumerate(text):
+            state = transitions[state].get(ch, 0)
+            if outputs[state]:
+                for idx in outputs[state]:
+                    yield i, keywords[idx]
+    
+    def find_all(self, text: str) -> List[str]:
+        '''返回文本中出现的所有关键词（去重，按第一次出现的位置排序）'''
+        return list(dict.fromkeys(keyword for _, keyword in self.iter_matches(text)))
+    
+    def search(self, text: str) -> bool:
+        '''文本中是否出现了任意一个关键词'''
+        return next(self.iter_matches(text), None) is not None
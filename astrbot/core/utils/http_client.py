@@ -0,0 +1,79 @@
+'''
+进程内共享的 HTTP 客户端。
+
+所有对外的 aiohttp 请求都应当通过 `http_client.get_session()` 获取会话，而不是每次创建一个新的 `aiohttp.ClientSession`。
+共享的会话复用 TCP/TLS 连接，并缓存 DNS 解析结果。
+'''
+import asyncio
+import logging
+import aiohttp
+
+logger = logging.getLogger("astrbot")
+
+class HTTPClientManager():
+    '''管理一个共享的 aiohttp.ClientSession。
+    
+    会话在第一次使用时于当前事件循环中创建，事件循环变化或者会话被关闭后会自动重建。
+    由 `AstrBotCoreLifecycle` 在启动时配置、在停止时关闭。
+    '''
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, dns_cache_ttl: int = 300):
+        self.limit = limit
+        '''连接池的总连接数上限'''
+        self.limit_per_host = limit_per_host
+        '''同一个 host 的连接数上限'''
+        self.dns_cache_ttl = dns_cache_ttl
+        '''DNS 缓存时间（秒）'''
+        self._session: aiohttp.ClientSession = None
+        self._loop: asyncio.AbstractEventLoop = None
+        
+    def configure(self, limit: int = None, limit_per_host: int = None, dns_cache_ttl: int = None):
+        '''修改连接池参数。对下一次创建的会话生效'''
+        if limit is not None:
+            self.limit = limit
+        if limit_per_host is not None:
+            self.limit_per_host = limit_per_host
+        if dns_cache_ttl is not None:
+            self.dns_cache_ttl = dns_cache_ttl
+        
+    def get_session(self) -> aiohttp.ClientSession:
+        '''获取共享的会话。需要在事件循环中调用。调用方不应当关闭返回的会话'''
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._discard_stale_session()
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._loop = loop
+        return self._session
+    
+    def _discard_stale_session(self):
+        '''关闭在其他事件循环中创建、没有被关闭的会话'''
+        session, loop = self._session, self._loop
+        self._session = None
+        self._loop = None
+        if session is None or session.closed:
+            return
+        if loop is not None and loop.is_running():
+            # 会话所在的事件循环在其他线程中运行，在那里关闭会话
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        # 事件循环已经结束，无法再异步地关闭会话。应当在事件循环结束前调用 `close`
+        logger.warning("共享的 HTTP 会话所在的事件循环已经结束，但会话没有被关闭。")
+        session.detach()
+    
+    async def close(self):
+        '''关闭共享的会话和其中的所有连接'''
+        session = self._session
+        self._session = None
+        self._loop = None
+        if session is not None and not session.closed:
+            try:
+                await session.close()
+            except Exception as e:
+                logger.warning(f"关闭 HTTP 客户端失败：{e}")
+
+http_client = HTTPClientManager()
@@ -7,6 +7,7 @@ import aiohttp
 import base64
 
 from PIL import Image
+from .http_client import http_client
 
 def on_error(func, path, exc_info):
     '''
@@ -64,45 +65,51 @@ def save_temp_img(img: Image) -> str:
             f.write(img)
     return p
 
-async def download_image_by_url(url: str, post: bool = False, post_data: dict = None) -> str:
+async def download_bytes_by_url(url: str, post: bool = False, post_data: dict = None) -> bytes:
     '''
-    下载图片, 返回 path
+    下载 url 的内容, 返回 bytes。部分图床（如 QQ 的多媒体服务器）需要放宽 SSL 加密套件才能连接
     '''
+    session = http_client.get_session()
     try:
-        async with aiohttp.ClientSession() as session:
-            if post:
-                async with session.post(url, json=post_data) as resp:
-                    return save_temp_img(await resp.read())
-            else:
-                async with session.get(url) as resp:
-                    return save_temp_img(await resp.read())
+        if post:
+            async with session.post(url, json=post_data) as resp:
+                resp.raise_for_status()
+                return await resp.read()
+        else:
+            async with session.get(url) as resp:
+                resp.raise_for_status()
+                return await resp.read()
     except aiohttp.client_exceptions.ClientConnectorSSLError:
         # 关闭SSL验证
         ssl_context = ssl.create_default_context()
         ssl_context.set_ciphers('DEFAULT')
-        async with aiohttp.ClientSession(trust_env=False) as session:
-            if post:
-                async with session.get(url, ssl=ssl_context) as resp:
-                    return save_temp_img(await resp.read())
-            else:
-                async with session.get(url, ssl=ssl_context) as resp:
-                    return save_temp_img(await resp.read())
-    except Exception as e:
-        raise e
+        if post:
+            async with session.post(url, json=post_data, ssl=ssl_context) as resp:
+                resp.raise_for_status()
+                return await resp.read()
+        else:
+            async with session.get(url, ssl=ssl_context) as resp:
+                resp.raise_for_status()
+                return await resp.read()
+
+async def download_image_by_url(url: str, post: bool = False, post_data: dict = None) -> str:
+    '''
+    下载图片, 返回 path
+    '''
+    return save_temp_img(await download_bytes_by_url(url, post, post_data))
     
 async def download_file(url: str, path: str):
     '''
     从指定 url 下载文件到指定路径 path
     '''
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                with open(path, 'wb') as f:
-                    while True:
-                        chunk = await resp.content.read(8192)
-                        if not chunk:
-                            break
-                        f.write(chunk)
+        async with http_client.get_session().get(url) as resp:
+            with open(path, 'wb') as f:
+                while True:
+                    chunk = await resp.content.read(8192)
+                    if not chunk:
+                        break
+                    f.write(chunk)
     except Exception as e:
         raise e
 
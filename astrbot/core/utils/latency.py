@@ -0,0 +1,111 @@
+'''
+固定分桶的延迟直方图。
+
+记录一次耗时只需要一次二分查找和几次加法，适合放在消息处理的热路径上。分位数（p50/p95/p99）在读取时根据分桶估算。
+'''
+from bisect import bisect_left
+from typing import Dict, List
+
+def _make_bounds() -> List[float]:
+    # 0.1ms ~ 约 2 分钟，相邻桶的上界之比为 1.5
+    bounds = []
+    bound = 0.0001
+    while bound < 120:
+        bounds.append(bound)
+        bound *= 1.5
+    return bounds
+
+LATENCY_BUCKET_BOUNDS = tuple(_make_bounds())
+'''每个桶的上界（秒）。最后还有一个没有上界的溢出桶'''
+
+class LatencyHistogram():
+    '''延迟直方图'''
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        '''记录一次耗时，单位为秒'''
+        self.counts[bisect_left(LATENCY_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        '''估算分位数，单位为秒。q 的取值范围为 0~1'''
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            if c == 0:
+                continue
+            if cumulative + c >= target:
+                lower = LATENCY_BUCKET_BOUNDS[i - 1] if i > 0 else 0.0
+                upper = LATENCY_BUCKET_BOUNDS[i] if i < len(LATENCY_BUCKET_BOUNDS) else self.max
+                # 在桶内线性插值
+                value = lower + (upper - lower) * (target - cumulative) / c
+                return min(value, self.max)
+            cumulative += c
+        return self.max
+
+    def snapshot(self) -> dict:
+        '''获取统计结果，耗时的单位为毫秒'''
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "p50_ms": round(self.percentile(0.5) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+        }
+
+    def reset(self):
+        self.counts = [0] * (len(LATENCY_BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+class LatencyRecorder():
+    '''按名称区分的一组延迟直方图'''
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    def get(self, name: str) -> LatencyHistogram:
+        '''获取名为 name 的直方图，不存在时创建'''
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+
+    def record(self, name: str, seconds: float):
+        self.get(name).record(seconds)
+
+    def snapshot(self, sort_by_p95: bool = False) -> Dict[str, dict]:
+        '''获取所有有记录的直方图的统计结果
+
+        Args:
+            sort_by_p95: 是否按 p95 从高到低排列。否则按照直方图创建的顺序排列
+        '''
+        snapshots = {name: h.snapshot() for name, h in self.histograms.items() if h.count}
+        if sort_by_p95:
+            snapshots = dict(sorted(snapshots.items(), key=lambda x: x[1]["p95_ms"], reverse=True))
+        return snapshots
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+pipeline_latency = LatencyHistogram()
+'''整条流水线的耗时'''
+stage_latency = LatencyRecorder()
+'''流水线各个阶段的耗时。key 是阶段的类名'''
+handler_latency = LatencyRecorder()
+'''插件 Handler 的耗时。key 是 handler_full_name'''
+provider_latency = LatencyRecorder()
+'''大模型提供商请求的耗时。key 是提供商 ID'''
@@ -1,8 +1,8 @@
-import aiohttp
 import sys
 import logging
 from astrbot.core.config import VERSION
 from astrbot.core import db_helper, logger
+from astrbot.core.utils.http_client import http_client
 
 logger = logging.getLogger("astrbot")
 
@@ -30,9 +30,8 @@ class Metric():
             pass
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(base_url, json=payload, timeout=3) as response:
-                    if response.status != 200:
-                        pass
+            async with http_client.get_session().post(base_url, json=payload, timeout=3) as response:
+                if response.status != 200:
+                    pass
         except Exception:
             pass
\ No newline at end of file
@@ -0,0 +1,51 @@
+'''
+流式输出的分段缓冲。
+'''
+from typing import List
+
+SENTENCE_ENDINGS = "。！？；…!?;\n"
+'''句子结束的标点。英文的 . 只有后面跟着空白时才算作句子结束'''
+
+class SentenceBuffer():
+    '''累积 LLM 流式输出的文本增量，在句子或者段落的边界处切分为适合作为一条消息发送的片段。
+    
+    为了避免消息刷屏，片段至少有 min_length 个字符，并且尽量在缓冲区中最后一个边界处切分，以便一次发出多句话。
+    没有边界的文本超过 max_length 时，在最后一个空白处（没有则直接）切分。
+    '''
+    def __init__(self, min_length: int = 30, max_length: int = 500):
+        self.min_length = max(1, min_length)
+        self.max_length = max(self.min_length, max_length)
+        self._buffer = ""
+        
+    def _last_boundary(self) -> int:
+        '''返回最后一个边界之后的位置，没有则返回 -1'''
+        buffer = self._buffer
+        for i in range(len(buffer) - 1, self.min_length - 2, -1):
+            ch = buffer[i]
+            if ch in SENTENCE_ENDINGS:
+                return i + 1
+            if ch == "." and i + 1 < len(buffer) and buffer[i + 1].isspace():
+                return i + 1
+        return -1
+        
+    def feed(self, delta: str) -> List[str]:
+        '''添加一段文本增量，返回可以发送的片段'''
+        self._buffer += delta
+        segments = []
+        while len(self._buffer) >= self.min_length:
+            pos = self._last_boundary()
+            if pos == -1:
+                if len(self._buffer) < self.max_length:
+                    break
+                pos = self._buffer.rfind(" ", self.min_length, self.max_length) + 1 or self.max_length
+            segment = self._buffer[:pos].strip()
+            self._buffer = self._buffer[pos:]
+            if segment:
+                segments.append(segment)
+        return segments
+    
+    def flush(self) -> str:
+        '''取出缓冲区中剩余的文本'''
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return rest
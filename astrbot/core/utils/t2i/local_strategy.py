@@ -1,10 +1,10 @@
 import re
-import aiohttp
 from io import BytesIO
 
 from . import RenderStrategy
 from PIL import ImageFont, Image, ImageDraw
 from astrbot.core.utils.io import save_temp_img
+from astrbot.core.utils.http_client import http_client
 
 class LocalRenderStrategy(RenderStrategy):
 
@@ -83,9 +83,8 @@ class LocalRenderStrategy(RenderStrategy):
                 try:
                     image_url = re.findall(IMAGE_REGEX, line)[0]
                     print(image_url)
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(image_url) as resp:
-                            image_res = Image.open(BytesIO(await resp.read()))
+                    async with http_client.get_session().get(image_url) as resp:
+                        image_res = Image.open(BytesIO(await resp.read()))
                     images[i] = image_res
                     # 最大不得超过image_width的50%
                     img_height = image_res.size[1]
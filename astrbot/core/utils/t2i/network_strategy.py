@@ -1,9 +1,9 @@
-import aiohttp
 import os
 
 from . import RenderStrategy
 from astrbot.core.config import VERSION
 from astrbot.core.utils.io import download_image_by_url
+from astrbot.core.utils.http_client import http_client
 
 ASTRBOT_T2I_DEFAULT_ENDPOINT = "https://t2i.soulter.top/text2img"
 
@@ -33,10 +33,9 @@ class NetworkRenderStrategy(RenderStrategy):
             }
         }
         if return_url:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.BASE_RENDER_URL}/generate", json=post_data) as resp:
-                    ret = await resp.json()
-                    return f"{self.BASE_RENDER_URL}/{ret['data']['id']}"
+            async with http_client.get_session().post(f"{self.BASE_RENDER_URL}/generate", json=post_data) as resp:
+                ret = await resp.json()
+                return f"{self.BASE_RENDER_URL}/{ret['data']['id']}"
         return await download_image_by_url(f"{self.BASE_RENDER_URL}/generate", post=True, post_data=post_data)
 
 
@@ -0,0 +1,76 @@
+'''
+带过期时间的 LRU 缓存。
+'''
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Tuple
+
+_MISSING = object()
+
+class TTLCache():
+    '''带过期时间的 LRU 缓存。
+    
+    超过 max_size 个条目，或者条目的总大小超过 max_bytes 时，淘汰最久未使用的条目。
+    条目的大小由写入时的 size 参数给出，max_bytes 为 0 时不限制总大小。
+    条目在写入 ttl 秒后过期，过期的条目在读取时删除。ttl 小于等于 0 时不过期。
+    '''
+    def __init__(self, max_size: int = 1024, ttl: float = 600, max_bytes: int = 0):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        '''当前所有条目的总大小'''
+        self._data: OrderedDict[Hashable, Tuple[float, Any, int]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            self.misses += 1
+            return default
+        expire_at, value, _ = item
+        if expire_at and expire_at <= time.monotonic():
+            self.pop(key)
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl: float = None, size: int = 0):
+        '''写入一个条目。ttl 为 None 时使用默认的过期时间'''
+        ttl = self.ttl if ttl is None else ttl
+        expire_at = time.monotonic() + ttl if ttl > 0 else 0
+        self.pop(key)
+        self._data[key] = (expire_at, value, size)
+        self.total_bytes += size
+        while len(self._data) > self.max_size or (self.max_bytes and self.total_bytes > self.max_bytes and len(self._data) > 1):
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self.total_bytes -= evicted_size
+            
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, _MISSING)
+        if item is _MISSING:
+            return default
+        self.total_bytes -= item[2]
+        return item[1]
+    
+    def clear(self):
+        self._data.clear()
+        self.total_bytes = 0
+        
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -1,8 +1,8 @@
-import aiohttp
 import os
 import zipfile
 import shutil
 from astrbot.core.utils.io import on_error, download_file
+from astrbot.core.utils.http_client import http_client
 from astrbot.core import logger
 
 class ReleaseInfo():
@@ -29,9 +29,8 @@ class RepoZipUpdator():
         返回一个列表，每个元素是一个字典，包含版本号、发布时间、更新内容、commit hash等信息。
         '''
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    result = await response.json()
+            async with http_client.get_session().get(url) as response:
+                result = await response.json()
             if not result: 
                 return []
             if latest:
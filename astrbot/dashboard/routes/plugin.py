@@ -1,8 +1,8 @@
 import traceback
-import aiohttp
 import uuid
 from .route import Route, Response, RouteContext
 from astrbot.core import logger
+from astrbot.core.utils.http_client import http_client
 from quart import request
 from astrbot.core.star.star_manager import PluginManager
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
@@ -25,9 +25,8 @@ class PluginRoute(Route):
     async def get_online_plugins(self):
         url = "https://soulter.github.io/AstrBot_Plugins_Collection/plugins.json"
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    result = await response.json()
+            async with http_client.get_session().get(url) as response:
+                result = await response.json()
             return Response().ok(result).__dict__
         except Exception as e:
             logger.error(f"获取插件列表失败：{e}")
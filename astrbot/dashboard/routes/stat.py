@@ -1,13 +1,17 @@
 import traceback
 import psutil
 import time
-import aiohttp
 from .route import Route, Response, RouteContext
 from astrbot.core import logger
+from astrbot.core.utils.http_client import http_client
 from quart import request
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
 from astrbot.core.db import BaseDatabase
 from astrbot.core.config import VERSION
+from astrbot.core.utils.latency import pipeline_latency, stage_latency, handler_latency, provider_latency
+from astrbot.core.pipeline.rate_limit_check.stage import rate_limit_stats
+from astrbot.core.provider.response_cache import llm_response_cache
+from astrbot.core.provider.image_processor import image_processor
 
 class StatRoute(Route):
     def __init__(self, context: RouteContext, db_helper: BaseDatabase, core_lifecycle: AstrBotCoreLifecycle) -> None:
@@ -17,7 +21,9 @@ class StatRoute(Route):
             '/stat/version': ('GET', self.get_version),
             '/stat/dashboard-version': ('GET', self.get_dashboard_version),
             '/stat/start-time': ('GET', self.get_start_time),
-            '/stat/restart-core': ('GET', self.restart_core)
+            '/stat/restart-core': ('GET', self.restart_core),
+            '/stat/latency': ('GET', self.get_latency),
+            '/stat/latency/reset': ('POST', self.reset_latency)
         }
         self.db_helper = db_helper
         self.register_routes()
@@ -38,13 +44,12 @@ class StatRoute(Route):
         }).__dict__
         
     async def get_dashboard_version(self):
-        async with aiohttp.ClientSession() as session:
-            async with session.get('https://api.github.com/repos/Soulter/Astrbot-dashboard/actions/artifacts') as resp:
-                data = await resp.json()
-                return Response().ok({
-                    "data": data,
-                    "mark": "unimplemented feature"
-                }).__dict__
+        async with http_client.get_session().get('https://api.github.com/repos/Soulter/Astrbot-dashboard/actions/artifacts') as resp:
+            data = await resp.json()
+            return Response().ok({
+                "data": data,
+                "mark": "unimplemented feature"
+            }).__dict__
         
         
     async def get_start_time(self):
@@ -52,6 +57,22 @@ class StatRoute(Route):
             "start_time": self.core_lifecycle.start_time
         }).__dict__
     
+    async def get_latency(self):
+        '''获取流水线、各阶段以及各插件 Handler 的耗时分布（毫秒）。Handler 按 p95 从高到低排列'''
+        return Response().ok({
+            "pipeline": pipeline_latency.snapshot(),
+            "stages": stage_latency.snapshot(),
+            "handlers": handler_latency.snapshot(sort_by_p95=True),
+            "providers": provider_latency.snapshot()
+        }).__dict__
+        
+    async def reset_latency(self):
+        pipeline_latency.reset()
+        stage_latency.reset()
+        handler_latency.reset()
+        provider_latency.reset()
+        return Response().ok().__dict__
+    
     async def get_stat(self):
         offset_sec = request.args.get('offset_sec', 86400)
         offset_sec = int(offset_sec)
@@ -76,6 +97,27 @@ class StatRoute(Route):
                 "message_count": self.db_helper.get_total_message_count() or 0,
                 "platform_count": len(self.core_lifecycle.platform_manager.get_insts()),
                 "plugin_count": len(self.core_lifecycle.star_context.get_all_stars()),
+                "event_bus": {
+                    **self.core_lifecycle.event_bus.get_stats(),
+                    "dropped": sum(p.dropped_events for p in self.core_lifecycle.platform_manager.get_insts()),
+                },
+                "rate_limit": rate_limit_stats,
+                "llm_response_cache": llm_response_cache.get_stats(),
+                "image_cache": image_processor.get_stats(),
+                "tool_cache": self.core_lifecycle.provider_manager.llm_tools.result_cache.get_stats(),
+                "routing": {
+                    inst.provider_config['id']: inst.get_stats() for inst in self.core_lifecycle.provider_manager.get_insts()
+                    if inst.provider_config['type'] == "routing"
+                },
+                "provider_concurrency": {
+                    inst.provider_config['id']: inst.concurrency.get_stats() for inst in self.core_lifecycle.provider_manager.get_insts()
+                },
+                "api_keys": {
+                    inst.provider_config['id']: inst.key_pool.get_stats() for inst in self.core_lifecycle.provider_manager.get_insts()
+                },
+                "session_memory": {
+                    inst.provider_config['id']: inst.session_memory.get_stats() for inst in self.core_lifecycle.provider_manager.get_insts()
+                },
                 "message_time_series": message_time_based_stats,
                 "running": self.format_sec(int(time.time()) - self.core_lifecycle.start_time),
                 "memory": {
@@ -0,0 +1,57 @@
+'''Handler 注册表查询微基准测试
+
+注册数百个 Handler（分布在多个插件模块和事件类型上），对比逐个遍历过滤的旧实现与分桶索引的查询耗时。
+每个事件在流水线中大约会按事件类型查询 4 次（唤醒检查、LLM 请求、结果装饰、发送后）。
+
+运行：python benchmarks/bench_star_handler_registry.py
+'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from astrbot.core.star.star_handler import StarHandlerRegistry, StarHandlerMetadata, EventType  # noqa: E402
+
+MODULES = 40
+HANDLERS_PER_MODULE = 10
+LOOKUPS = 200000
+
+async def _handler(event):
+    pass
+
+def make_registry() -> StarHandlerRegistry:
+    registry = StarHandlerRegistry()
+    event_types = list(EventType)
+    for m in range(MODULES):
+        for h in range(HANDLERS_PER_MODULE):
+            # 大部分 Handler 处理适配器消息事件
+            event_type = EventType.AdapterMessageEvent if h < 7 else event_types[h % len(event_types)]
+            registry.append(StarHandlerMetadata(
+                event_type=event_type,
+                handler_full_name=f"plugin_{m}_handler_{h}",
+                handler_name=f"handler_{h}",
+                handler_module_path=f"plugin_{m}",
+                handler=_handler,
+                event_filters=[]
+            ))
+    return registry
+
+def bench(name: str, lookup):
+    event_types = (EventType.AdapterMessageEvent, EventType.OnLLMRequestEvent,
+                   EventType.OnDecoratingResultEvent, EventType.OnAfterMessageSentEvent)
+    start = time.perf_counter()
+    for i in range(LOOKUPS):
+        for _ in lookup(event_types[i & 3]):
+            pass
+    elapsed = time.perf_counter() - start
+    print(f"{name:<8} {LOOKUPS / elapsed:>12,.0f} lookups/s  ({elapsed * 1e6 / LOOKUPS:.2f} us/lookup)")
+
+def main():
+    registry = make_registry()
+    print(f"handlers: {len(registry)}")
+    bench("scan", lambda t: [h for h in registry if h.event_type == t])
+    bench("bucket", registry.get_handlers_by_event_type)
+
+if __name__ == "__main__":
+    main()
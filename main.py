@@ -2,11 +2,11 @@ import os
 import asyncio
 import sys
 import mimetypes
-import aiohttp
 import zipfile
 from astrbot.dashboard import AstrBotDashBoardLifecycle
 from astrbot.core import db_helper
 from astrbot.core import logger, LogManager, LogBroker
+from astrbot.core.utils.http_client import http_client
 
 # add parent path to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -42,8 +42,8 @@ async def check_dashboard_files():
     dashboard_release_url = "https://astrbot-registry.soulter.top/download/astrbot-dashboard/latest/dist.zip"
     logger.info("开始下载管理面板文件...")
     ok = False
-    async with aiohttp.ClientSession() as session:
-        async with session.get(dashboard_release_url) as resp:
+    try:
+        async with http_client.get_session().get(dashboard_release_url) as resp:
             if resp.status != 200:
                 logger.error(f"下载管理面板文件失败: {resp.status}")
             else:
@@ -51,6 +51,9 @@ async def check_dashboard_files():
                     f.write(await resp.read())
                 logger.info("管理面板文件下载完成。")
                 ok = True
+    finally:
+        # 这里的事件循环随后就会结束，共享的会话不能留到后面的事件循环中使用
+        await http_client.close()
                 
     if not ok:
         logger.critical("下载管理面板文件失败")
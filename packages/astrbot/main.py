@@ -1,9 +1,9 @@
-import aiohttp
 import datetime
 import astrbot.api.star as star
 import astrbot.api.event.filter as filter
 from astrbot.api.event import AstrMessageEvent, MessageEventResult
 from astrbot.api import personalities
+from astrbot.api import http_client
 from astrbot.api.provider import Personality, ProviderRequest
 
 from typing import Union
@@ -19,9 +19,8 @@ class Main(star.Star):
     
     async def _query_astrbot_notice(self):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get("https://astrbot.soulter.top/notice.json", timeout=2) as resp:
-                    return (await resp.json())["notice"]
+            async with http_client.get_session().get("https://astrbot.soulter.top/notice.json", timeout=2) as resp:
+                return (await resp.json())["notice"]
         except BaseException:
             return ""
         
@@ -252,9 +251,18 @@ UID: {user_id} 此 ID 可用于设置管理员。/op <UID> 授权管理员, /deo
         if index is None:
             keys_data = self.context.get_using_provider().get_keys()
             curr_key = self.context.get_using_provider().get_current_key()
+            key_pool = self.context.get_using_provider().key_pool
+            key_stats = {state.key: stat for state, stat in zip(key_pool.states, key_pool.get_stats())}
             ret = "Key:"
             for i, k in enumerate(keys_data):
                 ret += f"\n{i+1}. {k[:8]}"
+                stat = key_stats.get(k)
+                if stat:
+                    ret += f" 请求 {stat['requests']} 次，失败 {stat['errors']} 次"
+                    if stat["disabled"]:
+                        ret += "，已停用"
+                    elif stat["cooldown"]:
+                        ret += f"，冷却中（{stat['cooldown']}s）"
 
             ret += f"\n当前 Key: {curr_key[:8]}"
             ret += "\n当前模型: " + self.context.get_using_provider().get_model()
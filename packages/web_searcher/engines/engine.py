@@ -1,7 +1,7 @@
 import random
 from .config import HEADERS, USER_AGENTS
 from bs4 import BeautifulSoup
-from aiohttp import ClientSession
+from astrbot.api import http_client
 from dataclasses import dataclass
 from typing import List
 
@@ -35,14 +35,13 @@ class SearchEngine():
         headers = self.headers
         headers["Referer"] = url
         headers["User-Agent"] = random.choice(USER_AGENTS)
+        session = http_client.get_session()
         if data:
-            async with ClientSession() as session:
-                async with session.post(url, headers=headers, data=data, timeout=self.TIMEOUT) as resp:
-                    return await resp.text(encoding="utf-8")
+            async with session.post(url, headers=headers, data=data, timeout=self.TIMEOUT) as resp:
+                return await resp.text(encoding="utf-8")
         else:
-            async with ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=self.TIMEOUT) as resp:
-                    return await resp.text(encoding="utf-8")
+            async with session.get(url, headers=headers, timeout=self.TIMEOUT) as resp:
+                return await resp.text(encoding="utf-8")
                 
     
     def tidy_text(self, text: str) -> str:
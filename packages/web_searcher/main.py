@@ -1,9 +1,8 @@
-import aiohttp
 import random
 import astrbot.api.star as star
 import astrbot.api.event.filter as filter
 from astrbot.api.event import AstrMessageEvent, MessageEventResult
-from astrbot.api import llm_tool, logger
+from astrbot.api import llm_tool, logger, http_client
 from .engines.bing import Bing
 from .engines.sogo import Sogo
 from .engines.google import Google
@@ -30,14 +29,14 @@ class Main(star.Star):
         '''获取网页内容'''
         header = HEADERS
         header.update({'User-Agent': random.choice(USER_AGENTS)})
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=header, timeout=6) as response:
-                html = await response.text(encoding="utf-8")
-                doc = Document(html)
-                ret = doc.summary(html_partial=True)
-                soup = BeautifulSoup(ret, 'html.parser')
-                ret = await self._tidy_text(soup.get_text())
-                return ret
+        async with http_client.get_session().get(url, headers=header, timeout=6) as response:
+            response.raise_for_status()
+            html = await response.text(encoding="utf-8")
+            doc = Document(html)
+            ret = doc.summary(html_partial=True)
+            soup = BeautifulSoup(ret, 'html.parser')
+            ret = await self._tidy_text(soup.get_text())
+            return ret
 
     @filter.command("websearch")
     async def websearch(self, event: AstrMessageEvent, oper: str = None) -> str:
@@ -62,7 +61,7 @@ class Main(star.Star):
         else:
             event.set_result(MessageEventResult().message("操作参数错误，应为 on 或 off"))
             
-    @llm_tool("web_search")
+    @llm_tool("web_search", cache_ttl=600)
     async def search_from_search_engine(self, event: AstrMessageEvent, query: str) -> str:
         '''Search the web for answers to the user's query
         
@@ -90,7 +89,8 @@ class Main(star.Star):
                 logger.error(f"sogo search error: {e}")
         if len(results) == 0:
             logger.debug("search sogo failed")
-            return "没有搜索到结果"
+            # 抛出异常而不是返回字符串，避免搜索引擎暂时不可用时“没有结果”被缓存
+            raise Exception("没有搜索到结果")
         ret = ""
         idx = 1
         for i in results:
@@ -105,7 +105,7 @@ class Main(star.Star):
         
         return ret
 
-    @llm_tool("fetch_url")
+    @llm_tool("fetch_url", cache_ttl=600)
     async def fetch_website_content(self, event: AstrMessageEvent, url: str) -> str:
         '''fetch the content of a website with the given web url
         
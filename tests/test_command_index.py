@@ -0,0 +1,130 @@
+import re
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core.star.star_handler import StarHandlerRegistry, StarHandlerMetadata, EventType
+from astrbot.core.star.command_index import CommandIndex
+from astrbot.core.star.filter.command import CommandFilter
+from astrbot.core.star.filter.command_group import CommandGroupFilter
+from astrbot.core.star.filter.regex import RegexFilter, RegexDispatcher
+from astrbot.core.star.filter.event_message_type import EventMessageTypeFilter, EventMessageType
+
+async def _handler(event):
+    pass
+
+def make_handler(name: str, *filters, event_type=EventType.AdapterMessageEvent) -> StarHandlerMetadata:
+    return StarHandlerMetadata(
+        event_type=event_type,
+        handler_full_name=f"test_{name}",
+        handler_name=name,
+        handler_module_path="test",
+        handler=_handler,
+        event_filters=list(filters)
+    )
+
+def test_command_index_candidates():
+    registry = StarHandlerRegistry()
+    help_h = make_handler("help", CommandFilter("help"))
+    regex_h = make_handler("regex", RegexFilter("^hi"))
+    tool_h = make_handler("tool", CommandGroupFilter("tool"))
+    other_h = make_handler("other", EventMessageTypeFilter(EventMessageType.OTHER_MESSAGE))
+    empty_h = make_handler("empty")
+    llm_h = make_handler("llm", event_type=EventType.OnLLMRequestEvent)
+    for h in (help_h, regex_h, tool_h, other_h, empty_h, llm_h):
+        registry.append(h)
+
+    index = CommandIndex(registry)
+    assert index.get_candidates("help") == [help_h, regex_h, other_h]
+    assert index.get_candidates("tool") == [regex_h, tool_h, other_h]
+    assert index.get_candidates("hello") == [regex_h, other_h]
+    assert index.get_candidates("") == [regex_h, other_h]
+
+def test_command_index_rebuilds_on_change():
+    registry = StarHandlerRegistry()
+    index = CommandIndex(registry)
+    assert index.get_candidates("ping") == []
+
+    ping_h = make_handler("ping", CommandFilter("ping"))
+    registry.append(ping_h)
+    assert index.get_candidates("ping") == [ping_h]
+
+    registry.remove(ping_h)
+    assert index.get_candidates("ping") == []
+
+class FakeEvent():
+    def __init__(self, message_str: str):
+        self.message_str = message_str
+        self._parsed_message = None
+        self._extras = {}
+
+    get_parsed_message = AstrMessageEvent.get_parsed_message
+    set_extra = AstrMessageEvent.set_extra
+    get_extra = AstrMessageEvent.get_extra
+
+    def is_wake_up(self):
+        return True
+
+async def _tool_on(self, event, tool_name: str):
+    pass
+
+def test_command_group_does_not_rewrite_message():
+    group = CommandGroupFilter("tool")
+    on_md = make_handler("tool_on")
+    on_md.handler = _tool_on
+    on = CommandFilter("on", on_md)
+    group.add_sub_command_filter(on)
+
+    event = FakeEvent("  tool   on  websearch ")
+    ok, _ = group.filter(event, None)
+    assert ok
+    assert event.get_extra("parsed_params") == {"tool_name": "websearch"}
+    assert event.message_str == "  tool   on  websearch "
+    assert event.get_parsed_message().tokens == ("tool", "on", "websearch")
+    assert event.get_parsed_message().text == "tool   on  websearch"
+    # 缓存直到 message_str 被改写
+    assert event.get_parsed_message() is event.get_parsed_message()
+    event.message_str = "help"
+    assert event.get_parsed_message().first_token() == "help"
+
+def test_registry_buckets():
+    registry = StarHandlerRegistry()
+    a = make_handler("a", CommandFilter("a"))
+    b = make_handler("b", event_type=EventType.OnLLMRequestEvent)
+    c = make_handler("c", CommandFilter("c"))
+    c.handler_module_path = "other"
+    for h in (a, b, c):
+        registry.append(h)
+
+    assert registry.get_handlers_by_event_type(EventType.AdapterMessageEvent) == (a, c)
+    assert registry.get_handlers_by_event_type(EventType.OnAfterMessageSentEvent) == ()
+    assert registry.get_handlers_by_module_name("test") == (a, b)
+    # 遍历的同时删除
+    for h in registry.get_handlers_by_module_name("test"):
+        registry.remove(h)
+    assert registry.get_handlers_by_module_name("test") == ()
+    assert registry.get_handlers_by_event_type(EventType.AdapterMessageEvent) == (c,)
+    registry.clear()
+    assert registry.get_handlers_by_module_name("other") == ()
+
+def test_regex_dispatcher_matches_each_filter():
+    patterns = ["^hi", "hi", "hello|world", "(?i)abc", r"(a)\1", "(?P<x>z)", r"\d+$", "x"]
+    filters = [RegexFilter(p) for p in patterns]
+    dispatcher = RegexDispatcher(filters)
+    for text in ["hi there", "world", "ABC", "aa", "z", "123", "x", ""]:
+        assert dispatcher.match(text) == {f for f in filters if f.regex.match(text)}
+
+def test_regex_dispatcher_conditionals_and_flags():
+    conditional = RegexFilter("(x)?(?(1)y|z)")
+    flagged = RegexFilter("(?i)foo")
+    filters = [RegexFilter("(a)b"), conditional, flagged, RegexFilter("FOO")]
+    dispatcher = RegexDispatcher(filters)
+    assert conditional in dispatcher._standalone and flagged in dispatcher._standalone
+    assert not RegexDispatcher._can_combine(re.compile("foo", re.IGNORECASE))
+    for text in ["xy", "z", "xz", "ab", "FOO", "foo"]:
+        assert dispatcher.match(text) == {f for f in filters if f.regex.match(text)}
+
+def test_command_index_regex_filters():
+    registry = StarHandlerRegistry()
+    f = RegexFilter("^ping")
+    registry.append(make_handler("ping", f))
+    index = CommandIndex(registry)
+    assert index.match_regex_filters("ping!") == {f}
+    assert index.match_regex_filters("pong") == set()
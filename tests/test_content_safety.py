@@ -0,0 +1,71 @@
+import re
+import time
+import random
+import pytest
+from astrbot.core.utils.aho_corasick import AhoCorasick
+from astrbot.core.utils.ttl_cache import TTLCache
+from astrbot.core.pipeline.content_safety_check.strategies.keywords import KeywordsStrategy
+from astrbot.core.pipeline.content_safety_check.strategies.strategy import StrategySelector
+
+def test_aho_corasick_matches_naive_search():
+    keywords = ["he", "she", "his", "hers", "色图", "图片", "a", "aaa"]
+    automaton = AhoCorasick(keywords)
+    rnd = random.Random(0)
+    alphabet = "hers色图片ai "
+    for _ in range(500):
+        text = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 30)))
+        expected = {k for k in keywords if k in text}
+        assert set(automaton.find_all(text)) == expected
+        assert automaton.search(text) == bool(expected)
+    assert list(AhoCorasick(["ab"]).iter_matches("abab")) == [(1, "ab"), (3, "ab")]
+
+def test_keywords_strategy_regex_fallback():
+    strategy = KeywordsStrategy(["^TEST_NEGATIVE", "forbidden"])
+    assert [r.pattern for r in strategy.regex_keywords] == ["^TEST_NEGATIVE"]
+    assert strategy.match("TEST_NEGATIVE")
+    assert not strategy.match("_TEST_NEGATIVE")
+    assert strategy.match("this is forbidden")
+    assert strategy.find_keywords("TEST_NEGATIVE forbidden") == ["forbidden", "^TEST_NEGATIVE"]
+    # 与逐个 re.search 的结果一致
+    for text in ["hello", "TEST_NEGATIVE", "你好世界", "forbidden fruit"]:
+        expected = any(re.search(k, text) for k in strategy.keywords)
+        assert strategy.match(text) == expected
+
+@pytest.mark.asyncio
+async def test_strategy_selector_async():
+    selector = StrategySelector({
+        "internal_keywords": {"enable": True, "extra_keywords": ["^TEST_NEGATIVE"]},
+        "baidu_aip": {"enable": False},
+    })
+    assert (await selector.check("TEST_NEGATIVE"))[0] is False
+    assert (await selector.check("hello"))[0] is True
+
+def test_ttl_cache(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_size=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3) # 淘汰最久未使用的 b
+    assert cache.get("b") is None
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 2
+
+@pytest.mark.asyncio
+async def test_baidu_aip_caches_verdicts():
+    pytest.importorskip("aip")
+    from astrbot.core.pipeline.content_safety_check.strategies.baidu_aip import BaiduAipStrategy
+    strategy = BaiduAipStrategy("appid", "ak", "sk")
+    calls = []
+    def censor(content):
+        calls.append(content)
+        return {"conclusionType": 1, "conclusion": "合规"}
+    strategy.client.textCensorUserDefined = censor
+    for _ in range(3):
+        assert await strategy.check("你好") == (True, "")
+    assert calls == ["你好"]
+    await strategy.check("另一条消息")
+    assert len(calls) == 2
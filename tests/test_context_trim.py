@@ -0,0 +1,145 @@
+import pytest
+from astrbot.core.provider.entites import LLMResponse
+from astrbot.core.provider.tokenizer import (
+    EstimateTokenizer, Tokenizer, count_message_tokens, trim_contexts, get_tokenizer, register_tokenizer
+)
+from astrbot.core.provider.sources.openai_source import ProviderOpenAIOfficial
+
+def test_estimate_tokenizer():
+    tokenizer = EstimateTokenizer()
+    assert tokenizer.count("") == 0
+    assert tokenizer.count("你好世界") == 4
+    assert tokenizer.count("hello world!") == 3
+
+def test_register_tokenizer():
+    class CharTokenizer(Tokenizer):
+        def count(self, text):
+            return len(text)
+    register_tokenizer("fake-model", lambda model: CharTokenizer())
+    assert isinstance(get_tokenizer("Fake-Model-8k"), CharTokenizer)
+    assert isinstance(get_tokenizer("unknown-model"), EstimateTokenizer)
+
+def test_trim_contexts_by_round():
+    tokenizer = EstimateTokenizer()
+    contexts = [
+        {"role": "system", "content": "系统"},
+        {"role": "user", "content": "一" * 20},
+        {"role": "assistant", "content": "二" * 20},
+        {"role": "user", "content": "三" * 20},
+        {"role": "assistant", "content": "四" * 20},
+    ]
+    assert trim_contexts(contexts, 1000, tokenizer) is contexts
+    budget = sum(count_message_tokens(m, tokenizer) for m in contexts) - 1
+    trimmed = trim_contexts(contexts, budget, tokenizer)
+    # 以一问一答为单位丢弃，system 记录保留
+    assert trimmed == [contexts[0], contexts[3], contexts[4]]
+    assert trim_contexts(contexts, 0, tokenizer) == [contexts[0]]
+
+class FakeDB():
+    def __init__(self):
+        self.saved = {}
+
+    def update_llm_history(self, session_id, content, provider_type):
+        self.saved[session_id] = content
+
+class FakeProvider(ProviderOpenAIOfficial):
+    def __init__(self, provider_config: dict, context_limit_error: bool = False):
+        super().__init__(provider_config, {"default_personality": ""}, FakeDB(), persistant_history=False)
+        self.context_limit_error = context_limit_error
+        self.sent = []
+
+    async def _query(self, payloads, tools):
+        self.sent.append(payloads["messages"])
+        if self.context_limit_error:
+            self.context_limit_error = False
+            raise Exception("This model's maximum context length is 8192 tokens.")
+        return LLMResponse("assistant", "好的")
+
+    async def _query_stream(self, payloads, tools):
+        llm_response = await self._query(payloads, tools)
+        yield LLMResponse("assistant", llm_response.completion_text, is_chunk=True)
+        yield llm_response
+
+def make_config(max_context_tokens: int) -> dict:
+    return {
+        "id": "fake", "type": "openai_chat_completion", "key": ["sk-fake"], "api_base": "http://localhost",
+        "max_context_tokens": max_context_tokens, "model_config": {"model": "unknown-model"},
+    }
+
+def history(rounds: int) -> list:
+    contexts = []
+    for i in range(rounds):
+        contexts.append({"role": "user", "content": f"问题{i}" + "啊" * 50})
+        contexts.append({"role": "assistant", "content": f"回答{i}" + "嗯" * 50})
+    return contexts
+
+@pytest.mark.asyncio
+async def test_text_chat_trims_session_memory():
+    provider = FakeProvider(make_config(300))
+    provider.session_memory["sid"] = history(5)
+    llm_response = await provider.text_chat("你好", "sid", system_prompt="你是一个助手")
+    assert llm_response.completion_text == "好的"
+    sent = provider.sent[0]
+    assert sent[0]["role"] == "system" and sent[-1]["content"] == "你好"
+    tokenizer = EstimateTokenizer()
+    assert sum(count_message_tokens(m, tokenizer) for m in sent) <= 300
+    assert sent[1]["role"] == "user"
+    # 裁剪后的上下文被保存
+    assert provider.session_memory["sid"][:-2] == sent[1:-1]
+
+@pytest.mark.asyncio
+async def test_text_chat_retries_on_context_length_error():
+    provider = FakeProvider(make_config(0), context_limit_error=True)
+    provider.session_memory["sid"] = history(3)
+    llm_response = await provider.text_chat("你好", "sid")
+    assert llm_response.completion_text == "好的"
+    assert len(provider.sent) == 2
+    assert len(provider.sent[1]) == len(provider.sent[0]) - 2
+    assert len(provider.session_memory["sid"]) == 6
+
+@pytest.mark.asyncio
+async def test_text_chat_stream_retries_on_context_length_error():
+    provider = FakeProvider(make_config(0), context_limit_error=True)
+    provider.session_memory["sid"] = history(3)
+    responses = [r async for r in provider.text_chat_stream("你好", "sid")]
+    assert [r.is_chunk for r in responses] == [True, False]
+    assert len(provider.sent) == 2
+    assert len(provider.sent[1]) == len(provider.sent[0]) - 2
+    assert len(provider.session_memory["sid"]) == 6
+
+@pytest.mark.asyncio
+async def test_empty_contexts_use_session_memory():
+    provider = FakeProvider(make_config(0))
+    provider.session_memory["sid"] = history(2)
+    await provider.text_chat("你好", "sid", contexts=[])
+    assert len(provider.sent[0]) == 5
+    assert len(provider.session_memory["sid"]) == 6
+
+@pytest.mark.asyncio
+async def test_summarizer_compacts_in_background():
+    import asyncio
+    from astrbot.core.provider.summarizer import ContextSummarizer, SUMMARY_PREFIX
+
+    class SummaryProvider(FakeProvider):
+        async def _query(self, payloads, tools):
+            self.sent.append(payloads["messages"])
+            if payloads["messages"][0]["content"].startswith("你是一个对话总结助手"):
+                await asyncio.sleep(0.01)
+                return LLMResponse("assistant", "用户问了五个问题")
+            return LLMResponse("assistant", "好的")
+
+    summarizer = ContextSummarizer()
+    summarizer.configure({"enable": True, "max_turns": 5, "max_tokens": 0, "keep_turns": 2})
+    provider = SummaryProvider(make_config(0))
+    provider.session_memory["sid"] = history(5)
+    await provider.text_chat("第六个问题", "sid")
+    summarizer.maybe_schedule(provider, "sid")
+    # 总结在后台进行，不影响会话继续对话
+    await provider.text_chat("第七个问题", "sid")
+    await asyncio.gather(*summarizer._tasks.values())
+
+    memory = provider.session_memory["sid"]
+    assert memory[0] == {"role": "system", "content": SUMMARY_PREFIX + "用户问了五个问题"}
+    assert [r["content"] for r in memory[1:] if r["role"] == "user"] == ["第六个问题", "第七个问题"]
+    assert summarizer.get_stats()["summarized"] == 1
+    assert "sid" in provider.db_helper.saved
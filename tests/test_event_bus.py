@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from asyncio import Queue
+from astrbot.core.event_bus import EventBus
+from astrbot.core.pipeline.session_executor import SessionOrderedExecutor
+from astrbot.core.platform import Platform, PlatformMetadata
+
+class FakeScheduler():
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.running_sessions = set()
+        self.session_overlapped = False
+        self.done = []
+
+    async def execute(self, event):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        if event.unified_msg_origin in self.running_sessions:
+            self.session_overlapped = True
+        self.running_sessions.add(event.unified_msg_origin)
+        await asyncio.sleep(0.01)
+        self.running_sessions.discard(event.unified_msg_origin)
+        self.running -= 1
+        self.done.append(event)
+
+class FakeEvent():
+    def __init__(self, idx: int, session: str = None):
+        self.idx = idx
+        self.unified_msg_origin = session if session else f"test_platform:GroupMessage:{idx}"
+
+    def get_sender_name(self):
+        return "mika"
+
+    def get_sender_id(self):
+        return "123456"
+
+    def get_platform_name(self):
+        return "test_platform"
+
+    def get_message_outline(self):
+        return str(self.idx)
+
+class FakePlatform(Platform):
+    def run(self):
+        pass
+
+    def meta(self) -> PlatformMetadata:
+        return PlatformMetadata("test_platform", "test")
+
+@pytest.mark.asyncio
+async def test_event_bus_bounded_workers():
+    event_queue = Queue()
+    scheduler = FakeScheduler()
+    event_bus = EventBus(event_queue, scheduler, worker_count=3)
+    for i in range(20):
+        event_queue.put_nowait(FakeEvent(i))
+    task = asyncio.create_task(event_bus.dispatch())
+    await asyncio.wait_for(event_queue.join(), timeout=5)
+    task.cancel()
+
+    assert len(scheduler.done) == 20
+    assert scheduler.max_running == 3
+    stats = event_bus.get_stats()
+    assert stats["in_flight"] == 0
+    assert stats["dispatched"] == 20
+    assert stats["queue_depth"] == 0
+
+def test_commit_event_backpressure():
+    platform = FakePlatform(Queue(maxsize=2))
+    assert platform.commit_event(FakeEvent(0)) is True
+    assert platform.commit_event(FakeEvent(1)) is True
+    assert platform.commit_event(FakeEvent(2)) is False
+    assert platform.dropped_events == 1
+
+@pytest.mark.asyncio
+async def test_session_ordered_executor():
+    scheduler = FakeScheduler()
+    executor = SessionOrderedExecutor(scheduler)
+    events = [FakeEvent(i, f"session_{i % 2}") for i in range(10)]
+    await asyncio.gather(*[executor.execute(event) for event in events])
+
+    assert not scheduler.session_overlapped
+    # 不同会话之间并行
+    assert scheduler.max_running == 2
+    for session in ("session_0", "session_1"):
+        idxs = [e.idx for e in scheduler.done if e.unified_msg_origin == session]
+        assert idxs == sorted(idxs)
+    assert executor.get_stats()["active_sessions"] == 0
+
+@pytest.mark.asyncio
+async def test_session_ordered_executor_drops_overflow():
+    scheduler = FakeScheduler()
+    executor = SessionOrderedExecutor(scheduler, max_pending_per_session=2)
+    events = [FakeEvent(i, "session") for i in range(5)]
+    await asyncio.gather(*[executor.execute(event) for event in events])
+
+    assert [e.idx for e in scheduler.done] == [0, 1, 2]
+    assert executor.dropped == 2
@@ -0,0 +1,28 @@
+import pytest
+from astrbot.core.utils.http_client import HTTPClientManager
+
+@pytest.mark.asyncio
+async def test_http_client_reuses_session():
+    manager = HTTPClientManager(limit=20, limit_per_host=5, dns_cache_ttl=60)
+    session = manager.get_session()
+    assert manager.get_session() is session
+    assert session.connector.limit == 20
+    assert session.connector.limit_per_host == 5
+
+    await manager.close()
+    assert session.closed
+    assert manager.get_session() is not session
+    await manager.close()
+
+def test_http_client_discards_session_from_finished_loop():
+    import asyncio
+    manager = HTTPClientManager()
+
+    async def get():
+        return manager.get_session()
+
+    old = asyncio.run(get())
+    new = asyncio.run(get())
+    assert new is not old
+    assert old.closed
+    new.detach()
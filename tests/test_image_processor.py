@@ -0,0 +1,99 @@
+import io
+import base64
+import pytest
+from PIL import Image
+from astrbot.core.provider.image_processor import ImageProcessor, detect_mime
+
+def make_image(size, mode="RGB", fmt="PNG") -> bytes:
+    buf = io.BytesIO()
+    Image.new(mode, size, (255, 0, 0, 128) if mode == "RGBA" else (255, 0, 0)).save(buf, format=fmt)
+    return buf.getvalue()
+
+def decode(data_url: str):
+    header, data = data_url.split(",", 1)
+    return header[len("data:"):-len(";base64")], Image.open(io.BytesIO(base64.b64decode(data)))
+
+def test_detect_mime():
+    assert detect_mime(make_image((4, 4), fmt="PNG")) == "image/png"
+    assert detect_mime(make_image((4, 4), fmt="JPEG")) == "image/jpeg"
+    assert detect_mime(make_image((4, 4), fmt="GIF")) == "image/gif"
+    assert detect_mime(make_image((4, 4), fmt="WEBP")) == "image/webp"
+
+@pytest.mark.asyncio
+async def test_downscale_and_keep_small_images(tmp_path):
+    processor = ImageProcessor(max_edge=64)
+    path = tmp_path / "big.png"
+    path.write_bytes(make_image((200, 100)))
+    mime, img = decode(await processor.encode(str(path)))
+    assert mime == "image/jpeg" and img.size == (64, 32)
+
+    # 有透明通道的图片编码为 PNG
+    mime, img = decode(await processor.encode("base64://" + base64.b64encode(make_image((200, 100), "RGBA")).decode()))
+    assert mime == "image/png" and img.size == (64, 32)
+
+    # 小图保持原格式
+    mime, img = decode(await processor.encode("base64://" + base64.b64encode(make_image((10, 10))).decode()))
+    assert mime == "image/png" and img.size == (10, 10)
+
+    # BMP 被转换为模型支持的格式
+    mime, _ = decode(await processor.encode("base64://" + base64.b64encode(make_image((10, 10), fmt="BMP")).decode()))
+    assert mime == "image/jpeg"
+
+@pytest.mark.asyncio
+async def test_content_cache(tmp_path):
+    processor = ImageProcessor(max_edge=64)
+    data = make_image((200, 100))
+    paths = []
+    for i in range(2):
+        paths.append(tmp_path / f"{i}.png")
+        paths[-1].write_bytes(data)
+    results = await processor.encode_all([str(p) for p in paths])
+    assert results[0] == results[1]
+    stats = processor.get_stats()
+    assert stats["size"] == 1
+
+@pytest.mark.asyncio
+async def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation：顺时针旋转 90 度后显示
+    buf = io.BytesIO()
+    Image.new("RGB", (3000, 1000), (255, 0, 0)).save(buf, format="JPEG", exif=exif)
+    processor = ImageProcessor(max_edge=1568)
+    mime, img = decode(await processor.encode("base64://" + base64.b64encode(buf.getvalue()).decode()))
+    assert mime == "image/jpeg"
+    assert img.size == (523, 1568)
+    assert img.getexif().get(0x0112) is None
+
+@pytest.mark.asyncio
+async def test_ssl_fallback_and_failed_images_are_skipped(monkeypatch):
+    from types import SimpleNamespace
+    import aiohttp
+    from astrbot.core.utils.http_client import http_client
+    data = make_image((10, 10))
+    requests = []
+
+    class FakeResponse():
+        async def __aenter__(self):
+            return self
+        async def __aexit__(self, *args):
+            pass
+        def raise_for_status(self):
+            pass
+        async def read(self):
+            return data
+
+    class FakeSession():
+        def get(self, url, ssl=None):
+            requests.append((url, ssl))
+            if "broken" in url:
+                raise aiohttp.ClientConnectionError("connection refused")
+            if ssl is None:
+                # 默认的加密套件无法连接
+                raise aiohttp.ClientConnectorSSLError(SimpleNamespace(host="multimedia.nt.qq.com.cn", port=443, ssl=True), OSError("handshake failure"))
+            return FakeResponse()
+
+    monkeypatch.setattr(http_client, "get_session", lambda: FakeSession())
+    processor = ImageProcessor()
+    results = await processor.encode_all(["https://multimedia.nt.qq.com.cn/a.png", "https://broken.example/b.png"])
+    assert len(results) == 1 and decode(results[0])[0] == "image/png"
+    assert requests[0][1] is None and requests[1][1] is not None
@@ -0,0 +1,88 @@
+import pytest
+from types import SimpleNamespace
+from astrbot.core.provider.key_pool import APIKeyPool
+from astrbot.core.provider.sources.openai_source import ProviderOpenAIOfficial
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code: int, retry_after: str = None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={"retry-after": retry_after} if retry_after else {})
+
+def test_round_robin_and_cooldown():
+    pool = APIKeyPool(["k1", "k2", "k3"], cooldown=60)
+    keys = []
+    for _ in range(3):
+        state = pool.acquire()
+        keys.append(state.key)
+        pool.release(state)
+    assert keys == ["k1", "k2", "k3"]
+
+    state = pool.acquire()
+    assert pool.release(state, FakeAPIError(429, "5")) is True
+    assert pool.available_count() == 2
+    state = pool.acquire()
+    assert pool.release(state, FakeAPIError(401)) is True
+    assert pool.available_count() == 1
+    assert pool.release(pool.acquire(), Exception("timeout")) is False
+
+    stats = pool.get_stats()
+    assert [stat["index"] for stat in stats] == [0, 1, 2]
+    assert 0 < stats[0]["cooldown"] <= 5
+    assert stats[1]["disabled"]
+    assert stats[2]["errors"] == 1
+
+    # /key 切换后优先使用指定的 Key，并重新启用它
+    pool.pin("k2")
+    assert pool.acquire().key == "k2"
+
+def test_stats_of_keys_with_same_prefix():
+    pool = APIKeyPool(["sk-proj-aaaa", "sk-proj-bbbb"])
+    pool.release(pool.acquire(), FakeAPIError(401))
+    stats = pool.get_stats()
+    assert [stat["key"] for stat in stats] == ["sk-proj-", "sk-proj-"]
+    assert [stat["disabled"] for stat in stats] == [True, False]
+
+def test_least_in_flight():
+    pool = APIKeyPool(["k1", "k2"], strategy="least_in_flight")
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.key, second.key} == {"k1", "k2"}
+    pool.release(second)
+    assert pool.acquire().key == second.key
+
+class FakeCompletions():
+    def __init__(self, key: str, calls: list):
+        self.key = key
+        self.calls = calls
+
+    async def create(self, **kwargs):
+        self.calls.append(self.key)
+        if self.key == "sk-limited":
+            raise FakeAPIError(429)
+        return "completion"
+
+class FakeProvider(ProviderOpenAIOfficial):
+    def __init__(self):
+        provider_config = {
+            "id": "fake", "type": "openai_chat_completion", "key": ["sk-limited", "sk-ok"],
+            "api_base": "http://localhost", "model_config": {"model": "fake"},
+        }
+        super().__init__(provider_config, {"default_personality": ""}, None, persistant_history=False)
+        self.calls = []
+
+    def _client_for(self, key):
+        return SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(key, self.calls)))
+
+@pytest.mark.asyncio
+async def test_rate_limited_key_is_retried_with_another_key():
+    provider = FakeProvider()
+    state, completion = await provider._create_completion({"messages": []}, stream=False)
+    provider.key_pool.release(state)
+    assert completion == "completion"
+    assert provider.calls == ["sk-limited", "sk-ok"]
+    # 被限流的 Key 在冷却期间不再被选择
+    state, _ = await provider._create_completion({"messages": []}, stream=False)
+    provider.key_pool.release(state)
+    assert provider.calls == ["sk-limited", "sk-ok", "sk-ok"]
+    assert all(stat["in_flight"] == 0 for stat in provider.key_pool.get_stats())
@@ -0,0 +1,30 @@
+import pytest
+from astrbot.core.utils.latency import LatencyHistogram, LatencyRecorder
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for i in range(1, 1001):
+        histogram.record(i / 1000) # 1ms ~ 1s
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 1000
+    assert snapshot["max_ms"] == 1000
+    # 分桶估算的误差不超过一个桶的宽度（相邻桶之比为 1.5）
+    assert 500 / 1.5 <= snapshot["p50_ms"] <= 500 * 1.5
+    assert 950 / 1.5 <= snapshot["p95_ms"] <= 1000
+    assert 990 / 1.5 <= snapshot["p99_ms"] <= 1000
+    assert snapshot["mean_ms"] == pytest.approx(500.5)
+
+def test_histogram_empty_and_reset():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(0.99) == 0.0
+    histogram.record(0.5)
+    histogram.reset()
+    assert histogram.snapshot()["count"] == 0
+
+def test_recorder_sorted_by_p95():
+    recorder = LatencyRecorder()
+    recorder.record("fast", 0.001)
+    recorder.record("slow", 1.0)
+    recorder.get("unused")
+    assert list(recorder.snapshot()) == ["fast", "slow"]
+    assert list(recorder.snapshot(sort_by_p95=True)) == ["slow", "fast"]
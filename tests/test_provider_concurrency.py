@@ -0,0 +1,42 @@
+import asyncio
+import pytest
+from astrbot.core.provider.concurrency import ConcurrencyLimiter, ProviderBusyError
+
+async def request(limiter: ConcurrencyLimiter, running: list, delay: float = 0.02):
+    async with limiter.slot():
+        running.append(limiter.in_flight)
+        await asyncio.sleep(delay)
+
+@pytest.mark.asyncio
+async def test_limits_concurrency_and_queues():
+    limiter = ConcurrencyLimiter(max_concurrency=2)
+    running = []
+    await asyncio.gather(*[request(limiter, running) for _ in range(6)])
+    assert max(running) == 2
+    stats = limiter.get_stats()
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+    assert stats["wait"]["count"] == 6
+    assert stats["wait"]["max_ms"] > 0
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_full_or_timed_out():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=1)
+    running = []
+    results = await asyncio.gather(*[request(limiter, running) for _ in range(3)], return_exceptions=True)
+    assert sum(isinstance(r, ProviderBusyError) for r in results) == 1
+    assert limiter.rejected == 1
+
+    limiter = ConcurrencyLimiter(max_concurrency=1, queue_timeout=0.01)
+    results = await asyncio.gather(request(limiter, running, 0.1), request(limiter, running), return_exceptions=True)
+    assert isinstance(results[1], ProviderBusyError)
+    assert limiter.timed_out == 1
+    # 超时的请求不占用名额
+    await request(limiter, running)
+    assert limiter.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_unlimited():
+    limiter = ConcurrencyLimiter()
+    running = []
+    await asyncio.gather(*[request(limiter, running) for _ in range(5)])
+    assert max(running) == 5
@@ -0,0 +1,73 @@
+import pytest
+from astrbot.core.pipeline import STAGES_ORDER
+from astrbot.core.pipeline.stage import registered_stages
+from astrbot.core.pipeline.rate_limit_check.limiter import GCRALimiter
+from astrbot.core.pipeline.rate_limit_check.stage import RateLimitCheckStage, rate_limit_stats
+
+def test_gcra_limiter():
+    limiter = GCRALimiter(count=3, period=60)
+    assert [limiter.acquire("a", now=100) for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("a", now=100) == pytest.approx(20)
+    # 未预约时，失败不改变状态
+    assert limiter.acquire("a", now=120) == 0
+    assert limiter.acquire("a", reserve=True, now=120) == pytest.approx(20)
+    assert limiter.acquire("a", reserve=True, now=120) == pytest.approx(40)
+    assert limiter.acquire("b", now=120) == 0
+
+def test_gcra_limiter_evicts_idle_keys():
+    limiter = GCRALimiter(count=2, period=10)
+    for i in range(100):
+        limiter.acquire(f"session_{i}", now=0)
+    assert len(limiter) == 100
+    limiter.acquire("session_0", now=11)
+    assert len(limiter) == 1
+
+def test_rate_limit_stage_registered():
+    names = [stage.__class__.__name__ for stage in registered_stages]
+    assert "RateLimitCheckStage" in names
+    assert set(names) <= set(STAGES_ORDER)
+
+class FakeEvent():
+    def __init__(self, sender: str, session: str):
+        self.sender = sender
+        self.unified_msg_origin = session
+        self.stopped = False
+
+    def get_platform_name(self):
+        return "test_platform"
+
+    def get_sender_id(self):
+        return self.sender
+
+    def set_result(self, result):
+        pass
+
+    def stop_event(self):
+        self.stopped = True
+
+    def continue_event(self):
+        pass
+
+class FakeContext():
+    def __init__(self, rate_limit: dict):
+        self.astrbot_config = {"platform_settings": {"rate_limit": rate_limit}}
+
+@pytest.mark.asyncio
+async def test_rate_limit_stage_sender_level():
+    stage = RateLimitCheckStage()
+    await stage.initialize(FakeContext({
+        "time": 60, "count": 100, "strategy": "stall",
+        "sender": {"enable": True, "time": 60, "count": 2, "strategy": "discard"},
+    }))
+    assert [level.name for level in stage.levels] == ["sender", "session"]
+    # 同一个发送者在不同的群里
+    events = [FakeEvent("spammer", f"group_{i}") for i in range(3)]
+    for event in events:
+        await stage.process(event)
+    assert [e.stopped for e in events] == [False, False, True]
+    assert rate_limit_stats["sender"]["rejected"] == 1
+    # 被丢弃的事件不消耗会话级别的令牌
+    assert len(stage.levels[1].limiter) == 2
+    other = FakeEvent("someone", "group_0")
+    await stage.process(other)
+    assert not other.stopped
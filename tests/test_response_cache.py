@@ -0,0 +1,54 @@
+from astrbot.core.utils.ttl_cache import TTLCache
+from astrbot.core.provider.entites import LLMResponse
+from astrbot.core.provider.func_tool_manager import FuncCall
+from astrbot.core.provider.response_cache import LLMResponseCache
+
+def test_ttl_cache_byte_budget():
+    cache = TTLCache(max_size=10, ttl=0, max_bytes=10)
+    cache.set("a", "a", size=4)
+    cache.set("b", "b", size=4)
+    cache.get("a")
+    cache.set("c", "c", size=4)
+    # b 最久未使用，被淘汰
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" and cache.get("c") == "c"
+    assert cache.total_bytes == 8
+
+def test_response_cache_key_and_bypass():
+    cache = LLMResponseCache()
+    payloads = {"messages": [{"role": "user", "content": "/help 是什么"}], "model": "gpt-4o-mini"}
+    key = cache.make_key("openai", payloads)
+    assert key == cache.make_key("openai", {"model": "gpt-4o-mini", "messages": [{"content": "/help 是什么", "role": "user"}]})
+    assert key != cache.make_key("openai", {**payloads, "model": "gpt-4o"})
+    assert key != cache.make_key("zhipu", payloads)
+
+    assert not cache.should_bypass(payloads, FuncCall())
+    tools = FuncCall()
+    tools.add_func("web_search", [], "搜索", None)
+    assert cache.should_bypass(payloads, tools)
+    # 注册了但没有激活的工具不会被发送，不影响缓存
+    tools.set_active("web_search", False)
+    assert not cache.should_bypass(payloads, tools)
+    image_payloads = {"messages": [{"role": "user", "content": [{"type": "text", "text": "这是什么"}]}]}
+    assert cache.should_bypass(image_payloads)
+
+def test_response_cache_sqlite_tier(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = LLMResponseCache()
+    cache.configure({"enable": True, "sqlite": True}, db_path)
+    cache.set("k", LLMResponse("assistant", "使用 /help 查看帮助"))
+    cache.set("tool", LLMResponse("tool", tools_call_args=[{}], tools_call_name=["web_search"]))
+    assert cache.get("tool") is None
+    cache.close()
+
+    # 重启后内存缓存为空，从 SQLite 中读取
+    cache = LLMResponseCache()
+    cache.configure({"enable": True, "sqlite": True}, db_path)
+    assert cache.get("k").completion_text == "使用 /help 查看帮助"
+    assert cache.get("k").completion_text == "使用 /help 查看帮助"
+    assert cache.get("missing") is None
+    stats = cache.get_stats()
+    assert stats["disk_hits"] == 1
+    assert stats["hits"] == 1
+    assert stats["hit_rate"] == round(2 / 3, 4)
+    cache.close()
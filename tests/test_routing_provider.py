@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from astrbot.core.provider.entites import LLMResponse
+from astrbot.core.provider.sources.routing_source import ProviderRouting, CircuitBreaker
+
+class FakeMember():
+    def __init__(self, provider_id: str, delay: float = 0, fail: bool = False):
+        self.provider_config = {"id": provider_id, "type": "fake"}
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    def get_model(self):
+        return "fake"
+
+    async def text_chat(self, prompt, session_id=None, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise Exception("服务不可用")
+        return LLMResponse("assistant", f"{self.provider_config['id']}: {prompt}")
+
+class FakeDB():
+    def update_llm_history(self, session_id, content, provider_type):
+        pass
+
+def make_router(members, **cfg) -> ProviderRouting:
+    provider_config = {
+        "id": "router", "type": "routing", "providers": [m.provider_config["id"] for m in members],
+        "timeout": 1, **cfg
+    }
+    router = ProviderRouting(provider_config, {"default_personality": ""}, FakeDB(), persistant_history=False)
+    router.set_providers(members)
+    return router
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_time=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    # 半开状态只放行一个探测请求
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.asyncio
+async def test_failover_and_circuit_breaker():
+    down = FakeMember("down", fail=True)
+    backup = FakeMember("backup")
+    router = make_router([down, backup], circuit_breaker={"failure_threshold": 2, "recovery_time": 60})
+    for _ in range(3):
+        llm_response = await router.text_chat("你好", "sid")
+        assert llm_response.completion_text == "backup: 你好"
+    # 连续失败两次后熔断，第三次请求不再发送给 down
+    assert down.calls == 2
+    assert router.get_stats()["providers"]["down"]["state"] == "open"
+    assert router.failovers == 2
+    assert [r["role"] for r in router.session_memory["sid"]] == ["user", "assistant"] * 3
+
+@pytest.mark.asyncio
+async def test_timeout_fails_over():
+    slow = FakeMember("slow", delay=5)
+    fast = FakeMember("fast")
+    router = make_router([slow, fast], timeout=0.05)
+    llm_response = await router.text_chat("你好", None)
+    assert llm_response.completion_text == "fast: 你好"
+
+@pytest.mark.asyncio
+async def test_hedged_request():
+    slow = FakeMember("slow", delay=1)
+    fast = FakeMember("fast", delay=0.01)
+    router = make_router([slow, fast], hedge=True, hedge_delay=0.05, timeout=0)
+    llm_response = await router.text_chat("你好", None)
+    assert llm_response.completion_text == "fast: 你好"
+    assert router.hedged == 1
+    await asyncio.sleep(0)
+    # 较慢的请求被取消，不计入熔断
+    assert slow.cancelled == 1
+    assert router.breakers["slow"].failures == 0
@@ -0,0 +1,86 @@
+import random
+import pytest
+from typing import AsyncGenerator
+from astrbot.core.pipeline.scheduler import PipelineScheduler
+
+class FakeEvent():
+    def __init__(self):
+        self.stopped = False
+        self.trace = []
+
+    def is_stopped(self):
+        return self.stopped
+
+class FakeStage():
+    def __init__(self, name: str, yields: int = 0, stop_at: int = -1):
+        self.name = name
+        self.yields = yields
+        self.stop_at = stop_at
+
+class FakeFuncStage(FakeStage):
+    async def process(self, event: FakeEvent):
+        event.trace.append(self.name)
+        if self.stop_at == 0:
+            event.stopped = True
+
+class FakeGenStage(FakeStage):
+    async def process(self, event: FakeEvent):
+        for i in range(self.yields):
+            event.trace.append(f"{self.name}#{i}")
+            if self.stop_at == i:
+                event.stopped = True
+            yield
+            event.trace.append(f"{self.name}#{i}-resume")
+        event.trace.append(f"{self.name}-end")
+
+async def legacy_process_stages(stages, event, from_stage=0):
+    '''旧的递归实现，作为行为参照'''
+    for i in range(from_stage, len(stages)):
+        stage = stages[i]
+        coro = stage.process(event)
+        if isinstance(coro, AsyncGenerator):
+            async for _ in coro:
+                if event.is_stopped():
+                    break
+                await legacy_process_stages(stages, event, i + 1)
+        else:
+            await coro
+            if event.is_stopped():
+                break
+        if event.is_stopped():
+            break
+
+def random_stages(rnd: random.Random):
+    stages = []
+    for i in range(rnd.randint(1, 7)):
+        stop_at = rnd.choice([-1, -1, -1, 0, 1])
+        if rnd.random() < 0.4:
+            stages.append(FakeGenStage(f"s{i}", rnd.randint(0, 3), stop_at))
+        else:
+            stages.append(FakeFuncStage(f"s{i}", stop_at=stop_at))
+    return stages
+
+@pytest.mark.asyncio
+async def test_plan_matches_legacy_recursion():
+    rnd = random.Random(42)
+    scheduler = PipelineScheduler(None)
+    for _ in range(300):
+        stages = random_stages(rnd)
+        scheduler.plan = PipelineScheduler.compile_plan(stages)
+
+        expected = FakeEvent()
+        await legacy_process_stages(stages, expected)
+        actual = FakeEvent()
+        await scheduler._process_stages(actual)
+
+        assert actual.trace == expected.trace
+        assert actual.stopped == expected.stopped
+
+@pytest.mark.asyncio
+async def test_plan_runs_stages_after_generator_ends():
+    stages = [FakeFuncStage("a"), FakeGenStage("b", 1), FakeFuncStage("c")]
+    scheduler = PipelineScheduler(None)
+    scheduler.plan = PipelineScheduler.compile_plan(stages)
+    event = FakeEvent()
+    await scheduler._process_stages(event)
+    assert event.trace == ["a", "b#0", "c", "b#0-resume", "b-end", "c"]
@@ -0,0 +1,62 @@
+import json
+from astrbot.core.db.sqlite import SQLiteDatabase
+from astrbot.core.provider.session_memory import SessionMemory
+
+def record(text: str) -> list:
+    return [{"role": "user", "content": text}, {"role": "assistant", "content": text}]
+
+def test_lazy_load_and_write_back(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "data.db"))
+    db.update_llm_history("a", json.dumps(record("旧的会话")), "openai_chat_completion")
+    db.update_llm_history("a", json.dumps(record("其他提供商")), "zhipu_chat_completion")
+
+    memory = SessionMemory(db, "openai_chat_completion", max_sessions=2)
+    assert len(memory) == 0
+    assert memory.get("a") == record("旧的会话")
+    assert "missing" not in memory and memory.get("missing") is None
+    assert memory["new"] == []
+
+    # 原地修改并标记过的会话在被淘汰时写回数据库
+    memory["new"].extend(record("新的会话"))
+    memory.mark_dirty("new")
+    memory["b"] = record("b")
+    memory["c"] = record("c")
+    assert len(memory) == 2 and memory.evictions == 2
+    assert json.loads(db.get_llm_history("new", "openai_chat_completion")[0].content) == record("新的会话")
+    assert memory.get("new") == record("新的会话")
+
+    memory.flush()
+    assert json.loads(db.get_llm_history("c", "openai_chat_completion")[0].content) == record("c")
+
+def test_byte_budget_and_no_history(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "data.db"))
+    db.update_llm_history("a", json.dumps(record("旧的会话")), "openai_chat_completion")
+    size = len(json.dumps(record("x" * 100), ensure_ascii=False))
+    memory = SessionMemory(db, "openai_chat_completion", load_history=False, max_sessions=0, max_bytes=size * 2)
+    # 不读取之前的历史记录，但本次运行中写回的会话仍可重新读取
+    assert memory.get("a") is None
+    for sid in "xyz":
+        memory[sid] = record(sid * 100)
+    assert len(memory) == 2 and memory.total_bytes <= size * 2
+    assert memory.get("x") == record("x" * 100)
+
+def test_reads_are_not_written_back(tmp_path):
+    class CountingDB(SQLiteDatabase):
+        writes = 0
+        def update_llm_history(self, session_id, content, provider_type):
+            CountingDB.writes += 1
+            super().update_llm_history(session_id, content, provider_type)
+
+    db = CountingDB(str(tmp_path / "data.db"))
+    for sid in "abc":
+        db.update_llm_history(sid, json.dumps(record(sid)), "openai_chat_completion")
+    CountingDB.writes = 0
+    memory = SessionMemory(db, "openai_chat_completion", max_sessions=1)
+    for sid in "abc":
+        assert memory[sid] == record(sid)
+        assert memory.get(sid) == record(sid)
+    memory.flush()
+    assert CountingDB.writes == 0 and memory.evictions == 2
+    del memory["a"]
+    del memory["c"]
+    assert len(memory) == 0 and memory.total_bytes == 0
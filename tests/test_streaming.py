@@ -0,0 +1,86 @@
+import pytest
+from astrbot.core.utils.metrics import Metric
+from astrbot.core.utils.sentence_buffer import SentenceBuffer
+from astrbot.core.provider.entites import LLMResponse
+from astrbot.core.provider.provider import ProviderMeta
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core.platform.astrbot_message import AstrBotMessage, MessageMember, MessageType
+from astrbot.core.platform.platform_metadata import PlatformMetadata
+from astrbot.core.message.components import Plain
+from astrbot.core.pipeline.process_stage.method.llm_request import LLMRequestSubStage
+
+def test_sentence_buffer():
+    buffer = SentenceBuffer(min_length=10, max_length=40)
+    text = "你好！我是 AstrBot。今天天气很好，我们可以出去玩。Hello there. no boundary here"
+    segments = []
+    for i in range(0, len(text), 3):
+        segments.extend(buffer.feed(text[i:i + 3]))
+    segments.append(buffer.flush())
+    assert segments == ["你好！我是 AstrBot。", "今天天气很好，我们可以出去玩。", "Hello there.", "no boundary here"]
+    assert "".join(segments).replace(" ", "") == text.replace(" ", "")
+
+class FakeProvider():
+    def __init__(self):
+        self.session_memory = {}
+
+    async def text_chat_stream(self, **kwargs):
+        for delta in ["第一句话说完了。", "第二句", "话也说完了。", "最后"]:
+            yield LLMResponse("assistant", delta, is_chunk=True)
+        self.session_memory["sid"] = ["saved"]
+        yield LLMResponse("assistant", "第一句话说完了。第二句话也说完了。最后")
+
+    def get_model(self):
+        return "fake"
+
+    def meta(self):
+        return ProviderMeta("fake", "fake", "fake")
+
+class FakeStarContext():
+    def __init__(self, provider):
+        self.provider = provider
+
+    def get_using_provider(self):
+        return self.provider
+
+    def get_llm_tool_manager(self):
+        return None
+
+class FakePluginManager():
+    def __init__(self, provider):
+        self.context = FakeStarContext(provider)
+
+class FakePipelineContext():
+    def __init__(self, provider):
+        self.astrbot_config = {"provider_settings": {"wake_prefix": "", "streaming_response": True}}
+        self.plugin_manager = FakePluginManager(provider)
+
+class FakeEvent(AstrMessageEvent):
+    def __init__(self, message_str: str):
+        abm = AstrBotMessage()
+        abm.type = MessageType.FRIEND_MESSAGE
+        abm.message_str = message_str
+        abm.message = [Plain(message_str)]
+        abm.sender = MessageMember("123456", "mika")
+        super().__init__(message_str, abm, PlatformMetadata("test_platform", "test"), "sid")
+
+@pytest.mark.asyncio
+async def test_llm_request_streams_segments(monkeypatch):
+    async def no_upload(**kwargs):
+        pass
+    monkeypatch.setattr(Metric, "upload", no_upload)
+    provider = FakeProvider()
+    stage = LLMRequestSubStage()
+    await stage.initialize(FakePipelineContext(provider))
+    # 让每一句话都能单独成段
+    monkeypatch.setattr("astrbot.core.pipeline.process_stage.method.llm_request.SentenceBuffer", lambda: SentenceBuffer(min_length=4))
+
+    event = FakeEvent("hello")
+    sent = []
+    async for _ in stage.process(event):
+        # 每次 yield 时，后续阶段会发送当前的结果
+        assert provider.session_memory == {}
+        sent.append((event.get_result().chain[0].text, event.get_result().stream_segment_index))
+    # 最后剩余的部分在生成器结束后发送
+    sent.append((event.get_result().chain[0].text, event.get_result().stream_segment_index))
+    assert sent == [("第一句话说完了。", 0), ("第二句话也说完了。", 1), ("最后", 2)]
+    assert provider.session_memory == {"sid": ["saved"]}
@@ -0,0 +1,197 @@
+import time
+import asyncio
+import pytest
+from astrbot.core.utils.metrics import Metric
+from astrbot.core.provider.entites import LLMResponse
+from astrbot.core.provider.provider import ProviderMeta
+from astrbot.core.provider.func_tool_manager import FuncCall
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core.platform.astrbot_message import AstrBotMessage, MessageMember, MessageType
+from astrbot.core.platform.platform_metadata import PlatformMetadata
+from astrbot.core.message.components import Plain
+from astrbot.core.message.message_event_result import MessageEventResult
+from astrbot.core.pipeline.process_stage.method.llm_request import LLMRequestSubStage
+
+async def web_search(event, query: str):
+    await asyncio.sleep(0.2)
+    return f"关于 {query} 的搜索结果"
+
+async def weather(event, city: str):
+    await asyncio.sleep(0.2)
+    return f"{city}：晴"
+
+async def reminder(event, text: str):
+    yield MessageEventResult().message(f"成功设置待办事项：{text}")
+
+async def hang(event):
+    await asyncio.sleep(10)
+    return "不会返回"
+
+def make_tools() -> FuncCall:
+    tools = FuncCall()
+    tools.add_func("web_search", [{"type": "string", "name": "query", "description": ""}], "", web_search)
+    tools.add_func("weather", [{"type": "string", "name": "city", "description": ""}], "", weather)
+    tools.add_func("reminder", [{"type": "string", "name": "text", "description": ""}], "", reminder)
+    tools.add_func("hang", [], "", hang)
+    return tools
+
+class FakeProvider():
+    def __init__(self, rounds: list):
+        self.session_memory = {}
+        self.rounds = rounds
+        self.requests = []
+
+    async def text_chat(self, **kwargs):
+        self.requests.append(kwargs)
+        names = self.rounds[len(self.requests) - 1] if len(self.requests) <= len(self.rounds) else []
+        if names and kwargs["func_tool"]:
+            args = [{"query": "AstrBot"} if n == "web_search" else {"city": "北京"} if n == "weather" else {"text": "开会"} if n == "reminder" else {} for n in names]
+            return LLMResponse("tool", tools_call_name=names, tools_call_args=args, tools_call_ids=[f"id_{n}" for n in names])
+        return LLMResponse("assistant", "完成")
+
+    def get_model(self):
+        return "fake"
+
+    def meta(self):
+        return ProviderMeta("fake", "fake", "fake")
+
+class FakeStarContext():
+    def __init__(self, provider):
+        self.provider = provider
+
+    def get_using_provider(self):
+        return self.provider
+
+    def get_llm_tool_manager(self):
+        return make_tools()
+
+class FakePluginManager():
+    def __init__(self, provider):
+        self.context = FakeStarContext(provider)
+
+class FakePipelineContext():
+    def __init__(self, provider, **settings):
+        self.astrbot_config = {"provider_settings": {"wake_prefix": "", **settings}}
+        self.plugin_manager = FakePluginManager(provider)
+
+class FakeEvent(AstrMessageEvent):
+    def __init__(self, message_str: str):
+        abm = AstrBotMessage()
+        abm.type = MessageType.FRIEND_MESSAGE
+        abm.message_str = message_str
+        abm.message = [Plain(message_str)]
+        abm.sender = MessageMember("123456", "mika")
+        super().__init__(message_str, abm, PlatformMetadata("test_platform", "test"), "sid")
+
+@pytest.fixture(autouse=True)
+def no_metric_upload(monkeypatch):
+    async def no_upload(**kwargs):
+        pass
+    monkeypatch.setattr(Metric, "upload", no_upload)
+
+async def run(provider, **settings):
+    stage = LLMRequestSubStage()
+    await stage.initialize(FakePipelineContext(provider, **settings))
+    event = FakeEvent("帮我查一下")
+    sent = []
+    async for _ in stage.process(event):
+        sent.append(event.get_result().chain[0].text)
+    return event, sent
+
+@pytest.mark.asyncio
+async def test_tools_run_concurrently_and_feed_back_tool_messages():
+    provider = FakeProvider([["web_search", "weather", "reminder"], ["weather"]])
+    start = time.perf_counter()
+    event, sent = await run(provider)
+    # 两轮工具调用，每轮中的工具并发执行
+    assert time.perf_counter() - start < 0.6
+    assert sent == ["成功设置待办事项：开会"]
+    assert event.get_result().chain[0].text == "完成"
+
+    assert len(provider.requests) == 3
+    tool_messages = provider.requests[2]["tool_messages"]
+    assert tool_messages[0]["role"] == "assistant"
+    assert [c["id"] for c in tool_messages[0]["tool_calls"]] == ["id_web_search", "id_weather", "id_reminder"]
+    assert tool_messages[1] == {"role": "tool", "tool_call_id": "id_web_search", "content": "关于 AstrBot 的搜索结果"}
+    assert tool_messages[2]["content"] == "北京：晴"
+    assert tool_messages[3]["content"] == "The result has been sent to the user."
+    assert tool_messages[4]["tool_calls"][0]["function"]["name"] == "weather"
+    assert tool_messages[5]["tool_call_id"] == "id_weather"
+    # 提示词不再被拼接工具结果
+    assert provider.requests[2]["prompt"] == "帮我查一下"
+
+@pytest.mark.asyncio
+async def test_tool_rounds_are_bounded_and_timed_out():
+    provider = FakeProvider([["hang"]] * 5)
+    event, _ = await run(provider, max_tool_rounds=2, tool_call_timeout=0.05)
+    assert len(provider.requests) == 3
+    assert provider.requests[2]["func_tool"] is None
+    assert "timed out" in provider.requests[2]["tool_messages"][1]["content"]
+    assert event.get_result().chain[0].text == "完成"
+
+def test_tool_result_cache_key_is_canonical():
+    calls = []
+    async def search(event, query: str, num: int = 5):
+        calls.append(query)
+        return "结果"
+    tools = FuncCall()
+    tools.add_func("search", [], "", search, cache_ttl=60)
+    tools.add_func("nocache", [], "", search)
+    search_tool, nocache_tool = tools.get_func("search"), tools.get_func("nocache")
+    tools.set_cached_result(search_tool, {"query": "AstrBot", "num": 5}, "结果")
+    tools.set_cached_result(nocache_tool, {"query": "AstrBot"}, "结果")
+    assert tools.get_cached_result(search_tool, {"num": 5, "query": "AstrBot"}) == "结果"
+    assert tools.get_cached_result(search_tool, {"num": 3, "query": "AstrBot"}) is None
+    assert tools.get_cached_result(nocache_tool, {"query": "AstrBot"}) is None
+    stats = tools.result_cache.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_repeated_tool_calls_use_cache(monkeypatch):
+    tools = make_tools()
+    tools.get_func("web_search").cache_ttl = 60
+    monkeypatch.setattr(FakeStarContext, "get_llm_tool_manager", lambda self: tools)
+    for _ in range(2):
+        provider = FakeProvider([["web_search"]])
+        start = time.perf_counter()
+        await run(provider)
+        assert provider.requests[1]["tool_messages"][1]["content"] == "关于 AstrBot 的搜索结果"
+    # 第二次直接使用缓存的结果
+    assert time.perf_counter() - start < 0.1
+    assert tools.result_cache.get_stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_failed_tool_calls_are_not_cached(monkeypatch):
+    calls = []
+    async def flaky_search(event, query: str):
+        calls.append(query)
+        if len(calls) == 1:
+            raise Exception("没有搜索到结果")
+        return f"关于 {query} 的搜索结果"
+    tools = FuncCall()
+    tools.add_func("web_search", [{"type": "string", "name": "query", "description": ""}], "", flaky_search, cache_ttl=60)
+    monkeypatch.setattr(FakeStarContext, "get_llm_tool_manager", lambda self: tools)
+    for expected in ("an error occurred", "关于 AstrBot 的搜索结果"):
+        provider = FakeProvider([["web_search"]])
+        await run(provider)
+        assert expected in provider.requests[1]["tool_messages"][1]["content"]
+    assert len(calls) == 2
+
+def test_func_call_index_and_schema_memo():
+    tools = make_tools()
+    schema = tools.get_func_desc_openai_style()
+    assert [t["function"]["name"] for t in schema] == ["web_search", "weather", "reminder", "hang"]
+    # 没有变化时返回同一个对象
+    assert tools.get_func_desc_openai_style() is schema
+    assert tools.get_func("weather").handler is weather
+
+    assert tools.set_active("hang", False)
+    assert not tools.set_active("missing", False)
+    schema = tools.get_func_desc_openai_style()
+    assert [t["function"]["name"] for t in schema] == ["web_search", "weather", "reminder"]
+
+    tools.remove_func("weather")
+    assert tools.get_func("weather") is None
+    assert [t["function"]["name"] for t in tools.get_func_desc_openai_style()] == ["web_search", "reminder"]
+    tools.add_func("weather", [], "", hang)
+    assert tools.get_func("weather").handler is hang